@@ -0,0 +1,653 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for Keyboard Checker hot paths
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Usage:
+    python3 benchmarks.py typing [--chars N] [--modes MODE ...]
+    python3 benchmarks.py scoring [--chars N]
+    python3 benchmarks.py key-names [--calls N]
+    python3 benchmarks.py modifier-names [--calls N]
+    python3 benchmarks.py history [--results N] [--backends BACKEND ...]
+    python3 benchmarks.py startup [--runs N] [--warmup N]
+    python3 benchmarks.py replay [--session FILE] [--chars N] [--into TARGET ...]
+    python3 benchmarks.py scan-rate [--events N]
+    python3 benchmarks.py rollover [--events N]
+    python3 benchmarks.py coverage [--events N] [--repaints N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+import tempfile
+import statistics
+from pathlib import Path
+
+# Benchmarks never need a visible window
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def get_app():
+    """Return the QApplication, creating it if needed"""
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+def bench_typing(args):
+    """Per-keystroke cost of TypingTest coloring early and late in a test"""
+    app = get_app()  # Keep a reference so the application stays alive
+    from PyQt6.QtGui import QTextCursor
+    from keyboard_checker import TypingTest
+    from text_samples import TYPING_SAMPLES
+
+    source = " ".join(s['text'] for s in TYPING_SAMPLES)
+    typed = source[:args.chars]
+    window = 50  # keystrokes averaged at each checkpoint
+
+    print(f"Typing {len(typed)} characters, {window}-keystroke windows")
+    print(f"{'mode':<12} {'early (us)':>12} {'late (us)':>12}")
+    for mode in args.modes or TypingTest.RECOLOR_MODES:
+        test = TypingTest(recolor_mode=mode)
+        test.start_test({'id': 0, 'text': source, 'source': ''})
+        test.test_timer.stop()
+        test.wpm_sample_timer.stop()
+
+        cursor = test.typing_input.textCursor()
+        timings = []
+        for char in typed:
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            start = time.perf_counter_ns()
+            cursor.insertText(char)
+            timings.append(time.perf_counter_ns() - start)
+
+        early = statistics.mean(timings[:window]) / 1000
+        late = statistics.mean(timings[-window:]) / 1000
+        print(f"{mode:<12} {early:>12.1f} {late:>12.1f}")
+        test.close()
+
+
+def bench_scoring(args):
+    """Per-keystroke cost of the Qt-free scoring engine"""
+    from typing_scorer import TypingScorer
+    from text_samples import TYPING_SAMPLES
+
+    source = " ".join(s['text'] for s in TYPING_SAMPLES)
+    typed = source[:args.chars]
+    window = 500  # keystrokes averaged at each checkpoint
+
+    scorer = TypingScorer(source)
+    timings = []
+    for char in typed:
+        start = time.perf_counter_ns()
+        scorer.feed_key(char)
+        timings.append(time.perf_counter_ns() - start)
+
+    early = statistics.mean(timings[:window]) / 1000
+    late = statistics.mean(timings[-window:]) / 1000
+    total = sum(timings) / 1e9
+    print(f"Scored {len(typed)} keystrokes in {total * 1000:.1f} ms "
+          f"({len(typed) / total:,.0f} keystrokes/s)")
+    print(f"early: {early:.2f} us/keystroke, late: {late:.2f} us/keystroke")
+
+
+def key_event_mix():
+    """(key, text, native_key) tuples for a realistic mix of key presses"""
+    from PyQt6.QtCore import Qt
+    letters = [(int(getattr(Qt.Key, f'Key_{c}')), c.lower(), 0) for c in "ETAOINSHRDLU"]
+    return letters * 4 + [
+        (int(Qt.Key.Key_Space), " ", 0x41),
+        (int(Qt.Key.Key_Backspace), "", 0x16),
+        (int(Qt.Key.Key_Return), "", 0x24),
+        (int(Qt.Key.Key_Shift), "", 0x32),
+        (int(Qt.Key.Key_Shift), "", 0x3e),
+        (int(Qt.Key.Key_Control), "", 0x25),
+        (int(Qt.Key.Key_F5), "", 0x47),
+        (int(Qt.Key.Key_VolumeUp), "", 0x7b),
+        (int(Qt.Key.Key_Left), "", 0x71),
+        (0x01ffffff, "", 0),
+    ]
+
+
+def time_calls(func, arg_list, calls):
+    """Return calls per second of func over arg_list, repeated"""
+    rounds = max(1, calls // len(arg_list))
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        for args in arg_list:
+            func(*args)
+    elapsed = (time.perf_counter_ns() - start) / 1e9
+    return rounds * len(arg_list) / elapsed
+
+
+def bench_key_names(args):
+    """Throughput of get_key_name against the per-call table version"""
+    app = get_app()  # Keep a reference so the application stays alive
+    from keyboard_checker import KeyboardChecker
+
+    window = KeyboardChecker()
+    events = key_event_mix()
+    before = time_calls(make_legacy_get_key_name(), events, args.calls)
+    after = time_calls(window.get_key_name, events, args.calls)
+    print(f"get_key_name over {args.calls:,} calls")
+    print(f"  per-call tables (before): {before:>12,.0f} calls/s")
+    print(f"  precomputed (after):      {after:>12,.0f} calls/s")
+    print(f"  speedup: {after / before:.1f}x")
+    window.close()
+
+
+def make_legacy_get_key_name():
+    """Return get_key_name as it was before the tables were precomputed"""
+    from PyQt6.QtCore import Qt
+
+    def legacy_get_key_name(key, text, native_key=0):
+        # Special keys mapping
+        special_keys = {
+            Qt.Key.Key_Escape: "ESC",
+            Qt.Key.Key_Tab: "TAB",
+            Qt.Key.Key_Backtab: "BACKTAB",
+            Qt.Key.Key_Backspace: "BACKSPACE",
+            Qt.Key.Key_Return: "RETURN",
+            Qt.Key.Key_Enter: "ENTER",
+            Qt.Key.Key_Insert: "INSERT",
+            Qt.Key.Key_Delete: "DELETE",
+            Qt.Key.Key_Pause: "PAUSE",
+            Qt.Key.Key_Print: "PRINT",
+            Qt.Key.Key_Home: "HOME",
+            Qt.Key.Key_End: "END",
+            Qt.Key.Key_Left: "LEFT ARROW",
+            Qt.Key.Key_Up: "UP ARROW",
+            Qt.Key.Key_Right: "RIGHT ARROW",
+            Qt.Key.Key_Down: "DOWN ARROW",
+            Qt.Key.Key_PageUp: "PAGE UP",
+            Qt.Key.Key_PageDown: "PAGE DOWN",
+            Qt.Key.Key_CapsLock: "CAPS LOCK",
+            Qt.Key.Key_NumLock: "NUM LOCK",
+            Qt.Key.Key_ScrollLock: "SCROLL LOCK",
+            Qt.Key.Key_Space: "SPACE",
+        }
+
+        # Handle modifier keys with left/right detection
+        # On Linux X11, native virtual key codes help distinguish left vs right
+        if key == Qt.Key.Key_Shift:
+            # Left Shift is typically 0x32 (50), Right Shift is 0x3e (62)
+            if native_key == 0x3e or native_key == 62:
+                return "SHIFT (RIGHT)"
+            return "SHIFT (LEFT)"
+        elif key == Qt.Key.Key_Control:
+            # Left Ctrl is typically 0x25 (37), Right Ctrl is 0x69 (105)
+            if native_key == 0x69 or native_key == 105:
+                return "CTRL (RIGHT)"
+            return "CTRL (LEFT)"
+        elif key == Qt.Key.Key_Alt:
+            # Left Alt is typically 0x40 (64), Right Alt is 0x6c (108)
+            if native_key == 0x6c or native_key == 108:
+                return "ALT/OPTION (RIGHT)"
+            return "ALT/OPTION (LEFT)"
+        elif key == Qt.Key.Key_AltGr:
+            return "ALT GR (RIGHT)"
+        elif key == Qt.Key.Key_Meta:
+            # Left Super/Meta is typically 0x85 (133), Right is 0x86 (134)
+            if native_key == 0x86 or native_key == 134:
+                return "META/SUPER (RIGHT)"
+            return "META/SUPER (LEFT)"
+
+        # F keys
+        for i in range(1, 36):
+            special_keys[getattr(Qt.Key, f'Key_F{i}')] = f"F{i}"
+
+        # Media and function keys
+        media_keys = {
+            Qt.Key.Key_VolumeDown: "VOLUME DOWN",
+            Qt.Key.Key_VolumeUp: "VOLUME UP",
+            Qt.Key.Key_VolumeMute: "VOLUME MUTE",
+            Qt.Key.Key_MediaPlay: "MEDIA PLAY",
+            Qt.Key.Key_MediaStop: "MEDIA STOP",
+            Qt.Key.Key_MediaPrevious: "MEDIA PREVIOUS",
+            Qt.Key.Key_MediaNext: "MEDIA NEXT",
+            Qt.Key.Key_MonBrightnessUp: "BRIGHTNESS UP",
+            Qt.Key.Key_MonBrightnessDown: "BRIGHTNESS DOWN",
+        }
+        special_keys.update(media_keys)
+
+        if key in special_keys:
+            return special_keys[key]
+
+        # For regular characters
+        if text and text.isprintable():
+            return text.upper() if len(text) == 1 else text
+
+        # Fallback for unknown keys - just show the key code
+        return f"KEY_0x{key:04X}"
+
+    return legacy_get_key_name
+
+
+def make_legacy_get_modifier_names():
+    """Return get_modifier_names as it was before the table was precomputed"""
+    from PyQt6.QtCore import Qt
+
+    def legacy_get_modifier_names(modifiers):
+        mod_list = []
+
+        if modifiers & Qt.KeyboardModifier.ShiftModifier:
+            mod_list.append("SHIFT")
+        if modifiers & Qt.KeyboardModifier.ControlModifier:
+            mod_list.append("CTRL")
+        if modifiers & Qt.KeyboardModifier.AltModifier:
+            mod_list.append("ALT")
+        if modifiers & Qt.KeyboardModifier.MetaModifier:
+            mod_list.append("META")
+
+        return " + ".join(mod_list)
+
+    return legacy_get_modifier_names
+
+
+def bench_modifier_names(args):
+    """Throughput of get_modifier_names against the flag-testing version"""
+    app = get_app()  # Keep a reference so the application stays alive
+    from PyQt6.QtCore import Qt
+    from keyboard_checker import KeyboardChecker
+
+    window = KeyboardChecker()
+    mod = Qt.KeyboardModifier
+    events = [(mod.NoModifier,)] * 8 + [
+        (mod.ShiftModifier,), (mod.ShiftModifier,), (mod.ControlModifier,),
+        (mod.ControlModifier | mod.ShiftModifier,), (mod.AltModifier,),
+        (mod.MetaModifier,), (mod.ControlModifier | mod.AltModifier,),
+    ]
+    before = time_calls(make_legacy_get_modifier_names(), events, args.calls)
+    after = time_calls(window.get_modifier_names, events, args.calls)
+    print(f"get_modifier_names over {args.calls:,} calls")
+    print(f"  flag tests and join (before): {before:>12,.0f} calls/s")
+    print(f"  precomputed table (after):    {after:>12,.0f} calls/s")
+    print(f"  speedup: {after / before:.1f}x")
+    window.close()
+
+
+def make_history_results(count):
+    """Typing test results shaped like the ones the typing test saves"""
+    rng = random.Random(0)
+    results = []
+    for i in range(count):
+        wpm = round(rng.uniform(30, 110), 1)
+        errors = [(rng.randrange(300), 'x', 'e') for _ in range(rng.randrange(10))]
+        results.append({
+            'timestamp': f"2020-01-01T00:00:{i:06d}",
+            'duration': rng.choice((15, 30, 60, 120, 300)),
+            'text_sample_id': rng.randrange(20),
+            'wpm': wpm,
+            'adjusted_wpm': round(wpm * 0.9, 1),
+            'accuracy_percent': round(rng.uniform(85, 100), 1),
+            'peak_wpm': round(wpm * 1.2, 1),
+            'consistency_score': round(rng.uniform(0, 15), 1),
+            'total_characters': 300,
+            'total_words': 60,
+            'errors': len(errors),
+            'error_details': sorted(errors),
+        })
+    return results
+
+
+def bench_history(args):
+    """Cost of TypingHistory saves and queries with a long history"""
+    from keyboard_checker import HISTORY_BACKENDS, TypingHistory
+
+    results = make_history_results(args.results)
+    repeats = 20
+
+    def fresh_history(history):
+        """A new instance of the same backend on the same file, as at startup"""
+        fresh = type(history)()
+        fresh.history_dir = history.history_dir
+        fresh.history_file = history.history_file
+        return fresh
+
+    operations = [
+        ("save_result", lambda history: history.save_result(results[0])),
+        ("get_recent(10)", lambda history: history.get_recent(10)),
+        ("get_recent(10), new", lambda history: fresh_history(history).get_recent(10)),
+        ("get_by_duration(60)", lambda history: history.get_by_duration(60)),
+        ("get_average_wpm(60)", lambda history: history.get_average_wpm(60)),
+    ]
+
+    print(f"History of {len(results)} results, mean of {repeats} calls (ms)")
+    print(f"{'operation':<22}" + "".join(f"{backend:>12}" for backend in args.backends))
+    timings = {}
+    cache_counts = []
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            history_dir = Path(tmp)
+            # The SQLite backend imports this file when it creates its database
+            with open(history_dir / "typing_history.jsonl", 'w') as f:
+                f.writelines(TypingHistory._encode(result) for result in results)
+            history = HISTORY_BACKENDS[backend]()
+            history.history_dir = history_dir
+            history.history_file = history_dir / history.history_file.name
+            history.load_history()
+            history.get_summary()
+
+            for name, operation in operations:
+                start = time.perf_counter_ns()
+                for _ in range(repeats):
+                    operation(history)
+                timings[backend, name] = (time.perf_counter_ns() - start) / repeats / 1e6
+            if history.cache_hits or history.cache_misses:
+                cache_counts.append(f"{backend} cache: {history.cache_hits} hits, "
+                                    f"{history.cache_misses} misses")
+            if hasattr(history, 'close'):
+                history.close()
+
+    for name, _ in operations:
+        print(f"{name:<22}" + "".join(f"{timings[backend, name]:>12.3f}"
+                                      for backend in args.backends))
+    for line in cache_counts:
+        print(line)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+def parse_startup_trace(output):
+    """Return (step, ms since start) pairs from a --trace-startup report"""
+    steps = []
+    in_report = False
+    for line in output.splitlines():
+        if line.startswith("Start-up trace"):
+            in_report = True
+            continue
+        if in_report:
+            fields = line.rsplit(None, 2)
+            try:
+                steps.append((fields[0], float(fields[2])))
+            except (IndexError, ValueError):
+                pass  # A step not seen, or Qt output after the report
+    return steps
+
+
+def bench_startup(args):
+    """Time cold starts of the checker up to its first paint and focus"""
+    from keyboard_checker import StartupTrace
+
+    script = Path(__file__).resolve().with_name("keyboard_checker.py")
+    command = [sys.executable, str(script), "--trace-startup", "--quit-after-startup"]
+    totals = {}  # step -> ms since start, one per run
+    wall_times = []
+    with tempfile.TemporaryDirectory() as home:
+        # A scratch home keeps the runs away from the real typing history
+        env = dict(os.environ, HOME=home, QT_QPA_PLATFORM="offscreen")
+        env.pop(StartupTrace.ENV_VAR, None)
+        for run in range(args.warmup + args.runs):
+            start = time.perf_counter_ns()
+            process = subprocess.run(command, env=env, capture_output=True, text=True,
+                                     timeout=60)
+            wall_ms = (time.perf_counter_ns() - start) / 1e6
+            if process.returncode != 0:
+                sys.exit(f"keyboard_checker.py failed:\n{process.stderr}")
+            if run < args.warmup:
+                continue
+            wall_times.append(wall_ms)
+            for step, total_ms in parse_startup_trace(process.stderr):
+                totals.setdefault(step, []).append(total_ms)
+
+    print(f"{args.runs} cold starts after {args.warmup} warm-up, "
+          f"ms since the trace started")
+    print(f"{'step':<24}" + "".join(f"{name:>10}" for name in ("p50", "p90", "p99", "max")))
+    rows = list(totals.items()) + [("process wall time", wall_times)]
+    for step, values in rows:
+        print(f"{step:<24}" + "".join(f"{percentile(values, p):>10.1f}"
+                                      for p in (50, 90, 99, 100)))
+    missing = [step for step in StartupTrace.FIRST_EVENTS.values()
+               if len(totals.get(step, ())) < args.runs]
+    if missing:
+        print(f"Not seen in every run: {', '.join(missing)}")
+
+
+def make_key_session(text, wpm=100):
+    """Key press and release records typing text at a steady pace"""
+    from key_session import KeyEventRecord
+
+    shift = 0x02000000  # Qt.KeyboardModifier.ShiftModifier
+    interval_ns = round(60e9 / (wpm * 5))
+    records = []
+    for i, char in enumerate(text):
+        key = ord(char.upper()) if char.isascii() else 0
+        modifiers = shift if char.isupper() else 0
+        press_ns = i * interval_ns
+        records.append(KeyEventRecord(press_ns, False, key, modifiers, key, False, char))
+        records.append(KeyEventRecord(press_ns + interval_ns // 2, True, key, modifiers,
+                                      key, False, char))
+    return records
+
+
+def bench_replay(args):
+    """Cost per event of replaying a key session into each handler"""
+    app = get_app()  # Keep a reference so the application stays alive
+    from keyboard_checker import KeyboardChecker, KeySessionReplayer
+    from key_session import read_session
+    from text_samples import TYPING_SAMPLES
+
+    source = " ".join(s['text'] for s in TYPING_SAMPLES)
+    if args.session:
+        records = read_session(args.session)
+        print(f"Replaying {len(records)} events from {args.session}")
+    else:
+        records = make_key_session(source[:args.chars])
+        print(f"Replaying {len(records)} events typing {args.chars} characters")
+    print(f"{'target':<10} {'total (ms)':>12} {'per event (us)':>16}")
+    for target_name in args.into:
+        window = KeyboardChecker()
+        target = window
+        if target_name == 'typing':
+            window.switch_to_typing_test()
+            test = window.typing_test
+            test.start_test({'id': 0, 'text': source, 'source': ''})
+            test.test_timer.stop()
+            test.wpm_sample_timer.stop()
+            target = test.typing_input
+
+        replayer = KeySessionReplayer(records, target, speed=0)
+        start = time.perf_counter_ns()
+        replayer.start()
+        elapsed = time.perf_counter_ns() - start
+        print(f"{target_name:<10} {elapsed / 1e6:>12.1f} "
+              f"{elapsed / 1000 / max(1, len(records)):>16.1f}")
+        window.close()
+
+
+def bench_scan_rate(args):
+    """Cost per event of the scan rate analysis"""
+    from scan_rate import ScanRateAnalyzer
+
+    rng = random.Random(0)
+    events = []
+    time_ms = 0
+    for _ in range(args.events // 2):
+        keycode = rng.randrange(9, 120)
+        time_ms += rng.randrange(1, 8)
+        events.append((True, keycode, time_ms, rng.random() < 0.1))
+        time_ms += rng.randrange(1, 8)
+        events.append((False, keycode, time_ms, False))
+
+    analyzer = ScanRateAnalyzer()
+    start = time.perf_counter_ns()
+    for is_press, keycode, time_ms, auto_repeat in events:
+        if is_press:
+            analyzer.press(keycode, time_ms, auto_repeat)
+        else:
+            analyzer.release(keycode, time_ms, auto_repeat)
+    per_event_us = (time.perf_counter_ns() - start) / len(events) / 1000
+
+    start = time.perf_counter_ns()
+    analyzer.report()
+    report_ms = (time.perf_counter_ns() - start) / 1e6
+    print(f"{len(events)} events: {per_event_us:.2f} us per event, "
+          f"{per_event_us * 1000 / 1e6 * 100:.2f}% of a core at 1000 events/s, "
+          f"report {report_ms:.2f} ms")
+
+
+def bench_rollover(args):
+    """Cost per event of rollover tracking during a ten-finger mash"""
+    from rollover import RolloverTester
+
+    rng = random.Random(0)
+    tester = RolloverTester()
+    tester.start_learning()
+    for keycode in range(38, 48):
+        tester.press(keycode)
+        tester.release(keycode)
+    tester.finish_learning()
+
+    # Hold ten keys, then release them in a random order
+    events = []
+    while len(events) < args.events:
+        keycodes = rng.sample(range(24, 62), 10)
+        events.extend((True, keycode) for keycode in keycodes)
+        rng.shuffle(keycodes)
+        events.extend((False, keycode) for keycode in keycodes)
+
+    start = time.perf_counter_ns()
+    for is_press, keycode in events:
+        if is_press:
+            tester.press(keycode)
+        else:
+            tester.release(keycode)
+    per_event_us = (time.perf_counter_ns() - start) / len(events) / 1000
+    print(f"{len(events)} events, up to {tester.max_held} keys held: "
+          f"{per_event_us:.2f} us per event")
+
+
+def bench_coverage(args):
+    """Cost per press of the key counters, and of repainting one key vs the layout"""
+    app = get_app()  # Keep a reference so the application stays alive
+    from key_coverage import LAYOUTS, KeyCoverage
+    from keyboard_checker import KeyboardLayoutView
+
+    rng = random.Random(0)
+    keycodes = [rng.randrange(9, 136) for _ in range(args.events)]
+    coverage = KeyCoverage()
+    start = time.perf_counter_ns()
+    for keycode in keycodes:
+        coverage.press(keycode)
+    per_press_us = (time.perf_counter_ns() - start) / len(keycodes) / 1000
+    print(f"{len(keycodes)} presses: {per_press_us:.2f} us per press, "
+          f"{coverage.percent:.1f}% of the layout covered")
+
+    view = KeyboardLayoutView(coverage)
+    view.resize(view.sizeHint())
+    view.grab()  # Delivers the resize, which places the keys
+    key = LAYOUTS['full-size'][40]
+    for label, area in (("whole layout", view.rect()), ("one key", view.key_rects[key.keycode])):
+        start = time.perf_counter_ns()
+        for _ in range(args.repaints):
+            view.grab(area)
+        per_paint_ms = (time.perf_counter_ns() - start) / args.repaints / 1e6
+        print(f"Repaint {label:<13} {per_paint_ms:.3f} ms, keys drawn: {view.painted_keys}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    typing_parser = subparsers.add_parser(
+        "typing", help="keystroke cost of typing test coloring")
+    typing_parser.add_argument("--chars", type=int, default=5000,
+                               help="number of characters to type")
+    typing_parser.add_argument("--modes", nargs="+", metavar="MODE",
+                               help="recolor modes to compare (default: all)")
+    typing_parser.set_defaults(func=bench_typing)
+
+    scoring_parser = subparsers.add_parser(
+        "scoring", help="keystroke cost of the Qt-free scoring engine")
+    scoring_parser.add_argument("--chars", type=int, default=5000,
+                                help="number of characters to type")
+    scoring_parser.set_defaults(func=bench_scoring)
+
+    key_names_parser = subparsers.add_parser(
+        "key-names", help="throughput of KeyboardChecker.get_key_name")
+    key_names_parser.add_argument("--calls", type=int, default=200000,
+                                  help="number of lookups to time")
+    key_names_parser.set_defaults(func=bench_key_names)
+
+    modifier_names_parser = subparsers.add_parser(
+        "modifier-names", help="throughput of KeyboardChecker.get_modifier_names")
+    modifier_names_parser.add_argument("--calls", type=int, default=200000,
+                                       help="number of lookups to time")
+    modifier_names_parser.set_defaults(func=bench_modifier_names)
+
+    history_parser = subparsers.add_parser(
+        "history", help="cost of history saves and queries per storage backend")
+    history_parser.add_argument("--results", type=int, default=10000,
+                                help="number of results already in the history")
+    history_parser.add_argument("--backends", nargs="+", metavar="BACKEND",
+                                default=["json", "sqlite"],
+                                help="history backends to compare (default: all)")
+    history_parser.set_defaults(func=bench_history)
+
+    startup_parser = subparsers.add_parser(
+        "startup", help="start-up time percentiles over repeated cold starts")
+    startup_parser.add_argument("--runs", type=int, default=20,
+                                help="number of timed starts")
+    startup_parser.add_argument("--warmup", type=int, default=1,
+                                help="untimed starts first, to fill the OS file cache")
+    startup_parser.set_defaults(func=bench_startup)
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="cost per event of replaying a recorded key session")
+    replay_parser.add_argument("--session", metavar="FILE",
+                               help="session recorded with --record-session "
+                                    "(default: a generated typing session)")
+    replay_parser.add_argument("--chars", type=int, default=2000,
+                               help="characters typed by the generated session")
+    replay_parser.add_argument("--into", nargs="+", metavar="TARGET",
+                               choices=("checker", "typing"), default=["checker", "typing"],
+                               help="widgets to replay into (default: both)")
+    replay_parser.set_defaults(func=bench_replay)
+
+    scan_rate_parser = subparsers.add_parser(
+        "scan-rate", help="cost per event of the scan rate analysis")
+    scan_rate_parser.add_argument("--events", type=int, default=200000,
+                                  help="number of key events to analyze")
+    scan_rate_parser.set_defaults(func=bench_scan_rate)
+
+    rollover_parser = subparsers.add_parser(
+        "rollover", help="cost per event of rollover tracking")
+    rollover_parser.add_argument("--events", type=int, default=200000,
+                                 help="number of key events to track")
+    rollover_parser.set_defaults(func=bench_rollover)
+
+    coverage_parser = subparsers.add_parser(
+        "coverage", help="cost of key counting and coverage repaints")
+    coverage_parser.add_argument("--events", type=int, default=200000,
+                                 help="number of key presses to count")
+    coverage_parser.add_argument("--repaints", type=int, default=200,
+                                 help="number of repaints to time")
+    coverage_parser.set_defaults(func=bench_coverage)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Running typing history summaries - pure Python, no Qt required
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import math
+
+
+class RunningStats:
+    """Count, mean, variance and bests of a stream of test results
+
+    The WPM mean and variance are updated one result at a time with
+    Welford's algorithm, so no past results need to be kept.
+    """
+
+    __slots__ = ('count', 'mean_wpm', '_m2', 'best_wpm', 'best_accuracy')
+
+    def __init__(self):
+        self.count = 0  # Results with a WPM
+        self.mean_wpm = 0.0
+        self._m2 = 0.0  # Sum of squared differences from the mean
+        self.best_wpm = None
+        self.best_accuracy = None
+
+    def add(self, result):
+        """Fold one result dict into the summary"""
+        wpm = result.get('wpm')
+        if wpm is not None:
+            self.count += 1
+            delta = wpm - self.mean_wpm
+            self.mean_wpm += delta / self.count
+            self._m2 += delta * (wpm - self.mean_wpm)
+            if self.best_wpm is None or wpm > self.best_wpm:
+                self.best_wpm = wpm
+
+        accuracy = result.get('accuracy_percent')
+        if accuracy is not None and (self.best_accuracy is None or accuracy > self.best_accuracy):
+            self.best_accuracy = accuracy
+
+    def merge(self, other):
+        """Fold in the statistics of another stream of results
+
+        Uses the pairwise form of Welford's algorithm, so the result is the
+        same as adding both streams' results one at a time.
+        """
+        if other.count:
+            count = self.count + other.count
+            delta = other.mean_wpm - self.mean_wpm
+            self.mean_wpm += delta * other.count / count
+            self._m2 += other._m2 + delta * delta * self.count * other.count / count
+            self.count = count
+            if self.best_wpm is None or other.best_wpm > self.best_wpm:
+                self.best_wpm = other.best_wpm
+        if other.best_accuracy is not None and (
+                self.best_accuracy is None or other.best_accuracy > self.best_accuracy):
+            self.best_accuracy = other.best_accuracy
+
+    @property
+    def wpm_variance(self):
+        """Sample variance of WPM"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def wpm_stdev(self):
+        return math.sqrt(self.wpm_variance)
+
+    def summary(self):
+        """Return the summary as a plain dict"""
+        return {
+            'count': self.count,
+            'mean_wpm': self.mean_wpm,
+            'wpm_stdev': self.wpm_stdev,
+            'best_wpm': self.best_wpm,
+            'best_accuracy': self.best_accuracy,
+        }
+
+    def to_state(self):
+        """Return the exact state as a JSON-serializable list"""
+        return [self.count, self.mean_wpm, self._m2, self.best_wpm, self.best_accuracy]
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild from the list returned by to_state"""
+        stats = cls()
+        stats.count, stats.mean_wpm, stats._m2, stats.best_wpm, stats.best_accuracy = state
+        return stats
+
+
+class HistoryAggregates:
+    """Running statistics over all results and per test duration"""
+
+    def __init__(self, results=()):
+        self.overall = RunningStats()
+        self.by_duration = {}  # duration in seconds -> RunningStats
+        for result in results:
+            self.add(result)
+
+    def add(self, result):
+        """Fold one result dict into the overall and per-duration stats"""
+        self.overall.add(result)
+        duration = result.get('duration')
+        if duration is not None:
+            stats = self.by_duration.get(duration)
+            if stats is None:
+                stats = self.by_duration[duration] = RunningStats()
+            stats.add(result)
+
+    def merge(self, other):
+        """Fold in the statistics of another HistoryAggregates"""
+        self.overall.merge(other.overall)
+        for duration, other_stats in other.by_duration.items():
+            stats = self.by_duration.get(duration)
+            if stats is None:
+                stats = self.by_duration[duration] = RunningStats()
+            stats.merge(other_stats)
+
+    def copy(self):
+        """Return an independent copy"""
+        return self.from_state(self.to_state())
+
+    def get(self, duration_seconds=None):
+        """Return the stats for one duration, or overall for None"""
+        if duration_seconds is None:
+            return self.overall
+        return self.by_duration.get(duration_seconds) or RunningStats()
+
+    def to_state(self):
+        """Return the state as a JSON-serializable dict"""
+        return {
+            'overall': self.overall.to_state(),
+            # JSON object keys are strings, so durations are kept as pairs
+            'by_duration': [[duration, stats.to_state()]
+                            for duration, stats in self.by_duration.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild from the dict returned by to_state"""
+        aggregates = cls()
+        aggregates.overall = RunningStats.from_state(state['overall'])
+        aggregates.by_duration = {duration: RunningStats.from_state(stats)
+                                  for duration, stats in state['by_duration']}
+        return aggregates
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Per-key press counts and keyboard layout coverage - pure Python, no Qt required
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+from typing import NamedTuple
+
+from scan_rate import KEYCODE_LIMIT, keycode_slot
+
+
+class LayoutKey(NamedTuple):
+    """One key of a keyboard layout; positions and sizes are in key widths"""
+    label: str
+    keycode: int  # Native scan code (X11 keycode, evdev code + 8)
+    x: float
+    y: float
+    width: float = 1.0
+
+
+def build_layout(rows):
+    """Place the keys of each row left to right
+
+    Each row is a list of (label, keycode) or (label, keycode, width)
+    tuples, and numbers for gaps of that many key widths.
+    """
+    keys = []
+    for y, row in enumerate(rows):
+        x = 0.0
+        for item in row:
+            if isinstance(item, (int, float)):
+                x += item
+                continue
+            label, keycode, *width = item
+            key = LayoutKey(label, keycode, x, y, *width)
+            keys.append(key)
+            x += key.width
+    return tuple(keys)
+
+
+def letter_keys(labels, first_keycode):
+    """Keys with consecutive keycodes, one per character of labels"""
+    return [(label, first_keycode + i) for i, label in enumerate(labels)]
+
+
+# US ANSI full-size keyboard with X11 keycodes
+FULL_SIZE_ROWS = [
+    [("Esc", 9), 1, *letter_keys(["F1", "F2", "F3", "F4"], 67), 0.5,
+     *letter_keys(["F5", "F6", "F7", "F8"], 71), 0.5,
+     ("F9", 75), ("F10", 76), ("F11", 95), ("F12", 96), 0.25,
+     ("PrtSc", 107), ("ScrLk", 78), ("Pause", 127)],
+    [("`", 49), *letter_keys("1234567890-=", 10), ("Bksp", 22, 2), 0.25,
+     ("Ins", 118), ("Home", 110), ("PgUp", 112), 0.25,
+     ("Num", 77), ("/", 106), ("*", 63), ("-", 82)],
+    [("Tab", 23, 1.5), *letter_keys("QWERTYUIOP[]", 24), ("\\", 51, 1.5), 0.25,
+     ("Del", 119), ("End", 115), ("PgDn", 117), 0.25,
+     ("7", 79), ("8", 80), ("9", 81), ("+", 86)],
+    [("Caps", 66, 1.75), *letter_keys("ASDFGHJKL;'", 38), ("Enter", 36, 2.25), 3.5,
+     ("4", 83), ("5", 84), ("6", 85)],
+    [("Shift", 50, 2.25), *letter_keys("ZXCVBNM,./", 52), ("Shift", 62, 2.75), 1.25,
+     ("Up", 111), 1.25, ("1", 87), ("2", 88), ("3", 89), ("Enter", 104)],
+    [("Ctrl", 37, 1.25), ("Super", 133, 1.25), ("Alt", 64, 1.25), ("Space", 65, 6.25),
+     ("AltGr", 108, 1.25), ("Super", 134, 1.25), ("Menu", 135, 1.25), ("Ctrl", 105, 1.25),
+     0.25, ("Left", 113), ("Down", 116), ("Right", 114), 0.25, ("0", 90, 2), (".", 91)],
+]
+
+FULL_SIZE = build_layout(FULL_SIZE_ROWS)
+NUMPAD_X = 18.5  # Where the numeric keypad starts
+NAVIGATION_X = 15  # Where the navigation keys start
+
+LAYOUTS = {
+    'full-size': FULL_SIZE,
+    'tenkeyless': tuple(key for key in FULL_SIZE if key.x < NUMPAD_X),
+    # 60% boards have just the main block, without the function row
+    'compact': tuple(LayoutKey(key.label, key.keycode, key.x, key.y - 1, key.width)
+                     for key in FULL_SIZE if key.x < NAVIGATION_X and key.y > 0),
+}
+DEFAULT_LAYOUT = 'full-size'
+
+
+class KeyCoverage:
+    """Press counts for every key and how much of a layout has been pressed
+
+    Counts live in one fixed-size array indexed by native scan code, and
+    the number of layout keys pressed at least once is updated as each key
+    is first pressed, so a press costs the same however many keys the
+    layout has.
+    """
+
+    def __init__(self, layout_name=DEFAULT_LAYOUT):
+        self.counts = array('I', bytes(4 * KEYCODE_LIMIT))
+        self.in_layout = bytearray(KEYCODE_LIMIT)
+        self.set_layout(layout_name)
+
+    def set_layout(self, layout_name):
+        """Switch the layout coverage is measured against, keeping the counts"""
+        for key in getattr(self, 'layout', ()):
+            self.in_layout[key.keycode] = 0
+        self.layout_name = layout_name
+        self.layout = LAYOUTS[layout_name]
+        for key in self.layout:
+            self.in_layout[key.keycode] = 1
+        self.covered = sum(1 for key in self.layout if self.counts[key.keycode])
+        self.pressed = sum(1 for count in self.counts if count)
+
+    def reset(self):
+        """Forget all press counts"""
+        self.counts[:] = array('I', bytes(4 * KEYCODE_LIMIT))
+        self.covered = 0
+        self.pressed = 0
+
+    def press(self, keycode):
+        """Count a press; returns the array slot that changed"""
+        slot = keycode_slot(keycode)
+        count = self.counts[slot]
+        if not count:
+            self.pressed += 1
+            if self.in_layout[slot]:
+                self.covered += 1
+        self.counts[slot] = count + 1
+        return slot
+
+    @property
+    def percent(self):
+        """Percent of the layout's keys pressed at least once"""
+        return 100 * self.covered / len(self.layout) if self.layout else 0.0
+
+    def untested(self):
+        """Layout keys not pressed yet"""
+        return [key for key in self.layout if not self.counts[key.keycode]]
+
+    def report(self):
+        """Format the coverage for display"""
+        lines = [f"Layout coverage: {self.covered} of {len(self.layout)} keys "
+                 f"({self.percent:.1f}%)"]
+        untested = self.untested()
+        if untested:
+            lines.append("Untested: " + " ".join(key.label for key in untested))
+        else:
+            lines.append("Every key in the layout has been pressed")
+        extra = self.pressed - self.covered
+        if extra:
+            lines.append(f"Keys pressed outside the layout: {extra}")
+        return "\n".join(lines)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Recorded key event sessions - pure Python, no Qt required
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+from typing import NamedTuple
+
+# A session file is this header followed by one packed record per event
+MAGIC = b"KCKEYS1\n"
+
+# Per-event record: microseconds since the previous event, flags, Qt key,
+# modifier bits, native virtual key, native scan code and the byte length
+# of the UTF-8 text that follows the record
+RECORD = struct.Struct("<IBIIIIB")
+MAX_DELTA_US = 0xFFFFFFFF  # Longer pauses (over 71 minutes) are shortened
+MAX_TEXT_BYTES = 0xFF
+
+RELEASE_FLAG = 0x01
+AUTO_REPEAT_FLAG = 0x02
+
+
+class KeyEventRecord(NamedTuple):
+    """One recorded key press or release
+
+    time_ns is the event's own timestamp in nanoseconds; read_session
+    makes it relative to the first event, at microsecond resolution.
+    """
+    time_ns: int
+    release: bool
+    key: int
+    modifiers: int
+    native_key: int
+    auto_repeat: bool
+    text: str
+    native_scan_code: int = 0
+
+
+def pack_record(record, previous_ns):
+    """Return the bytes of one record, timed relative to previous_ns"""
+    delta_us = min(max(0, (record.time_ns - previous_ns) // 1000), MAX_DELTA_US)
+    flags = (RELEASE_FLAG if record.release else 0) | (AUTO_REPEAT_FLAG if record.auto_repeat else 0)
+    text = record.text.encode('utf-8')[:MAX_TEXT_BYTES]
+    return RECORD.pack(delta_us, flags, record.key, record.modifiers,
+                       record.native_key, record.native_scan_code, len(text)) + text
+
+
+class SessionWriter:
+    """Appends key event records to a session file as they happen
+
+    Records are flushed at least once a second of recorded time, so a crash
+    loses little of a recording.
+    """
+
+    FLUSH_INTERVAL_NS = 1_000_000_000
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.file.flush()  # Even a session cut short at once is a valid file
+        self.previous_ns = None
+        self.flushed_ns = None  # Time of the last record flushed
+        self.count = 0
+
+    def write(self, record):
+        """Append one record"""
+        if self.previous_ns is None:
+            self.previous_ns = self.flushed_ns = record.time_ns
+        self.file.write(pack_record(record, self.previous_ns))
+        self.previous_ns = record.time_ns
+        self.count += 1
+        if record.time_ns - self.flushed_ns >= self.FLUSH_INTERVAL_NS:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered records to the operating system"""
+        self.file.flush()
+        self.flushed_ns = self.previous_ns
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_session(path, records):
+    """Write a whole session file"""
+    with SessionWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+
+
+def read_session(path):
+    """Read a session file into a list of KeyEventRecords
+
+    Raises ValueError if the file is not a session file or is truncated.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"Not a key session file: {path}")
+
+    records = []
+    offset = len(MAGIC)
+    time_ns = 0
+    while offset < len(data):
+        if offset + RECORD.size > len(data):
+            raise ValueError(f"Truncated key session file: {path}")
+        (delta_us, flags, key, modifiers, native_key, scan_code,
+         text_size) = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        text = data[offset:offset + text_size]
+        if len(text) != text_size:
+            raise ValueError(f"Truncated key session file: {path}")
+        offset += text_size
+        time_ns += delta_us * 1000
+        records.append(KeyEventRecord(time_ns, bool(flags & RELEASE_FLAG), key, modifiers,
+                                      native_key, bool(flags & AUTO_REPEAT_FLAG),
+                                      text.decode('utf-8', errors='replace'), scan_code))
+    return records
+
+
+def replay_times(records, speed=1.0):
+    """Return when to send each record, in nanoseconds after replay starts
+
+    speed scales the recorded pace; None or 0 sends everything at once.
+    """
+    if not records:
+        return []
+    if not speed:
+        return [0] * len(records)
+    start_ns = records[0].time_ns
+    return [round((record.time_ns - start_ns) / speed) for record in records]
@@ -18,31 +18,440 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+# First, so the start-up trace includes every other import
+from startup_marks import STARTUP_MARKS, mark_startup
+
+import os
 import sys
 import json
+import time
 import random
-import statistics
+import argparse
+import functools
+import itertools
+from collections import Counter, deque
 from pathlib import Path
-from datetime import datetime
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QTextEdit, QLabel, QPushButton, QHBoxLayout,
+from datetime import datetime, timedelta
+from importlib import import_module
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+mark_startup("import stdlib")
+
+# Imports below follow a start-up mark, hence the noqa comments
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,  # noqa: E402
+                             QTextEdit, QPlainTextEdit, QLabel, QPushButton, QHBoxLayout,
                              QRadioButton, QButtonGroup, QTableWidget,
-                             QTableWidgetItem, QHeaderView, QStackedWidget)
-from PyQt6.QtCore import Qt, QTimer, QEvent
-from PyQt6.QtGui import QKeyEvent, QFont, QTextCharFormat, QColor, QTextCursor
+                             QTableWidgetItem, QHeaderView, QStackedWidget, QComboBox)
+from PyQt6.QtCore import Qt, QTimer, QEvent, QObject, QRect, QSize, pyqtSignal  # noqa: E402
+from PyQt6.QtGui import (QKeyEvent, QFont, QTextCharFormat, QColor, QTextCursor,  # noqa: E402
+                         QSyntaxHighlighter, QWindow, QPainter)
+mark_startup("import PyQt6")
+
+from text_samples import TYPING_SAMPLES  # noqa: E402
+mark_startup("import text_samples")
+
+from history_aggregates import HistoryAggregates  # noqa: E402
+from typing_scorer import (CORRECT, ERROR, OVERFLOW, TypingScorer,  # noqa: E402
+                           compute_statistics, pack_errors, unpack_errors)
+from key_session import KeyEventRecord, SessionWriter, read_session, replay_times  # noqa: E402
+from latency_stats import LatencyStats  # noqa: E402
+from scan_rate import ScanRateAnalyzer  # noqa: E402
+from rollover import RolloverTester  # noqa: E402
+from key_coverage import DEFAULT_LAYOUT, LAYOUTS, KeyCoverage  # noqa: E402
+mark_startup("import helpers")
+
+
+def build_key_names():
+    """Build the Qt key code to name table used by get_key_name"""
+    # Special keys mapping
+    key_names = {
+        Qt.Key.Key_Escape: "ESC",
+        Qt.Key.Key_Tab: "TAB",
+        Qt.Key.Key_Backtab: "BACKTAB",
+        Qt.Key.Key_Backspace: "BACKSPACE",
+        Qt.Key.Key_Return: "RETURN",
+        Qt.Key.Key_Enter: "ENTER",
+        Qt.Key.Key_Insert: "INSERT",
+        Qt.Key.Key_Delete: "DELETE",
+        Qt.Key.Key_Pause: "PAUSE",
+        Qt.Key.Key_Print: "PRINT",
+        Qt.Key.Key_Home: "HOME",
+        Qt.Key.Key_End: "END",
+        Qt.Key.Key_Left: "LEFT ARROW",
+        Qt.Key.Key_Up: "UP ARROW",
+        Qt.Key.Key_Right: "RIGHT ARROW",
+        Qt.Key.Key_Down: "DOWN ARROW",
+        Qt.Key.Key_PageUp: "PAGE UP",
+        Qt.Key.Key_PageDown: "PAGE DOWN",
+        Qt.Key.Key_CapsLock: "CAPS LOCK",
+        Qt.Key.Key_NumLock: "NUM LOCK",
+        Qt.Key.Key_ScrollLock: "SCROLL LOCK",
+        Qt.Key.Key_Space: "SPACE",
+    }
+
+    # Modifier keys name the left-hand key unless RIGHT_MODIFIER_NAMES
+    # matches the native scan code
+    key_names.update({
+        Qt.Key.Key_Shift: "SHIFT (LEFT)",
+        Qt.Key.Key_Control: "CTRL (LEFT)",
+        Qt.Key.Key_Alt: "ALT/OPTION (LEFT)",
+        Qt.Key.Key_AltGr: "ALT GR (RIGHT)",
+        Qt.Key.Key_Meta: "META/SUPER (LEFT)",
+    })
+
+    # F keys
+    for i in range(1, 36):
+        key_names[getattr(Qt.Key, f'Key_F{i}')] = f"F{i}"
+
+    # Media and function keys
+    key_names.update({
+        Qt.Key.Key_VolumeDown: "VOLUME DOWN",
+        Qt.Key.Key_VolumeUp: "VOLUME UP",
+        Qt.Key.Key_VolumeMute: "VOLUME MUTE",
+        Qt.Key.Key_MediaPlay: "MEDIA PLAY",
+        Qt.Key.Key_MediaStop: "MEDIA STOP",
+        Qt.Key.Key_MediaPrevious: "MEDIA PREVIOUS",
+        Qt.Key.Key_MediaNext: "MEDIA NEXT",
+        Qt.Key.Key_MonBrightnessUp: "BRIGHTNESS UP",
+        Qt.Key.Key_MonBrightnessDown: "BRIGHTNESS DOWN",
+    })
+
+    # Keyed by plain int so lookups with event.key() values hash directly
+    return MappingProxyType({int(key): name for key, name in key_names.items()})
+
+
+# Readable names of special keys, built once at import
+KEY_NAMES = build_key_names()
+
+# Modifier keys that exist on both sides of the keyboard
+SIDED_MODIFIER_KEYS = frozenset(int(key) for key in (
+    Qt.Key.Key_Shift, Qt.Key.Key_Control, Qt.Key.Key_Alt, Qt.Key.Key_Meta))
+
+# Right-hand modifier keys by (Qt key, native scan code). On Linux xcb and
+# Wayland the scan code is the X11 keycode, which tells left from right;
+# the native virtual key is the keysym (e.g. Shift_R is 0xffe2)
+RIGHT_MODIFIER_NAMES = MappingProxyType({
+    # Left Shift is typically 0x32 (50), Right Shift is 0x3e (62)
+    (int(Qt.Key.Key_Shift), 0x3e): "SHIFT (RIGHT)",
+    # Left Ctrl is typically 0x25 (37), Right Ctrl is 0x69 (105)
+    (int(Qt.Key.Key_Control), 0x69): "CTRL (RIGHT)",
+    # Left Alt is typically 0x40 (64), Right Alt is 0x6c (108)
+    (int(Qt.Key.Key_Alt), 0x6c): "ALT/OPTION (RIGHT)",
+    # Left Super/Meta is typically 0x85 (133), Right is 0x86 (134)
+    (int(Qt.Key.Key_Meta), 0x86): "META/SUPER (RIGHT)",
+})
+
+
+# Modifier flags and their display names, in display order
+MODIFIER_FLAG_NAMES = (
+    (Qt.KeyboardModifier.ShiftModifier, "SHIFT"),
+    (Qt.KeyboardModifier.ControlModifier, "CTRL"),
+    (Qt.KeyboardModifier.AltModifier, "ALT"),
+    (Qt.KeyboardModifier.MetaModifier, "META"),
+    (Qt.KeyboardModifier.KeypadModifier, "KEYPAD"),
+    (Qt.KeyboardModifier.GroupSwitchModifier, "GROUP SWITCH"),
+)
+
+# The flags above occupy adjacent bits, starting at SHIFT, so the bitmask
+# shifted down indexes a table of every combination
+MODIFIER_SHIFT = Qt.KeyboardModifier.ShiftModifier.value.bit_length() - 1
+MODIFIER_MASK = (1 << len(MODIFIER_FLAG_NAMES)) - 1
+
+
+def build_modifier_names():
+    """Build the display string of every modifier combination"""
+    names = []
+    for index in range(MODIFIER_MASK + 1):
+        bits = index << MODIFIER_SHIFT
+        names.append(" + ".join(name for flag, name in MODIFIER_FLAG_NAMES
+                                if bits & flag.value))
+    return tuple(names)
+
+
+# Modifier display strings, indexed by the shifted modifier bitmask
+MODIFIER_NAMES = build_modifier_names()
+
+
+# Offset from time.perf_counter_ns() to wall-clock nanoseconds, fixed at
+# startup so monotonic timestamps can be shown as clock times
+WALL_CLOCK_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def format_clock_time(perf_ns):
+    """Format a time.perf_counter_ns() timestamp as HH:MM:SS.mmm local time"""
+    wall_ns = perf_ns + WALL_CLOCK_OFFSET_NS
+    seconds, remainder = divmod(wall_ns, 1_000_000_000)
+    return time.strftime("%H:%M:%S", time.localtime(seconds)) + f".{remainder // 1_000_000:03d}"
+
+
+class KeyRecord(NamedTuple):
+    """One captured key event, as kept in the event log
+
+    Times are kept as integers and only formatted for display:
+    received_ns is time.perf_counter_ns() when the handler saw the event,
+    event_time_ms is the event's own QKeyEvent.timestamp().
+    """
+    received_ns: int
+    event_time_ms: int
+    event: str  # 'PRESS'
+    key: int
+    native_key: int
+    text: str
+    key_name: str
+    modifier_names: str
+    interval_ms: Optional[int] = None  # Event time since the previous key event
+
+    @property
+    def display_name(self):
+        """Key name prefixed with any held modifiers"""
+        if self.modifier_names:
+            return f"{self.modifier_names} + {self.key_name}"
+        return self.key_name
+
+    def details(self):
+        """Format the detailed key information shown below the key name"""
+        details = []
+        details.append(f"Key Name: {self.key_name}")
+        details.append(f"Qt Key Code: {self.key} (0x{self.key:04X})")
+        details.append(f"Native Virtual Key: {self.native_key} (0x{self.native_key:04X})")
+        details.append(f"Text: '{self.text}' (empty if special key)" if self.text else "Text: (none - special key)")
+        details.append(f"Modifiers: {self.modifier_names if self.modifier_names else 'None'}")
+        if self.interval_ms is not None:
+            details.append(f"Since Previous Key: {self.interval_ms} ms")
+        return "\n".join(details)
+
+    def log_line(self):
+        """Format the record as an event log line"""
+        timestamp = format_clock_time(self.received_ns)
+        return (f"[{timestamp}] {self.event}: {self.display_name} | "
+                f"Qt:{self.key} Native:0x{self.native_key:04X}")
+
+
+class StartupTrace(QObject):
+    """Times each start-up step up to the main window's first paint and focus
+
+    Steps are marked as they finish and reported to stderr as the time spent
+    in each step and since the trace started, in milliseconds. The trace
+    ends when the watched window has been painted and focused, or after
+    REPORT_TIMEOUT_MS if one of them never happens.
+    """
+
+    ENV_VAR = "KEYBOARD_CHECKER_TRACE_STARTUP"  # Set to enable the trace
+    REPORT_TIMEOUT_MS = 5000
+    FIRST_EVENTS = {QEvent.Type.Paint: "first paint", QEvent.Type.FocusIn: "first focus"}
+
+    def __init__(self, marks=(), quit_when_done=False, stream=None):
+        super().__init__()
+        self.marks = list(marks)
+        self.quit_when_done = quit_when_done
+        self.stream = stream
+        self.window = None
+        self.pending = {}  # Event type -> step still to be marked
+        self.done = False
+
+    def mark(self, step):
+        """Record that a start-up step has just finished"""
+        self.marks.append((step, time.perf_counter_ns()))
+
+    def watch(self, window):
+        """Mark the first paint and focus of the window, then report"""
+        self.window = window
+        self.pending = dict(self.FIRST_EVENTS)
+        window.installEventFilter(self)
+        QTimer.singleShot(self.REPORT_TIMEOUT_MS, self.finish)
+
+    def eventFilter(self, obj, event):
+        step = self.pending.pop(event.type(), None)
+        if step is not None:
+            self.mark(step)
+            if not self.pending:
+                self.finish()
+        return False
+
+    def steps(self):
+        """Return (step, step ms, ms since start) for each step after the first"""
+        if not self.marks:
+            return []
+        start_ns = previous_ns = self.marks[0][1]
+        steps = []
+        for step, mark_ns in self.marks[1:]:
+            steps.append((step, (mark_ns - previous_ns) / 1e6, (mark_ns - start_ns) / 1e6))
+            previous_ns = mark_ns
+        return steps
+
+    def report(self):
+        """Format the trace as a table"""
+        lines = [f"{'Start-up trace (ms)':<24}{'step':>10}{'total':>10}"]
+        for step, step_ms, total_ms in self.steps():
+            lines.append(f"{step:<24}{step_ms:>10.2f}{total_ms:>10.2f}")
+        for step in self.pending.values():
+            lines.append(f"{step:<24}  not seen")
+        return "\n".join(lines)
+
+    def finish(self):
+        """Stop watching the window and print the report, once"""
+        if self.done:
+            return
+        self.done = True
+        if self.window is not None:
+            self.window.removeEventFilter(self)
+        print(self.report(), file=self.stream or sys.stderr, flush=True)
+        if self.quit_when_done:
+            # Closing the last window ends the event loop
+            QTimer.singleShot(0, self.window.close if self.window else QApplication.quit)
+
+
+class KeySessionRecorder(QObject):
+    """Records every key press and release to a session file
+
+    As an application event filter it sees each key event when the window
+    system delivers it to a top-level window, before Qt passes it on to the
+    focused widget, so each event is recorded once in either mode. Replayed
+    events are sent straight to widgets and are not recorded again.
+
+    Events are timed by their own timestamps, not by when they reach the
+    filter, so a recording made on a lagging station keeps the operator's
+    pace rather than the bursts the backlog is delivered in.
+    """
+
+    KEY_EVENTS = (QEvent.Type.KeyPress, QEvent.Type.KeyRelease)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.writer = SessionWriter(path)
+
+    def start(self):
+        QApplication.instance().installEventFilter(self)
+
+    def stop(self):
+        """Stop recording and close the session file"""
+        QApplication.instance().removeEventFilter(self)
+        self.writer.close()
+
+    def eventFilter(self, obj, event):
+        if event.type() in self.KEY_EVENTS and isinstance(obj, QWindow):
+            self.record(event)
+        return False
+
+    def record(self, event):
+        """Append one key event to the session file"""
+        self.writer.write(KeyEventRecord(
+            event.timestamp() * 1_000_000, event.type() == QEvent.Type.KeyRelease,
+            event.key(), event.modifiers().value, event.nativeVirtualKey(),
+            event.isAutoRepeat(), event.text(), event.nativeScanCode()))
+
+
+class ReplayedKeyEvent(QKeyEvent):
+    """Key event carrying its recorded time
 
-from text_samples import TYPING_SAMPLES
+    PyQt6 does not wrap QInputEvent.setTimestamp(), so the time is kept here
+    and returned to the Python handlers that read timestamp().
+    """
+
+    def __init__(self, record):
+        event_type = QEvent.Type.KeyRelease if record.release else QEvent.Type.KeyPress
+        super().__init__(event_type, record.key, Qt.KeyboardModifier(record.modifiers),
+                         record.native_scan_code, record.native_key, 0, record.text,
+                         record.auto_repeat)
+        self.timestamp_ms = record.time_ns // 1_000_000
+
+    def timestamp(self):
+        return self.timestamp_ms
+
+
+class KeySessionReplayer(QObject):
+    """Sends recorded key events to a widget as if they were typed again
+
+    speed scales the recorded pace: 1.0 replays at the original speed, 2.0
+    twice as fast, and None or 0 sends every event at once.
+    """
+
+    finished = pyqtSignal()
+
+    def __init__(self, records, target, speed=1.0, parent=None):
+        super().__init__(parent)
+        self.records = records
+        self.target = target
+        self.speed = speed
+        self.due_ns = replay_times(records, speed)
+        self.position = 0  # Index of the next record to send
+        self.start_ns = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.send_due)
+
+    def send(self, record):
+        QApplication.sendEvent(self.target, ReplayedKeyEvent(record))
+
+    def start(self):
+        """Start replaying from the first record"""
+        self.position = 0
+        self.start_ns = time.perf_counter_ns()
+        if self.speed:
+            self.send_due()
+        else:
+            self.replay_all()
+
+    def replay_all(self):
+        """Send all remaining records now"""
+        for record in self.records[self.position:]:
+            self.send(record)
+        self.position = len(self.records)
+        self.finished.emit()
+
+    def send_due(self):
+        """Send the records that are due, then wait for the next one"""
+        elapsed_ns = time.perf_counter_ns() - self.start_ns
+        while self.position < len(self.records) and self.due_ns[self.position] <= elapsed_ns:
+            self.send(self.records[self.position])
+            self.position += 1
+        if self.position == len(self.records):
+            self.finished.emit()
+            return
+        self.timer.start((self.due_ns[self.position] - elapsed_ns) // 1_000_000)
+
+    def stop(self):
+        self.timer.stop()
 
 
 class KeyboardChecker(QMainWindow):
-    def __init__(self):
+    # Number of key events kept in the event log by default
+    DEFAULT_LOG_CAPACITY = 5000
+    ESCAPE_HOLD_MS = 3000  # Holding ESC this long exits
+    ESCAPE_TRIPLE_NS = 1_000_000_000  # Three ESC presses within this exit
+    LATENCY_REFRESH_MS = 1000  # How often the latency readout is updated
+
+    def __init__(self, log_capacity=DEFAULT_LOG_CAPACITY, batch_updates=False,
+                 history_factory=None, startup_trace=None, latency=None):
         super().__init__()
-        self.escape_press_times = []
-        self.escape_press_timer = None
-        self.escape_hold_timer = None
-        self.escape_hold_start = None
+        # Makes the typing test's history when the typing test is first
+        # shown; the typing test uses TypingHistory() if None
+        self.history_factory = history_factory
+        # Key handling latency histograms (a LatencyStats), or None to not measure
+        self.latency = latency
+        # Most recent key events; older ones are dropped once full
+        self.key_records = deque(maxlen=log_capacity)
+        # In batch mode key events are queued and shown once per display frame
+        self.batch_updates = batch_updates
+        self.pending_records = []
+        self.flush_count = 0
+        self.last_flush_size = 0
+        self.max_flush_size = 0
+        # Monotonic times of the last three ESC presses
+        self.escape_press_times = deque(maxlen=3)
+        # Fires once if ESC is still down when the hold deadline passes
+        self.escape_hold_timer = QTimer(self)
+        self.escape_hold_timer.setSingleShot(True)
+        self.escape_hold_timer.setInterval(self.ESCAPE_HOLD_MS)
+        self.escape_hold_timer.timeout.connect(self.exit_application)
         self.init_ui()
+        if startup_trace is not None:
+            startup_trace.mark("init_ui")
         self.init_mode_switching()
+        if startup_trace is not None:
+            startup_trace.mark("init_mode_switching")
+            startup_trace.watch(self)
 
     def init_ui(self):
         self.setWindowTitle("Keyboard Checker")
@@ -102,8 +511,12 @@ class KeyboardChecker(QMainWindow):
         log_label.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         layout.addWidget(log_label)
 
-        self.event_log = QTextEdit()
+        # Plain-text view with a block limit, so memory and append cost stay
+        # flat no matter how long the checker runs
+        self.event_log = QPlainTextEdit()
         self.event_log.setReadOnly(True)
+        self.event_log.setUndoRedoEnabled(False)
+        self.event_log.setMaximumBlockCount(self.key_records.maxlen)
         self.event_log.setFont(QFont("Monospace", 9))
         self.event_log.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         layout.addWidget(self.event_log)
@@ -120,6 +533,33 @@ class KeyboardChecker(QMainWindow):
         self.mode_switch_btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         layout.addWidget(self.mode_switch_btn)
 
+        # Buttons for the key analysis modes
+        analysis_layout = QHBoxLayout()
+        for page_class in ANALYSIS_PAGES:
+            analysis_btn = QPushButton(page_class.TITLE)
+            analysis_btn.clicked.connect(
+                lambda checked=False, page_class=page_class: self.switch_to_analysis(page_class))
+            analysis_btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+            analysis_layout.addWidget(analysis_btn)
+        layout.addLayout(analysis_layout)
+
+        # Timer flushing queued key events to the widgets in batch mode
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.frame_interval_ms())
+        self.flush_timer.timeout.connect(self.flush_pending)
+        if self.batch_updates:
+            self.statusBar().showMessage("Batched display updates enabled")
+
+        # Latency readout, refreshed on a timer rather than per key event
+        if self.latency is not None:
+            self.latency_label = QLabel(self.latency.status_text())
+            self.statusBar().addPermanentWidget(self.latency_label)
+            self.latency_timer = QTimer(self)
+            self.latency_timer.setInterval(self.LATENCY_REFRESH_MS)
+            self.latency_timer.timeout.connect(self.update_latency_label)
+            self.latency_timer.start()
+
     def showEvent(self, event):
         """Ensure the window has focus when shown"""
         super().showEvent(event)
@@ -128,7 +568,13 @@ class KeyboardChecker(QMainWindow):
 
     def keyPressEvent(self, event: QKeyEvent):
         """Override to capture all key press events"""
-        self.handle_key_press(event)
+        if self.latency is None:
+            self.handle_key_press(event)
+        else:
+            self.latency.add_queue_delay("key press", event.timestamp())
+            start_ns = time.perf_counter_ns()
+            self.handle_key_press(event)
+            self.latency.add_duration("key press", time.perf_counter_ns() - start_ns)
         # Don't call super() to prevent default handling
 
     def keyReleaseEvent(self, event: QKeyEvent):
@@ -138,129 +584,105 @@ class KeyboardChecker(QMainWindow):
 
     def handle_key_press(self, event: QKeyEvent):
         """Handle key press events"""
+        received_ns = time.perf_counter_ns()
+        if self.key_analyzer is not None:
+            # Analysis modes take the key stream instead of the event log
+            self.key_analyzer.key_press(event)
+            if event.key() == Qt.Key.Key_Escape and not event.isAutoRepeat():
+                self.handle_escape_press(received_ns)
+            return
+
         key = event.key()
         key_text = event.text()
         modifiers = event.modifiers()
         native_key = event.nativeVirtualKey()
 
         # Get key name
-        key_name = self.get_key_name(key, key_text, native_key)
+        key_name = self.get_key_name(key, key_text, event.nativeScanCode())
 
         # Get modifier names
         modifier_names = self.get_modifier_names(modifiers)
 
-        # Build display strings
-        display_name = key_name
-        if modifier_names:
-            display_name = f"{modifier_names} + {key_name}"
+        event_time_ms = event.timestamp()
+        interval_ms = None
+        if self.key_records:
+            interval_ms = event_time_ms - self.key_records[-1].event_time_ms
 
-        # Update current key display
-        self.current_key_label.setText(display_name)
+        record = KeyRecord(received_ns, event_time_ms, "PRESS", key, native_key,
+                           key_text, key_name, modifier_names, interval_ms)
+        self.key_records.append(record)
 
-        # Build detailed information
-        details = []
-        details.append(f"Key Name: {key_name}")
-        details.append(f"Qt Key Code: {key} (0x{key:04X})")
-        details.append(f"Native Virtual Key: {native_key} (0x{native_key:04X})")
-        details.append(f"Text: '{key_text}' (empty if special key)" if key_text else "Text: (none - special key)")
-        details.append(f"Modifiers: {modifier_names if modifier_names else 'None'}")
+        if self.batch_updates:
+            # Rendering waits for the next frame; capture never waits on it
+            self.pending_records.append(record)
+            if not self.flush_timer.isActive():
+                self.flush_timer.start()
+        else:
+            self.show_records([record])
 
-        self.details_label.setText("\n".join(details))
+        # Check for escape key; auto-repeat presses while held are ignored
+        if key == Qt.Key.Key_Escape and not event.isAutoRepeat():
+            self.handle_escape_press(received_ns)
 
-        # Log the event
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        log_entry = f"[{timestamp}] PRESS: {display_name} | Qt:{key} Native:0x{native_key:04X}"
-        self.event_log.append(log_entry)
+    def update_latency_label(self):
+        self.latency_label.setText(self.latency.status_text())
+
+    def show_records(self, records):
+        """Show key records in the labels and append them to the event log"""
+        # The labels only ever show the latest key
+        latest = records[-1]
+        self.current_key_label.setText(latest.display_name)
+        self.details_label.setText(latest.details())
+
+        self.event_log.appendPlainText("\n".join(record.log_line() for record in records))
 
         # Scroll to bottom
         self.event_log.verticalScrollBar().setValue(
             self.event_log.verticalScrollBar().maximum()
         )
 
-        # Check for escape key
-        if key == Qt.Key.Key_Escape:
-            self.handle_escape_press()
+    def flush_pending(self):
+        """Show all key events queued since the last display frame"""
+        self.flush_timer.stop()
+        records = self.pending_records
+        if not records:
+            return
+        self.pending_records = []
+        self.show_records(records)
+
+        self.flush_count += 1
+        self.last_flush_size = len(records)
+        self.max_flush_size = max(self.max_flush_size, len(records))
+        if len(records) > 1:
+            self.statusBar().showMessage(
+                f"Coalesced {len(records)} key events into one update "
+                f"(max {self.max_flush_size})")
+
+    def frame_interval_ms(self):
+        """Display frame period in milliseconds, from the screen refresh rate"""
+        screen = QApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen is not None else 0
+        if refresh_rate <= 0:
+            refresh_rate = 60.0
+        return max(1, round(1000 / refresh_rate))
 
     def handle_key_release(self, event: QKeyEvent):
         """Handle key release events"""
+        if self.key_analyzer is not None:
+            self.key_analyzer.key_release(event)
         key = event.key()
 
-        if key == Qt.Key.Key_Escape:
+        # Auto-repeat sends a release before each repeated press
+        if key == Qt.Key.Key_Escape and not event.isAutoRepeat():
             self.handle_escape_release()
 
-    def get_key_name(self, key, text, native_key=0):
+    def get_key_name(self, key, text, scan_code=0):
         """Convert Qt key code to readable name"""
-        # Special keys mapping
-        special_keys = {
-            Qt.Key.Key_Escape: "ESC",
-            Qt.Key.Key_Tab: "TAB",
-            Qt.Key.Key_Backtab: "BACKTAB",
-            Qt.Key.Key_Backspace: "BACKSPACE",
-            Qt.Key.Key_Return: "RETURN",
-            Qt.Key.Key_Enter: "ENTER",
-            Qt.Key.Key_Insert: "INSERT",
-            Qt.Key.Key_Delete: "DELETE",
-            Qt.Key.Key_Pause: "PAUSE",
-            Qt.Key.Key_Print: "PRINT",
-            Qt.Key.Key_Home: "HOME",
-            Qt.Key.Key_End: "END",
-            Qt.Key.Key_Left: "LEFT ARROW",
-            Qt.Key.Key_Up: "UP ARROW",
-            Qt.Key.Key_Right: "RIGHT ARROW",
-            Qt.Key.Key_Down: "DOWN ARROW",
-            Qt.Key.Key_PageUp: "PAGE UP",
-            Qt.Key.Key_PageDown: "PAGE DOWN",
-            Qt.Key.Key_CapsLock: "CAPS LOCK",
-            Qt.Key.Key_NumLock: "NUM LOCK",
-            Qt.Key.Key_ScrollLock: "SCROLL LOCK",
-            Qt.Key.Key_Space: "SPACE",
-        }
-
-        # Handle modifier keys with left/right detection
-        # On Linux X11, native virtual key codes help distinguish left vs right
-        if key == Qt.Key.Key_Shift:
-            # Left Shift is typically 0x32 (50), Right Shift is 0x3e (62)
-            if native_key == 0x3e or native_key == 62:
-                return "SHIFT (RIGHT)"
-            return "SHIFT (LEFT)"
-        elif key == Qt.Key.Key_Control:
-            # Left Ctrl is typically 0x25 (37), Right Ctrl is 0x69 (105)
-            if native_key == 0x69 or native_key == 105:
-                return "CTRL (RIGHT)"
-            return "CTRL (LEFT)"
-        elif key == Qt.Key.Key_Alt:
-            # Left Alt is typically 0x40 (64), Right Alt is 0x6c (108)
-            if native_key == 0x6c or native_key == 108:
-                return "ALT/OPTION (RIGHT)"
-            return "ALT/OPTION (LEFT)"
-        elif key == Qt.Key.Key_AltGr:
-            return "ALT GR (RIGHT)"
-        elif key == Qt.Key.Key_Meta:
-            # Left Super/Meta is typically 0x85 (133), Right is 0x86 (134)
-            if native_key == 0x86 or native_key == 134:
-                return "META/SUPER (RIGHT)"
-            return "META/SUPER (LEFT)"
-
-        # F keys
-        for i in range(1, 36):
-            special_keys[getattr(Qt.Key, f'Key_F{i}')] = f"F{i}"
-
-        # Media and function keys
-        media_keys = {
-            Qt.Key.Key_VolumeDown: "VOLUME DOWN",
-            Qt.Key.Key_VolumeUp: "VOLUME UP",
-            Qt.Key.Key_VolumeMute: "VOLUME MUTE",
-            Qt.Key.Key_MediaPlay: "MEDIA PLAY",
-            Qt.Key.Key_MediaStop: "MEDIA STOP",
-            Qt.Key.Key_MediaPrevious: "MEDIA PREVIOUS",
-            Qt.Key.Key_MediaNext: "MEDIA NEXT",
-            Qt.Key.Key_MonBrightnessUp: "BRIGHTNESS UP",
-            Qt.Key.Key_MonBrightnessDown: "BRIGHTNESS DOWN",
-        }
-        special_keys.update(media_keys)
-
-        if key in special_keys:
-            return special_keys[key]
+        name = KEY_NAMES.get(key)
+        if name is not None:
+            if key in SIDED_MODIFIER_KEYS:
+                return RIGHT_MODIFIER_NAMES.get((key, scan_code), name)
+            return name
 
         # For regular characters
         if text and text.isprintable():
@@ -271,65 +693,47 @@ class KeyboardChecker(QMainWindow):
 
     def get_modifier_names(self, modifiers):
         """Convert Qt modifiers to readable names"""
-        mod_list = []
+        # Accept both Qt.KeyboardModifier flags and plain ints
+        bits = getattr(modifiers, 'value', modifiers)
+        return MODIFIER_NAMES[(bits >> MODIFIER_SHIFT) & MODIFIER_MASK]
 
-        if modifiers & Qt.KeyboardModifier.ShiftModifier:
-            mod_list.append("SHIFT")
-        if modifiers & Qt.KeyboardModifier.ControlModifier:
-            mod_list.append("CTRL")
-        if modifiers & Qt.KeyboardModifier.AltModifier:
-            mod_list.append("ALT")
-        if modifiers & Qt.KeyboardModifier.MetaModifier:
-            mod_list.append("META")
+    def handle_escape_press(self, press_ns=None):
+        """Handle escape key press for exit detection
 
-        return " + ".join(mod_list)
+        press_ns is the time.perf_counter_ns() time of the press.
+        """
+        current_time = time.perf_counter_ns() if press_ns is None else press_ns
 
-    def handle_escape_press(self):
-        """Handle escape key press for exit detection"""
-        current_time = datetime.now()
-
-        # Track escape press times for triple-press detection
+        # Track escape press times for triple-press detection; the deque
+        # keeps only the last 3 presses
         self.escape_press_times.append(current_time)
 
-        # Keep only last 3 presses
-        if len(self.escape_press_times) > 3:
-            self.escape_press_times.pop(0)
-
         # Check for 3 rapid presses (within 1 second)
         if len(self.escape_press_times) == 3:
-            time_diff = (self.escape_press_times[-1] - self.escape_press_times[0]).total_seconds()
-            if time_diff < 1.0:
+            time_diff = self.escape_press_times[-1] - self.escape_press_times[0]
+            if time_diff < self.ESCAPE_TRIPLE_NS:
+                self.escape_hold_timer.stop()
                 self.exit_application()
                 return
 
-        # Start hold timer for 3-second hold detection
-        if self.escape_hold_timer is None:
-            self.escape_hold_start = current_time
-            self.escape_hold_timer = QTimer()
-            self.escape_hold_timer.timeout.connect(self.check_escape_hold)
-            self.escape_hold_timer.start(100)  # Check every 100ms
+        # Arm the hold deadline; a press without a release keeps the first one
+        if not self.escape_hold_timer.isActive():
+            self.escape_hold_timer.start()
 
     def handle_escape_release(self):
         """Handle escape key release"""
-        if self.escape_hold_timer is not None:
-            self.escape_hold_timer.stop()
-            self.escape_hold_timer = None
-            self.escape_hold_start = None
-
-    def check_escape_hold(self):
-        """Check if escape has been held for 3 seconds"""
-        if self.escape_hold_start is not None:
-            hold_duration = (datetime.now() - self.escape_hold_start).total_seconds()
-            if hold_duration >= 3.0:
-                self.exit_application()
+        self.escape_hold_timer.stop()
 
     def exit_application(self):
         """Exit the application"""
-        self.event_log.append("\n=== Exit condition detected. Closing... ===")
+        self.flush_pending()
+        self.event_log.appendPlainText("\n=== Exit condition detected. Closing... ===")
         QTimer.singleShot(500, self.close)
 
     def clear_log(self):
         """Clear the event log"""
+        self.pending_records = []
+        self.key_records.clear()
         self.event_log.clear()
 
     def init_mode_switching(self):
@@ -340,12 +744,34 @@ class KeyboardChecker(QMainWindow):
         # Get the current central widget (keyboard checker)
         self.keyboard_checker_widget = self.centralWidget()
 
+        # The typing test page is built the first time it is shown, so
+        # starting the key checker never reads the typing history
+        self.typing_test = None
+        self.typing_test_widget = QWidget()  # Placeholder until then
+
+        # Key analysis pages, built when first shown; the one being shown
+        # gets the key events
+        self.analysis_pages = {}
+        self.key_analyzer = None
+
+        # Add both widgets to stacked widget
+        self.stacked_widget.addWidget(self.keyboard_checker_widget)
+        self.stacked_widget.addWidget(self.typing_test_widget)
+
+        # Set stacked widget as central widget
+        self.setCentralWidget(self.stacked_widget)
+
+    def build_typing_test(self):
+        """Build the typing test page in place of its placeholder"""
+        placeholder = self.typing_test_widget
+
         # Create typing test widget
         self.typing_test_widget = QWidget()
         typing_test_layout = QVBoxLayout(self.typing_test_widget)
 
         # Add typing test
-        self.typing_test = TypingTest()
+        history = self.history_factory() if self.history_factory is not None else None
+        self.typing_test = TypingTest(history=history, latency=self.latency)
         typing_test_layout.addWidget(self.typing_test)
 
         # Add back button
@@ -353,99 +779,1371 @@ class KeyboardChecker(QMainWindow):
         back_btn.clicked.connect(self.switch_to_keyboard_checker)
         typing_test_layout.addWidget(back_btn)
 
-        # Add both widgets to stacked widget
-        self.stacked_widget.addWidget(self.keyboard_checker_widget)
-        self.stacked_widget.addWidget(self.typing_test_widget)
+        index = self.stacked_widget.indexOf(placeholder)
+        self.stacked_widget.insertWidget(index, self.typing_test_widget)
+        self.stacked_widget.removeWidget(placeholder)
+        placeholder.deleteLater()
 
-        # Set stacked widget as central widget
-        self.setCentralWidget(self.stacked_widget)
+    def closeEvent(self, event):
+        """Finish writing queued typing test results before closing"""
+        if self.typing_test is not None:
+            self.typing_test.history_writer.stop()
+        super().closeEvent(event)
 
     def switch_to_typing_test(self):
         """Switch to typing test mode"""
+        if self.typing_test is None:
+            self.build_typing_test()
+        self.key_analyzer = None
         self.setWindowTitle("Keyboard Checker - Typing Test")
         self.stacked_widget.setCurrentWidget(self.typing_test_widget)
 
     def switch_to_keyboard_checker(self):
         """Switch back to keyboard checker mode"""
+        self.key_analyzer = None
         self.setWindowTitle("Keyboard Checker")
         self.stacked_widget.setCurrentWidget(self.keyboard_checker_widget)
         self.setFocus()
         self.activateWindow()
 
+    def switch_to_analysis(self, page_class):
+        """Switch to a key analysis mode, building its page on first use"""
+        page = self.analysis_pages.get(page_class)
+        if page is None:
+            page = self.analysis_pages[page_class] = page_class(self.get_key_name)
+            page.back_requested.connect(self.switch_to_keyboard_checker)
+            self.stacked_widget.addWidget(page)
+        self.key_analyzer = page
+        self.setWindowTitle(f"Keyboard Checker - {page.TITLE}")
+        self.stacked_widget.setCurrentWidget(page)
+        self.setFocus()
 
-class TypingHistory:
-    """Manages typing test history storage and retrieval"""
 
-    def __init__(self):
+class KeyAnalysisPage(QWidget):
+    """Base class of the key checker modes that analyze the key stream
+
+    While a page is shown the key checker hands it every key press and
+    release instead of logging them. Pages fold each event into their
+    analysis as it arrives, mark themselves dirty, and are redrawn by a
+    timer at most every REFRESH_MS, so display cost doesn't grow with the
+    event rate. Subclasses set TITLE and override the analysis methods they
+    need; the defaults add nothing and ignore every key.
+
+    key_namer is called with (key, text, scan_code) to name keys, as
+    KeyboardChecker.get_key_name does.
+    """
+
+    TITLE = ""
+    REFRESH_MS = 250
+
+    back_requested = pyqtSignal()
+
+    def __init__(self, key_namer=None, parent=None):
+        super().__init__(parent)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.key_namer = key_namer or (lambda key, text, scan_code: text or f"0x{key:X}")
+        self.dirty = False
+        layout = QVBoxLayout(self)
+
+        title = QLabel(self.TITLE)
+        title.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title)
+
+        self.init_content(layout)
+
+        self.report_label = QLabel(self.report_text())
+        self.report_label.setFont(QFont("Monospace", 10))
+        self.report_label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self.report_label.setWordWrap(True)
+        self.report_label.setStyleSheet(
+            "background-color: #f5f5f5; padding: 10px; border-radius: 5px;"
+        )
+        layout.addWidget(self.report_label, 1)
+
+        buttons_layout = QHBoxLayout()
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset_analysis)
+        back_btn = QPushButton("Switch to Keyboard Checker")
+        back_btn.clicked.connect(self.back_requested.emit)
+        for button in (reset_btn, back_btn):
+            button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+            buttons_layout.addWidget(button)
+        layout.addLayout(buttons_layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh_if_dirty)
+
+    def init_content(self, layout):
+        """Create the analysis and add any widgets shown above its report"""
+
+    def key_press(self, event: QKeyEvent):
+        pass
+
+    def key_release(self, event: QKeyEvent):
+        pass
+
+    def reset(self):
+        pass
+
+    def report_text(self):
+        return ""
+
+    def refresh(self):
+        self.report_label.setText(self.report_text())
+
+    def reset_analysis(self):
+        """Forget everything measured so far"""
+        self.reset()
+        self.dirty = False
+        self.refresh()
+
+    def refresh_if_dirty(self):
+        if self.dirty:
+            self.dirty = False
+            self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+
+class ScanRatePage(KeyAnalysisPage):
+    """Measures how fast the keyboard and its driver deliver key events"""
+
+    TITLE = "Scan Rate Analyzer"
+
+    def init_content(self, layout):
+        self.analyzer = ScanRateAnalyzer()
+
+        instructions = QLabel(
+            "Type, roll across keys or hold a key down.\n"
+            "Times come from each event's own timestamp, so they show when the "
+            "device and driver delivered it."
+        )
+        instructions.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(instructions)
+
+    def key_press(self, event: QKeyEvent):
+        self.analyzer.press(event.nativeScanCode(), event.timestamp(), event.isAutoRepeat())
+        self.dirty = True
+
+    def key_release(self, event: QKeyEvent):
+        self.analyzer.release(event.nativeScanCode(), event.timestamp(), event.isAutoRepeat())
+        self.dirty = True
+
+    def reset(self):
+        self.analyzer.reset()
+
+    def report_text(self):
+        return self.analyzer.report()
+
+
+class RolloverPage(KeyAnalysisPage):
+    """Shows how many keys register at once and which presses were dropped"""
+
+    TITLE = "Rollover Test"
+
+    def init_content(self, layout):
+        self.tester = RolloverTester()
+
+        instructions = QLabel(
+            "Hold down as many keys as you can: the most held at once is the "
+            "keyboard's rollover.\n"
+            "To check a chord for ghosting or blocking, click \"Learn Chord\", "
+            "press each of its keys one at a time, click \"Test Chord\", then "
+            "hold the whole chord down and release it."
+        )
+        instructions.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        instructions.setWordWrap(True)
+        layout.addWidget(instructions)
+
+        self.chord_btn = QPushButton("Learn Chord")
+        self.chord_btn.clicked.connect(self.toggle_learning)
+        self.chord_btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        layout.addWidget(self.chord_btn)
+
+    def toggle_learning(self):
+        """Start learning a chord, or start testing the learned one"""
+        if self.tester.learning:
+            self.tester.finish_learning()
+            self.chord_btn.setText("Learn Chord")
+        else:
+            self.tester.start_learning()
+            self.chord_btn.setText("Test Chord")
+        self.refresh()
+
+    def key_press(self, event: QKeyEvent):
+        # Auto-repeat releases and presses would look like the key bouncing
+        if event.isAutoRepeat():
+            return
+        self.tester.press(event.nativeScanCode(),
+                          self.key_namer(event.key(), event.text(), event.nativeScanCode()))
+        self.dirty = True
+
+    def key_release(self, event: QKeyEvent):
+        if event.isAutoRepeat():
+            return
+        self.tester.release(event.nativeScanCode())
+        self.dirty = True
+
+    def reset(self):
+        self.tester.reset()
+
+    def report_text(self):
+        return self.tester.report()
+
+
+class KeyboardLayoutView(QWidget):
+    """Draws a keyboard layout, coloring the keys that have been pressed
+
+    Keys are repainted one at a time: key_changed() invalidates only that
+    key's rectangle, and paintEvent only draws keys inside the invalidated
+    area, so a press never redraws the whole keyboard.
+    """
+
+    MAX_UNIT_PX = 40  # Width of a 1u key
+    UNTESTED_COLOR = QColor(224, 224, 224)
+    TESTED_COLOR = QColor(140, 210, 140)
+
+    def __init__(self, coverage, parent=None):
+        super().__init__(parent)
+        self.coverage = coverage
+        self.key_rects = {}  # Scan code -> QRect of the key
+        self.painted_keys = 0  # Keys drawn by the last paint
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setMinimumSize(300, 120)
+        self.place_keys()
+
+    def layout_units(self):
+        """Width and height of the layout in key widths"""
+        layout = self.coverage.layout
+        if not layout:
+            return 1, 1
+        return (max(key.x + key.width for key in layout),
+                max(key.y for key in layout) + 1)
+
+    def sizeHint(self):
+        width, height = self.layout_units()
+        return QSize(round(width * self.MAX_UNIT_PX), round(height * self.MAX_UNIT_PX))
+
+    def place_keys(self):
+        """Work out each key's rectangle for the current size and layout"""
+        width, height = self.layout_units()
+        unit = max(8, int(min(self.MAX_UNIT_PX, self.width() / width, self.height() / height)))
+        # Keys are inset so that neighbouring rectangles never overlap
+        self.key_rects = {
+            key.keycode: QRect(round(key.x * unit), round(key.y * unit),
+                               round(key.width * unit) - 3, unit - 3)
+            for key in self.coverage.layout
+        }
+
+    def set_layout(self):
+        """Redraw everything after the coverage layout changed"""
+        self.place_keys()
+        self.update()
+
+    def key_changed(self, keycode):
+        """Schedule a repaint of one key"""
+        rect = self.key_rects.get(keycode)
+        if rect is not None:
+            self.update(rect)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.place_keys()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        area = event.rect()
+        counts = self.coverage.counts
+        painted = 0
+        for key in self.coverage.layout:
+            rect = self.key_rects[key.keycode]
+            if not rect.intersects(area):
+                continue
+            count = counts[key.keycode]
+            painter.fillRect(rect, self.TESTED_COLOR if count else self.UNTESTED_COLOR)
+            painter.drawRect(rect)
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter,
+                             f"{key.label}\n{count}" if count else key.label)
+            painted += 1
+        painter.end()
+        self.painted_keys = painted
+
+
+class CoveragePage(KeyAnalysisPage):
+    """Counts presses of every key and shows which keys of a layout are untested"""
+
+    TITLE = "Key Coverage"
+
+    def init_content(self, layout):
+        self.coverage = KeyCoverage()
+        # Keys pressed since the last refresh, repainted by the next one
+        self.changed = bytearray(len(self.coverage.counts))
+        self.changed_keys = []
+
+        instructions = QLabel(
+            "Press every key once. Tested keys turn green and show how many "
+            "times they were pressed."
+        )
+        instructions.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(instructions)
+
+        layout_row = QHBoxLayout()
+        layout_row.addWidget(QLabel("Layout:"))
+        self.layout_combo = QComboBox()
+        self.layout_combo.addItems(LAYOUTS)
+        self.layout_combo.setCurrentText(DEFAULT_LAYOUT)
+        self.layout_combo.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.layout_combo.currentTextChanged.connect(self.set_layout)
+        layout_row.addWidget(self.layout_combo)
+        layout_row.addStretch()
+        layout.addLayout(layout_row)
+
+        self.layout_view = KeyboardLayoutView(self.coverage)
+        layout.addWidget(self.layout_view, 2)
+
+    def set_layout(self, layout_name):
+        self.coverage.set_layout(layout_name)
+        self.layout_view.set_layout()
+        self.refresh()
+
+    def key_press(self, event: QKeyEvent):
+        if event.isAutoRepeat():
+            return
+        slot = self.coverage.press(event.nativeScanCode())
+        if not self.changed[slot]:
+            self.changed[slot] = 1
+            self.changed_keys.append(slot)
+        self.dirty = True
+
+    def reset(self):
+        self.coverage.reset()
+        for slot in self.changed_keys:
+            self.changed[slot] = 0
+        self.changed_keys.clear()
+        self.layout_view.update()
+
+    def refresh(self):
+        for slot in self.changed_keys:
+            self.changed[slot] = 0
+            self.layout_view.key_changed(slot)
+        self.changed_keys.clear()
+        super().refresh()
+
+    def report_text(self):
+        return self.coverage.report()
+
+
+# Key analysis modes offered on the key checker page, in button order
+ANALYSIS_PAGES = (ScanRatePage, RolloverPage, CoveragePage)
+
+
+def synchronized(method):
+    """Run a history method holding the history's lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class TypingHistory:
+    """Manages typing test history storage and retrieval
+
+    Results outside the retention policy (keep_results, keep_days) are moved
+    to compressed archives, which stay readable through archived_results()
+    and the include_archived options. Methods can be called from several
+    threads.
+    """
+
+    LEGACY_FILE_NAME = "typing_history.json"
+    TAIL_BLOCK_SIZE = 8192  # Bytes read at a time when reading backwards
+    # Archive segment compression: name -> (file suffix, module providing
+    # open()); the module is only imported once archives are used
+    ARCHIVE_FORMATS = {
+        'gzip': ('.gz', 'gzip'),
+        'lzma': ('.xz', 'lzma'),
+    }
+    ARCHIVE_BATCH = 100  # Results due before the history file is rewritten
+    COMPACT_MODES = ('drop', 'summarize')
+
+    def __init__(self, keep_results=None, keep_days=None, archive_format='gzip'):
+        if archive_format not in self.ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.keep_results = keep_results
+        self.keep_days = keep_days
+        self.archive_format = archive_format
+        # Histories are made when the typing test is opened, so threading
+        # isn't imported at start-up
+        self._lock = import_module('threading').RLock()
         self.history_dir = Path.home() / ".local" / "share" / "keyboard-checker"
-        self.history_file = self.history_dir / "typing_history.json"
+        self.history_file = self.history_dir / "typing_history.jsonl"
+        self._checked_file = None  # History file already checked for migration
+        # Parsed results are only re-read when the file's mtime, size or
+        # inode changes, e.g. after another instance saved a result;
+        # cache_hits and cache_misses count how queries were served
+        self._cache = None  # Results parsed from the history file
+        self._cache_signature = None  # File state the cache was read from
+        # Count, average and best results are kept up to date as results are
+        # saved, in a summary file next to the history, so summary queries
+        # never read the history. The history file and the archives are
+        # summarized separately: results appended by another program are
+        # folded in from the end of the file, and only a truncated or
+        # replaced file is summarized again from scratch
+        self._aggregates = None  # Running summaries of all results
+        self._live_aggregates = None  # Running summaries of the history file
+        self._aggregates_signature = None  # File state the summaries describe
+        self._archive_aggregates = None  # Running summaries of the archives
+        self._archive_signature = None  # Archive segments the summaries describe
+        self.cache_hits = 0
+        self.cache_misses = 0
         self._ensure_history_dir()
 
     def _ensure_history_dir(self):
         """Create history directory if it doesn't exist"""
         self.history_dir.mkdir(parents=True, exist_ok=True)
 
+    def _migrate_legacy(self):
+        """Convert a JSON array history file to one result per line
+
+        Handles both an old-style file at history_file itself and the old
+        typing_history.json next to it. The converted file is written to a
+        temporary file and renamed over history_file, so an interrupted
+        migration leaves the original intact.
+        """
+        if self._checked_file == self.history_file:
+            return
+        self._checked_file = self.history_file
+
+        source = self.history_file
+        if not source.exists():
+            source = self.history_dir / self.LEGACY_FILE_NAME
+            if source == self.history_file or not source.exists():
+                return
+
+        results = self._read_legacy(source)
+        if results is None:
+            return
+
+        try:
+            self._write_atomically(self.history_file, self._encode_lines(results))
+            if source != self.history_file:
+                source.rename(source.with_name(source.name + '.bak'))
+        except IOError:
+            pass  # Keep using the old file's results next time
+
+    @staticmethod
+    def _read_legacy(path):
+        """Return the results of a JSON array file, or None for other files"""
+        try:
+            with open(path, 'r') as f:
+                # JSON lines start with an object, the old format with an array
+                first = f.read(1)
+                while first.isspace():
+                    first = f.read(1)
+                if first != '[':
+                    return None
+                f.seek(0)
+                results = json.load(f)
+        except (ValueError, IOError):
+            return None  # Corrupted, unreadable or binary (e.g. SQLite) file
+        return [result for result in results if isinstance(result, dict)]
+
+    @classmethod
+    def read_file(cls, path):
+        """Read the results of a history file in either JSON format"""
+        results = cls._read_legacy(path)
+        if results is not None:
+            return results
+
+        results = []
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    result = cls._decode(line)
+                    if result is not None:
+                        results.append(result)
+        except IOError:
+            return []  # Missing or unreadable file
+        return results
+
+    @classmethod
+    def read_tail(cls, path, n, block_size=TAIL_BLOCK_SIZE):
+        """Read the last n results of a JSON lines history file
+
+        Reads backwards from the end of the file a block at a time and stops
+        as soon as it has n results, so the cost does not depend on how long
+        the history is.
+        """
+        results = []
+        try:
+            with open(path, 'rb') as f:
+                position = f.seek(0, os.SEEK_END)
+                head = b''  # Start of a line that continues in the next block
+                while position > 0 and len(results) < n:
+                    size = min(block_size, position)
+                    position -= size
+                    f.seek(position)
+                    lines = (f.read(size) + head).split(b'\n')
+                    # The first line is only complete at the start of the file
+                    head = lines.pop(0) if position > 0 else b''
+                    for line in reversed(lines):
+                        result = cls._decode(line)
+                        if result is not None:
+                            results.append(result)
+                            if len(results) == n:
+                                break
+        except IOError:
+            return []  # Missing or unreadable file
+        results.reverse()
+        return results
+
+    @staticmethod
+    def _decode(line):
+        """Decode one line of JSON, returning None unless it holds a result"""
+        if not line.strip():
+            return None
+        try:
+            result = json.loads(line)
+        except ValueError:
+            return None  # Skip a corrupted or partially written line
+        return result if isinstance(result, dict) else None
+
+    @staticmethod
+    def _dumps(result):
+        """Encode one result as compact JSON, packing its error details
+
+        error_details lists are stored as error_columns: int32 positions
+        and one string each of typed and expected characters, which take a
+        fraction of the space and parse as three strings.
+        """
+        details = result.get('error_details')
+        if details is not None:
+            try:
+                columns = pack_errors(details)
+            except (ValueError, TypeError, OverflowError):
+                pass  # Keep unusual details as they are
+            else:
+                result = dict(result)
+                del result['error_details']
+                result['error_columns'] = columns
+        return json.dumps(result, separators=(',', ':'))
+
+    @classmethod
+    def _encode(cls, result):
+        """Encode one result as a line of JSON"""
+        return cls._dumps(result) + '\n'
+
+    @classmethod
+    def _encode_lines(cls, results):
+        """Encode results as UTF-8 lines of JSON"""
+        return (cls._encode(result).encode('utf-8') for result in results)
+
+    @staticmethod
+    def _write_atomically(path, chunks, opener=None):
+        """Replace a file with the given bytes chunks, crash safely
+
+        The data is written to a temporary file, optionally through a
+        compressing opener such as gzip.open, flushed to disk and then
+        renamed over path, so a crash leaves either the old or the new file.
+        """
+        temp_file = path.with_name(path.name + '.tmp')
+        with open(temp_file, 'wb') as raw:
+            if opener is None:
+                raw.writelines(chunks)
+            else:
+                with opener(raw, 'wb') as f:
+                    f.writelines(chunks)
+            raw.flush()
+            os.fsync(raw.fileno())
+        temp_file.replace(path)
+
+    @staticmethod
+    def get_error_details(result):
+        """Return a saved result's (char_index, typed, expected) errors
+
+        Saved results keep their errors packed until they are asked for, so
+        loading and querying the history never builds these lists.
+        """
+        columns = result.get('error_columns')
+        if columns is not None:
+            return unpack_errors(columns)
+        return [tuple(error) for error in result.get('error_details', [])]
+
+    def _file_signature(self):
+        """Return the path, mtime, size and inode identifying the file's contents"""
+        try:
+            stat = self.history_file.stat()
+        except OSError:
+            return (self.history_file, None)
+        return (self.history_file, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _cached_results(self):
+        """Return the cached results, re-reading the file if it changed
+
+        The returned list is the cache itself and must not be modified.
+        """
+        self._migrate_legacy()
+        # Stat before reading, so a write during the read is seen next time
+        signature = self._file_signature()
+        if self._cache is not None and signature == self._cache_signature:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            self._cache = self.read_file(self.history_file)
+            self._cache_signature = signature
+        return self._cache
+
+    @synchronized
     def load_history(self):
         """Load typing test history from file"""
-        if not self.history_file.exists():
-            return []
+        return list(self._cached_results())
+
+    def _summary_file(self):
+        """Return the path of the summary file kept next to the history"""
+        return self.history_file.with_name(self.history_file.name + '.summary.json')
+
+    def _current_aggregates(self):
+        """Return running summaries matching the history file and archives
+
+        They come from memory or the summary file when those describe the
+        files as they are now. Results appended to the history since are
+        folded in from the end of the file and new archive segments are read
+        on their own; anything else is summarized again from the files.
+        """
+        self._migrate_legacy()
+        signature = self._file_signature()
+        if self._aggregates is not None and signature == self._aggregates_signature:
+            return self._aggregates
+
+        if self._aggregates is not None and self._aggregates_signature[0] == self.history_file:
+            live, known = self._live_aggregates, self._aggregates_signature[1:]
+            archive, known_segments = self._archive_aggregates, self._archive_signature
+        else:
+            live, known, archive, known_segments = self._read_summary()
+
+        if live is None or known != signature[1:]:
+            if live is None or not self._fold_appended(live, known, signature):
+                live = HistoryAggregates(self._cached_results())
 
+        segments = self._archive_state()
+        if archive is None or segments[:len(known_segments)] != known_segments:
+            archive = HistoryAggregates(self.archived_results())
+        else:
+            for name, _, _ in segments[len(known_segments):]:
+                try:
+                    for result in self._read_segment(self.archive_dir / name):
+                        archive.add(result)
+                except (IOError, EOFError):
+                    continue  # Skip a damaged segment
+
+        self._set_aggregates(live, signature, archive, segments)
+        self._write_summary()
+        return self._aggregates
+
+    def _set_aggregates(self, live, signature, archive, segments):
+        """Keep summaries of the history file and archives in the given states"""
+        self._live_aggregates = live
+        self._aggregates_signature = signature
+        self._archive_aggregates = archive
+        self._archive_signature = segments
+        self._aggregates = archive.copy()
+        self._aggregates.merge(live)
+
+    def _read_summary(self):
+        """Return the live and archive summaries and the states they describe
+
+        Everything is None if the summary file is missing or unreadable.
+        """
         try:
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            # Corrupted or unreadable file
-            return []
+            with open(self._summary_file(), 'r') as f:
+                state = json.load(f)
+            return (HistoryAggregates.from_state(state['live']), tuple(state['signature']),
+                    HistoryAggregates.from_state(state['archive']),
+                    [tuple(segment) for segment in state['archive_signature']])
+        except (IOError, ValueError, KeyError, TypeError):
+            return None, None, None, None  # Missing, corrupted or old summary file
+
+    def _fold_appended(self, live, known, signature):
+        """Add results appended since the file was in the known state
+
+        Returns False, leaving live unchanged, unless the file is the same
+        one, has only grown, and the known part ended with a whole line.
+        """
+        if known is None or len(known) != 3 or len(signature) != 4:
+            return False
+        _, known_size, known_inode = known
+        _, _, size, inode = signature
+        if inode != known_inode or size < known_size:
+            return False  # Replaced or truncated
+        try:
+            with open(self.history_file, 'rb') as f:
+                if known_size > 0:
+                    f.seek(known_size - 1)
+                    if f.read(1) != b'\n':
+                        return False
+                # Up to the size in signature, so the next check starts there
+                tail = f.read(size - known_size)
+        except IOError:
+            return False
+        for line in tail.split(b'\n'):
+            result = self._decode(line)
+            if result is not None:
+                live.add(result)
+        return True
+
+    def _write_summary(self):
+        """Save the running summaries for the files' current states"""
+        signature = self._aggregates_signature
+        if signature is None or signature[1] is None:
+            return  # No history file to describe
+        state = {'signature': signature[1:], 'live': self._live_aggregates.to_state(),
+                 'archive_signature': self._archive_signature,
+                 'archive': self._archive_aggregates.to_state()}
+        try:
+            self._write_atomically(self._summary_file(), [json.dumps(state).encode('utf-8')])
+        except IOError:
+            pass  # The summaries are rebuilt from the history next time
 
+    @synchronized
     def save_result(self, result):
         """Append a new result to history"""
-        history = self.load_history()
-        history.append(result)
+        aggregates = self._current_aggregates()
+        line = self._encode(result)
+        signature = self._file_signature()
 
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(history, f, indent=2)
+            with open(self.history_file, 'ab+') as f:
+                # Start on a new line if an earlier write was cut short
+                if f.tell() > 0:
+                    f.seek(-1, 2)
+                    if f.read(1) != b'\n':
+                        line = '\n' + line
+                f.write(line.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
         except IOError:
-            pass  # Fail silently if can't write
-
-    def get_all_results(self):
+            return  # Fail silently if can't write
+
+        # Keep an up to date cache current, storing the result as reloading it would
+        saved = json.loads(line)
+        new_signature = self._file_signature()
+        if self._cache is not None and signature == self._cache_signature:
+            self._cache.append(saved)
+            self._cache_signature = new_signature
+        if signature == self._aggregates_signature:
+            self._live_aggregates.add(saved)
+            aggregates.add(saved)
+            self._aggregates_signature = new_signature
+            self._write_summary()
+
+        self.apply_retention()
+
+    @property
+    def archive_dir(self):
+        return self.history_dir / "archive"
+
+    def _segment_prefix(self, history_file=None):
+        """Return the start of this history file's archive segment names
+
+        It includes the file's suffix, so the JSON and SQLite histories in
+        one directory never read each other's segments.
+        """
+        return (history_file or self.history_file).name + '-'
+
+    def archive_segments(self, history_file=None):
+        """Return the archive segment files, oldest first
+
+        With history_file, those of another history file in this directory.
+        """
+        prefix = self._segment_prefix(history_file)
+        suffixes = [suffix for suffix, _ in self.ARCHIVE_FORMATS.values()]
+        segments = []
+        for path in self.archive_dir.glob(prefix + '*.jsonl.*'):
+            number = path.name[len(prefix):].split('.', 1)[0]
+            if number.isdigit() and path.suffix in suffixes:
+                segments.append((int(number), path))
+        return [path for _, path in sorted(segments)]
+
+    def _next_segment(self):
+        """Return the path for a new archive segment"""
+        segments = self.archive_segments()
+        number = int(segments[-1].name.split('-')[-1].split('.')[0]) + 1 if segments else 1
+        suffix = self.ARCHIVE_FORMATS[self.archive_format][0]
+        return self.archive_dir / f"{self._segment_prefix()}{number:04d}.jsonl{suffix}"
+
+    def _archive_state(self):
+        """Return the name, size and mtime of each archive segment, oldest first"""
+        state = []
+        for path in self.archive_segments():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state.append((path.name, stat.st_size, stat.st_mtime_ns))
+        return state
+
+    def _segment_module(self, path):
+        """Return the compression module of an archive segment"""
+        for suffix, module in self.ARCHIVE_FORMATS.values():
+            if path.suffix == suffix:
+                return import_module(module)
+        raise ValueError(f"Not an archive segment: {path}")
+
+    def _read_segment(self, path):
+        """Read the results of one archive segment
+
+        A damaged segment raises IOError or EOFError, whatever its format.
+        """
+        module = self._segment_module(path)
+        # gzip reports damage as OSError or EOFError, lzma with its own error
+        damaged = getattr(module, 'LZMAError', ())
+        try:
+            with module.open(path, 'rb') as f:
+                return [result for result in map(self._decode, f) if result is not None]
+        except damaged as error:
+            raise IOError(f"Damaged archive segment: {path}") from error
+
+    def _write_segment(self, path, results):
+        """Write an archive segment through a temporary file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomically(path, self._encode_lines(results),
+                               self._segment_module(path).open)
+
+    def archived_results(self):
+        """Yield the archived results, oldest first"""
+        for path in self.archive_segments():
+            try:
+                yield from self._read_segment(path)
+            except (IOError, EOFError):
+                continue  # Skip a damaged segment
+
+    def _archived_tail(self, n):
+        """Return the last n archived results"""
+        results = []
+        for path in reversed(self.archive_segments()):
+            if len(results) >= n:
+                break
+            try:
+                results = self._read_segment(path)[-(n - len(results)):] + results
+            except (IOError, EOFError):
+                continue  # Skip a damaged segment
+        return results
+
+    def _retention_cutoff(self):
+        """Return the timestamp before which results may be archived, or None"""
+        if self.keep_days is None:
+            return None
+        return (datetime.now() - timedelta(days=self.keep_days)).isoformat()
+
+    @synchronized
+    def apply_retention(self, force=False):
+        """Move results outside the retention policy to a new archive segment
+
+        A result is archived when it is neither among the last keep_results
+        results nor newer than keep_days days. Unless force is set, nothing
+        happens until ARCHIVE_BATCH results are due, so the history file is
+        not rewritten on every save. Returns the number of results archived.
+        """
+        if self.keep_results is None and self.keep_days is None:
+            return 0
+
+        self._current_aggregates()
+        signature = self._file_signature()
+        segments = self._archive_state()
+        results = self._cached_results()
+        first_kept = len(results) - self.keep_results if self.keep_results is not None else len(results)
+        cutoff = self._retention_cutoff()
+        archived = []
+        kept = []
+        for idx, result in enumerate(results):
+            if idx < first_kept and (cutoff is None or (result.get('timestamp') or '') < cutoff):
+                archived.append(result)
+            else:
+                kept.append(result)
+        if not archived or (len(archived) < self.ARCHIVE_BATCH and not force):
+            return 0
+
+        # Archive first: an interruption can duplicate results, never lose them
+        try:
+            self._write_segment(self._next_segment(), archived)
+            self._write_atomically(self.history_file, self._encode_lines(kept))
+        except IOError:
+            return 0
+
+        # The archived results move from the live to the archive summaries
+        new_signature = self._file_signature()
+        self._cache = kept
+        self._cache_signature = new_signature
+        if signature == self._aggregates_signature and segments == self._archive_signature:
+            for result in archived:
+                self._archive_aggregates.add(result)
+            self._set_aggregates(HistoryAggregates(kept), new_signature,
+                                 self._archive_aggregates, self._archive_state())
+            self._write_summary()
+        return len(archived)
+
+    @classmethod
+    def compact_result(cls, result, mode):
+        """Return a result without error details, or with a summary of them
+
+        In 'summarize' mode the details become error_summary, a list of
+        [typed, expected, count] entries, most frequent first.
+        """
+        if 'error_details' not in result and 'error_columns' not in result:
+            return result
+        details = cls.get_error_details(result)
+        result = dict(result)
+        result.pop('error_details', None)
+        result.pop('error_columns', None)
+        if mode == 'summarize':
+            counts = Counter((typed, expected) for _, typed, expected in details)
+            result['error_summary'] = [[typed, expected, count]
+                                       for (typed, expected), count in counts.most_common()]
+        return result
+
+    @synchronized
+    def compact_archives(self, mode='summarize'):
+        """Drop ('drop') or summarize ('summarize') error_details in the archives
+
+        Returns the total size in bytes of the archive segments before and
+        after compaction.
+        """
+        if mode not in self.COMPACT_MODES:
+            raise ValueError(f"Unknown compaction mode: {mode}")
+        current = self._archive_signature is not None and \
+            self._archive_signature == self._archive_state()
+        before = after = 0
+        for path in self.archive_segments():
+            size = path.stat().st_size
+            before += size
+            try:
+                results = self._read_segment(path)
+                self._write_segment(path, [self.compact_result(result, mode)
+                                           for result in results])
+                size = path.stat().st_size
+            except (IOError, EOFError):
+                pass  # Leave a damaged segment as it is
+            after += size
+        if current:
+            # Compaction keeps the fields the summaries are built from
+            self._archive_signature = self._archive_state()
+            self._write_summary()
+        return before, after
+
+    @synchronized
+    def get_all_results(self, include_archived=False):
         """Get all test results"""
+        if include_archived:
+            return list(itertools.chain(self.archived_results(), self._cached_results()))
         return self.load_history()
 
+    @synchronized
     def get_recent(self, n=10):
         """Get the N most recent results"""
-        history = self.load_history()
-        return history[-n:] if len(history) > n else history
-
-    def get_by_duration(self, duration_seconds):
+        if n <= 0:
+            return []
+        # Without a current cache, read just the end of the file
+        self._migrate_legacy()
+        if self._cache is None or self._file_signature() != self._cache_signature:
+            results = self.read_tail(self.history_file, n)
+        else:
+            self.cache_hits += 1
+            results = self._cache[-n:]
+        if len(results) < n:
+            results = self._archived_tail(n - len(results)) + results
+        return results
+
+    @synchronized
+    def get_by_duration(self, duration_seconds, include_archived=False):
         """Get results filtered by test duration"""
-        history = self.load_history()
+        history = self._cached_results()
+        if include_archived:
+            history = itertools.chain(self.archived_results(), history)
         return [r for r in history if r.get('duration') == duration_seconds]
 
-    def get_average_wpm(self):
-        """Calculate overall average WPM"""
-        history = self.load_history()
-        if not history:
-            return 0.0
-        wpms = [r.get('wpm', 0) for r in history if 'wpm' in r]
-        return statistics.mean(wpms) if wpms else 0.0
+    @synchronized
+    def get_average_wpm(self, duration_seconds=None):
+        """Calculate average WPM, overall or for one test duration"""
+        return self._current_aggregates().get(duration_seconds).mean_wpm
+
+    @synchronized
+    def get_summary(self, duration_seconds=None):
+        """Get a summary of results, overall or for one test duration
 
+        Returns a dict with the number of results, the mean and standard
+        deviation of their WPM, and the best WPM and accuracy (None when
+        there are no results).
+        """
+        return self._current_aggregates().get(duration_seconds).summary()
+
+    @synchronized
     def get_trend_data(self):
         """Get WPM trend data for graphing"""
-        history = self.load_history()
+        history = self._cached_results()
         return [(r.get('timestamp', ''), r.get('wpm', 0)) for r in history]
 
 
+class SQLiteTypingHistory(TypingHistory):
+    """Typing test history kept in an SQLite database
+
+    Offers the same API as TypingHistory, but lookups run as indexed
+    queries instead of reading every saved result. Each result is stored
+    whole as JSON next to the columns used for lookups. When the database
+    is first created, the JSON history in the same directory is imported.
+    The running summaries live in a one-row table updated in the same
+    transaction as each save. The retention policy moves old rows to
+    compressed archive segments in the same format the JSON backend uses.
+    """
+
+    JSON_FILE_NAMES = (TypingHistory.LEGACY_FILE_NAME, "typing_history.jsonl")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT,
+            duration INTEGER,
+            wpm NUMERIC,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS results_timestamp ON results (timestamp);
+        CREATE INDEX IF NOT EXISTS results_duration ON results (duration, wpm);
+        CREATE TABLE IF NOT EXISTS summary (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            state TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, keep_results=None, keep_days=None, archive_format='gzip'):
+        super().__init__(keep_results, keep_days, archive_format)
+        self.history_file = self.history_dir / "typing_history.db"
+        self._connection = None
+        self._connection_file = None  # Database the connection is open on
+        self._sqlite3 = import_module('sqlite3')  # Not needed at start-up
+
+    def _connect(self):
+        """Return a connection to history_file, creating the database if needed"""
+        if self._connection_file != self.history_file:
+            self.close()
+            created = not self.history_file.exists()
+            # Shared by the GUI and writer threads, which take turns via the lock
+            self._connection = self._sqlite3.connect(self.history_file, check_same_thread=False)
+            self._connection.executescript(self.SCHEMA)
+            self._connection_file = self.history_file
+            if created:
+                for name in self.JSON_FILE_NAMES:
+                    json_file = self.history_dir / name
+                    if json_file.exists() or self.archive_segments(json_file):
+                        self.import_json(json_file)
+        return self._connection
+
+    @synchronized
+    def close(self):
+        """Close the database connection"""
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+        self._connection_file = None
+
+    def _query(self, sql, params=()):
+        """Run a query, returning no rows if the database can't be read"""
+        try:
+            return self._connect().execute(sql, params).fetchall()
+        except self._sqlite3.Error:
+            return []
+
+    @classmethod
+    def _row(cls, result):
+        """Return the column values stored for a result"""
+        return (result.get('timestamp'), result.get('duration'), result.get('wpm'),
+                cls._dumps(result))
+
+    @synchronized
+    def import_json(self, path):
+        """Import the results of a JSON history file and its archives, returning how many"""
+        # Archived results are the oldest, so they are imported first
+        results = []
+        for segment in self.archive_segments(path):
+            try:
+                results += self._read_segment(segment)
+            except (IOError, EOFError):
+                continue  # Skip a damaged segment
+        results += self.read_file(path)
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO results (timestamp, duration, wpm, data) VALUES (?, ?, ?, ?)",
+                [self._row(result) for result in results])
+            # Rebuilt from all results on the next summary query
+            connection.execute("DELETE FROM summary")
+        return len(results)
+
+    @staticmethod
+    def _store_aggregates(connection, aggregates):
+        connection.execute("INSERT OR REPLACE INTO summary (id, state) VALUES (0, ?)",
+                           (json.dumps(aggregates.to_state()),))
+
+    def _current_aggregates(self):
+        """Return running summaries from the database, building them if missing"""
+        rows = self._query("SELECT state FROM summary")
+        if rows:
+            return HistoryAggregates.from_state(json.loads(rows[0][0]))
+
+        aggregates = HistoryAggregates(
+            itertools.chain(self.archived_results(), self.load_history()))
+        try:
+            with self._connect() as connection:
+                self._store_aggregates(connection, aggregates)
+        except self._sqlite3.Error:
+            pass  # Rebuilt again on the next query
+        return aggregates
+
+    @synchronized
+    def load_history(self):
+        """Load typing test history from the database"""
+        rows = self._query("SELECT data FROM results ORDER BY id")
+        return [json.loads(data) for data, in rows]
+
+    @synchronized
+    def save_result(self, result):
+        """Append a new result to history"""
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT INTO results (timestamp, duration, wpm, data) VALUES (?, ?, ?, ?)",
+                    self._row(result))
+                # The insert holds the write lock, so no other save can interleave
+                rows = connection.execute("SELECT state FROM summary").fetchall()
+                if rows:
+                    aggregates = HistoryAggregates.from_state(json.loads(rows[0][0]))
+                    aggregates.add(result)
+                    self._store_aggregates(connection, aggregates)
+        except self._sqlite3.Error:
+            return  # Fail silently if can't write
+
+        self.apply_retention()
+
+    @synchronized
+    def apply_retention(self, force=False):
+        """Move rows outside the retention policy to a new archive segment
+
+        Same policy as TypingHistory.apply_retention, run as indexed queries.
+        """
+        if self.keep_results is None and self.keep_days is None:
+            return 0
+
+        conditions = []
+        params = []
+        if self.keep_results is not None:
+            rows = self._query("SELECT id FROM results ORDER BY id DESC LIMIT 1 OFFSET ?",
+                               (self.keep_results,))
+            if not rows:
+                return 0
+            conditions.append("id <= ?")
+            params.append(rows[0][0])
+        if self.keep_days is not None:
+            conditions.append("(timestamp < ? OR timestamp IS NULL)")
+            params.append(self._retention_cutoff())
+        where = " AND ".join(conditions)
+
+        try:
+            with self._connect() as connection:
+                rows = connection.execute(
+                    f"SELECT data FROM results WHERE {where} ORDER BY id", params).fetchall()
+                if not rows or (len(rows) < self.ARCHIVE_BATCH and not force):
+                    return 0
+                # Archive first: a failed delete can duplicate results, never lose them
+                self._write_segment(self._next_segment(),
+                                    [json.loads(data) for data, in rows])
+                connection.execute(f"DELETE FROM results WHERE {where}", params)
+        except (self._sqlite3.Error, IOError):
+            return 0
+        return len(rows)
+
+    @synchronized
+    def get_all_results(self, include_archived=False):
+        """Get all test results"""
+        results = self.load_history()
+        if include_archived:
+            results = list(self.archived_results()) + results
+        return results
+
+    @synchronized
+    def get_recent(self, n=10):
+        """Get the N most recent results"""
+        if n <= 0:
+            return []
+        rows = self._query(
+            "SELECT data FROM results ORDER BY timestamp DESC, id DESC LIMIT ?", (n,))
+        results = [json.loads(data) for data, in reversed(rows)]
+        if len(results) < n:
+            results = self._archived_tail(n - len(results)) + results
+        return results
+
+    @synchronized
+    def get_by_duration(self, duration_seconds, include_archived=False):
+        """Get results filtered by test duration"""
+        rows = self._query(
+            "SELECT data FROM results WHERE duration = ? ORDER BY id", (duration_seconds,))
+        results = [json.loads(data) for data, in rows]
+        if include_archived:
+            results = [r for r in self.archived_results()
+                       if r.get('duration') == duration_seconds] + results
+        return results
+
+    @synchronized
+    def get_trend_data(self):
+        """Get WPM trend data for graphing"""
+        rows = self._query(
+            "SELECT COALESCE(timestamp, ''), COALESCE(wpm, 0) FROM results ORDER BY id")
+        return [tuple(row) for row in rows]
+
+
+# Storage backends selectable with --history-backend
+HISTORY_BACKENDS = {
+    'json': TypingHistory,
+    'sqlite': SQLiteTypingHistory,
+}
+
+
+class HistoryWriter(QObject):
+    """Saves typing test results to a history on a background thread
+
+    Results are queued and written in order by one dedicated thread, so
+    slow storage such as a network home directory never blocks the GUI.
+    saved is emitted with each result once it has been written, together
+    with the summary of the earlier results of the same duration, read on
+    the writer thread just before the save; connected slots run on the GUI
+    thread, which never has to wait for the history.
+    """
+
+    saved = pyqtSignal(dict, dict)
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        # Only needed once the typing test is opened, so not imported at start-up
+        self._threading = import_module('threading')
+        self._traceback = import_module('traceback')
+        self._queue = import_module('queue').Queue()
+        self._thread = None  # Started by the first save
+
+    def save(self, result):
+        """Queue a result to be saved"""
+        if self._thread is None:
+            self._thread = self._threading.Thread(target=self._run, name="history-writer",
+                                                  daemon=True)
+            self._thread.start()
+        self._queue.put(result)
+
+    def _run(self):
+        while True:
+            result = self._queue.get()
+            try:
+                if result is None:
+                    return
+                summary = self.history.get_summary(result.get('duration'))
+                self.history.save_result(result)
+                try:
+                    self.saved.emit(result, summary)
+                except RuntimeError:
+                    pass  # The owning widget was deleted; nobody is listening
+            except Exception:
+                self._traceback.print_exc()  # Keep saving later results
+            finally:
+                self._queue.task_done()
+
+    def wait(self):
+        """Block until every queued result has been written"""
+        self._queue.join()
+
+    def stop(self):
+        """Write the queued results and stop the thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class TypingHighlighter(QSyntaxHighlighter):
+    """Colors typed text from scorer statuses without modifying the text
+
+    Qt highlights an edited block before textChanged reaches the scorer, so
+    blocks seen while the scorer is behind the document are skipped and
+    highlighted again by refresh() once the edit has been scored.
+    """
+
+    def __init__(self, document, formats):
+        super().__init__(document)
+        self.formats = formats
+        self.scorer = None
+        self.pending_blocks = []
+
+    def highlightBlock(self, text):
+        if self.scorer is None:
+            return
+
+        if self.document().characterCount() - 1 != len(self.scorer.typed_text):
+            self.pending_blocks.append(self.currentBlock())
+            return
+
+        start = self.currentBlock().position()
+        for offset, length, status in self.scorer.status_runs(start, start + len(text)):
+            self.setFormat(offset, length, self.formats[status])
+
+    def refresh(self, spans):
+        """Rehighlight skipped blocks and blocks overlapping changed spans"""
+        blocks = self.pending_blocks
+        self.pending_blocks = []
+
+        document = self.document()
+        if spans:
+            end = spans[-1][0] + len(spans[-1][1])
+            block = document.findBlock(spans[0][0])
+            while block.isValid() and block.position() < end:
+                blocks.append(block)
+                block = block.next()
+
+        seen = set()
+        for block in blocks:
+            if block.isValid() and block.blockNumber() not in seen:
+                seen.add(block.blockNumber())
+                self.rehighlightBlock(block)
+
+
 class TypingTest(QWidget):
     """Typing test widget with timer, statistics, and history"""
 
-    def __init__(self, parent=None):
+    # Strategies for coloring the typed text on every keystroke:
+    #   'full'        - clear the input and reinsert every character (original)
+    #   'incremental' - reformat only the tokens touched by the last edit
+    #   'highlighter' - leave the text alone and color it from a
+    #                   QSyntaxHighlighter, rehighlighting dirty blocks only
+    RECOLOR_MODES = ('full', 'incremental', 'highlighter')
+
+    def __init__(self, parent=None, recolor_mode='incremental', history=None,
+                 latency=None):
         super().__init__(parent)
-        self.history = TypingHistory()
+        if recolor_mode not in self.RECOLOR_MODES:
+            raise ValueError(f"Unknown recolor mode: {recolor_mode}")
+        self.recolor_mode = recolor_mode
+        # Key handling latency histograms (a LatencyStats), or None to not measure
+        self.latency = latency
+        self.history = history if history is not None else TypingHistory()
+        # Results are saved in the background; the table refreshes when done
+        self.history_writer = HistoryWriter(self.history, self)
+        self.history_writer.saved.connect(self.on_result_saved)
         self.test_active = False
         self.test_start_time = None
         self.test_duration = 60  # default 1 minute
         self.current_sample = None
+        self.scorer = None
         self.typed_text = ""
         self.errors = []
         self.wpm_samples = []  # Track WPM every second for peak/consistency
@@ -509,9 +2207,29 @@ class TypingTest(QWidget):
         self.typing_input.setFont(QFont("Monospace", 11))
         self.typing_input.setMaximumHeight(150)
         self.typing_input.setEnabled(False)
+        # Coloring rewrites character formats, which must not land on the undo stack
+        self.typing_input.setUndoRedoEnabled(False)
+        self.typing_input.setAcceptRichText(False)
         self.typing_input.textChanged.connect(self.handle_typing_input)
+        if self.latency is not None:
+            # Key events reach the input before the edit they cause
+            self.typing_input.installEventFilter(self)
         layout.addWidget(self.typing_input)
 
+        # Character formats used to color typed text
+        self.status_formats = {}
+        for status, color in ((CORRECT, QColor(0, 150, 0)),
+                              (ERROR, QColor(200, 0, 0)),
+                              (OVERFLOW, QColor(128, 128, 128))):
+            fmt = QTextCharFormat()
+            fmt.setForeground(color)
+            self.status_formats[status] = fmt
+
+        self.highlighter = None
+        if self.recolor_mode == 'highlighter':
+            self.highlighter = TypingHighlighter(self.typing_input.document(),
+                                                 self.status_formats)
+
         # Start button
         self.start_button = QPushButton("Start Test")
         self.start_button.clicked.connect(self.start_test)
@@ -567,8 +2285,12 @@ class TypingTest(QWidget):
         # Load and display history
         self.load_and_display_history()
 
-    def start_test(self):
-        """Start a new typing test"""
+    def start_test(self, sample=None):
+        """Start a new typing test
+
+        sample is an optional {'id', 'text', 'source'} dict to type instead
+        of randomly chosen samples.
+        """
         # Get selected duration
         self.test_duration = self.duration_group.checkedId()
 
@@ -577,20 +2299,27 @@ class TypingTest(QWidget):
         self.radio_60s.setEnabled(False)
         self.radio_120s.setEnabled(False)
 
-        # Load multiple random samples to ensure enough text
-        # Concatenate 2-3 samples depending on duration
-        num_samples = 2 if self.test_duration <= 60 else 3
-        samples = random.sample(TYPING_SAMPLES, num_samples)
-
-        # Combine samples with separator
-        combined_text = " ".join([s['text'] for s in samples])
-        combined_sources = " | ".join([s['source'] for s in samples])
-
-        self.current_sample = {
-            'id': samples[0]['id'],  # Use first sample's ID
-            'text': combined_text,
-            'source': combined_sources
-        }
+        if sample is None:
+            # Load multiple random samples to ensure enough text
+            # Concatenate 2-3 samples depending on duration
+            num_samples = 2 if self.test_duration <= 60 else 3
+            samples = random.sample(TYPING_SAMPLES, num_samples)
+
+            # Combine samples with separator
+            combined_text = " ".join([s['text'] for s in samples])
+            combined_sources = " | ".join([s['source'] for s in samples])
+
+            sample = {
+                'id': samples[0]['id'],  # Use first sample's ID
+                'text': combined_text,
+                'source': combined_sources
+            }
+
+        self.current_sample = sample
+        # The source never changes during a test, so it is indexed only once
+        self.scorer = TypingScorer(sample['text'])
+        if self.highlighter is not None:
+            self.highlighter.scorer = self.scorer
         self.sample_display.setPlainText(self.current_sample['text'])
 
         # Auto-resize sample display to fit all content without scrolling
@@ -600,7 +2329,7 @@ class TypingTest(QWidget):
 
         # Reset state
         self.test_active = True
-        self.test_start_time = datetime.now()
+        self.test_start_time = time.perf_counter_ns()
         self.typed_text = ""
         self.errors = []
         self.wpm_samples = []
@@ -625,7 +2354,7 @@ class TypingTest(QWidget):
         if not self.test_active:
             return
 
-        elapsed = (datetime.now() - self.test_start_time).total_seconds()
+        elapsed = (time.perf_counter_ns() - self.test_start_time) / 1e9
         remaining = max(0, self.test_duration - elapsed)
 
         minutes = int(remaining // 60)
@@ -640,19 +2369,45 @@ class TypingTest(QWidget):
         if not self.test_active:
             return
 
-        elapsed = (datetime.now() - self.test_start_time).total_seconds()
+        elapsed = (time.perf_counter_ns() - self.test_start_time) / 1e9
         if elapsed > 0:
             chars_typed = len(self.typed_text)
             current_wpm = (chars_typed / 5) / (elapsed / 60)
             self.wpm_samples.append(current_wpm)
 
+    def eventFilter(self, obj, event):
+        """Measure the queueing delay of key presses reaching the input"""
+        if event.type() == QEvent.Type.KeyPress and obj is self.typing_input:
+            self.latency.add_queue_delay("typing", event.timestamp())
+        return False
+
     def handle_typing_input(self):
         """Handle user typing input with word-based error detection"""
         if not self.test_active:
             return
 
+        if self.latency is not None:
+            start_ns = time.perf_counter_ns()
+            self.recolor()
+            self.latency.add_duration("typing", time.perf_counter_ns() - start_ns)
+        else:
+            self.recolor()
+
+    def recolor(self):
+        """Score the input and color it with the chosen recolor mode"""
+        if self.recolor_mode == 'incremental':
+            self.recolor_incremental()
+        elif self.recolor_mode == 'highlighter':
+            self.recolor_highlighter()
+        else:
+            self.recolor_full()
+
+    def recolor_full(self):
+        """Rescore everything and rebuild the whole input with color formatting"""
         self.typed_text = self.typing_input.toPlainText()
-        source_text = self.current_sample['text']
+        self.scorer.reset()
+        spans = self.scorer.feed_text(self.typed_text)
+        self.errors = self.scorer.errors
 
         # Clear and rebuild with color formatting
         cursor = self.typing_input.textCursor()
@@ -661,72 +2416,12 @@ class TypingTest(QWidget):
         self.typing_input.blockSignals(True)  # Prevent recursion
         self.typing_input.clear()
 
-        # Reset errors for this iteration
-        self.errors = []
-
-        # Tokenize source and typed text into words and whitespace
-        # This allows word-by-word comparison without error propagation
-        import re
-
-        # Split into tokens (words/punctuation + spaces)
-        source_tokens = []
-        for match in re.finditer(r'\S+|\s+', source_text):
-            source_tokens.append(match.group())
-
-        typed_tokens = []
-        for match in re.finditer(r'\S+|\s+', self.typed_text):
-            typed_tokens.append((match.group(), match.start(), match.end()))
-
-        # Match typed tokens to source tokens and colorize
         cursor = self.typing_input.textCursor()
-        typed_char_idx = 0
-
-        for token_idx, (typed_token, typed_start, typed_end) in enumerate(typed_tokens):
-            # Get corresponding source token (if exists)
-            if token_idx >= len(source_tokens):
-                # Typed beyond source - mark as red (error) for tokens close to end,
-                # gray for tokens far beyond
-                # This catches things like typing a space instead of punctuation
-                is_near_end = token_idx < len(source_tokens) + 2
-                for char in typed_token:
-                    fmt = QTextCharFormat()
-                    if is_near_end:
-                        fmt.setForeground(QColor(200, 0, 0))
-                        self.errors.append((typed_char_idx, char, ''))
-                    else:
-                        fmt.setForeground(QColor(128, 128, 128))
-                    cursor.movePosition(QTextCursor.MoveOperation.End)
-                    cursor.insertText(char, fmt)
-                    typed_char_idx += 1
-                continue
-
-            source_token = source_tokens[token_idx]
-
-            # Compare character by character within this token
-            for i, char in enumerate(typed_token):
-                if i < len(source_token):
-                    if char == source_token[i]:
-                        # Correct character - green
-                        fmt = QTextCharFormat()
-                        fmt.setForeground(QColor(0, 150, 0))
-                        cursor.movePosition(QTextCursor.MoveOperation.End)
-                        cursor.insertText(char, fmt)
-                    else:
-                        # Incorrect character - red
-                        fmt = QTextCharFormat()
-                        fmt.setForeground(QColor(200, 0, 0))
-                        cursor.movePosition(QTextCursor.MoveOperation.End)
-                        cursor.insertText(char, fmt)
-                        self.errors.append((typed_char_idx, char, source_token[i]))
-                else:
-                    # Extra character in this token - red
-                    fmt = QTextCharFormat()
-                    fmt.setForeground(QColor(200, 0, 0))
-                    cursor.movePosition(QTextCursor.MoveOperation.End)
-                    cursor.insertText(char, fmt)
-                    self.errors.append((typed_char_idx, char, ''))
-
-                typed_char_idx += 1
+        for start, statuses in spans:
+            for i, status in enumerate(statuses):
+                fmt = QTextCharFormat(self.status_formats[status])
+                cursor.movePosition(QTextCursor.MoveOperation.End)
+                cursor.insertText(self.typed_text[start + i], fmt)
 
         # Restore cursor position
         cursor = self.typing_input.textCursor()
@@ -734,6 +2429,41 @@ class TypingTest(QWidget):
         self.typing_input.setTextCursor(cursor)
         self.typing_input.blockSignals(False)
 
+    def recolor_incremental(self):
+        """Recolor only the spans the scorer reports as changed
+
+        The edit already changed the document text, so characters outside the
+        reported spans keep their formats.
+        """
+        spans = self.scorer.feed_text(self.typing_input.toPlainText())
+        self.typed_text = self.scorer.typed_text
+        self.errors = self.scorer.errors
+        if spans:
+            self.apply_status_formats(spans)
+
+    def recolor_highlighter(self):
+        """Score the edit and let the highlighter recolor the dirty blocks"""
+        spans = self.scorer.feed_text(self.typing_input.toPlainText())
+        self.typed_text = self.scorer.typed_text
+        self.errors = self.scorer.errors
+        self.highlighter.refresh(spans)
+
+    def apply_status_formats(self, spans):
+        """Apply status colors to (start, statuses) spans of the typed text"""
+        cursor = QTextCursor(self.typing_input.document())
+        self.typing_input.blockSignals(True)  # Prevent recursion
+        cursor.beginEditBlock()
+        for start, statuses in spans:
+            run_start = 0
+            for i in range(1, len(statuses) + 1):
+                if i == len(statuses) or statuses[i] != statuses[run_start]:
+                    cursor.setPosition(start + run_start)
+                    cursor.setPosition(start + i, QTextCursor.MoveMode.KeepAnchor)
+                    cursor.setCharFormat(self.status_formats[statuses[run_start]])
+                    run_start = i
+        cursor.endEditBlock()
+        self.typing_input.blockSignals(False)
+
     def end_test(self):
         """End the test and show statistics"""
         self.test_active = False
@@ -763,52 +2493,21 @@ class TypingTest(QWidget):
 
     def calculate_statistics(self):
         """Calculate all typing test statistics"""
-        elapsed = self.test_duration
-        source_text = self.current_sample['text']
-
-        # Basic counts
-        total_chars = len(self.typed_text)
-        total_words = len(self.typed_text.split())
-
-        # Error count
-        error_count = len(self.errors)
-
-        # WPM calculation (standard: chars/5 / minutes)
-        wpm = (total_chars / 5) / (elapsed / 60) if elapsed > 0 else 0
-
-        # Adjusted WPM (standard net WPM formula: subtract error penalty from words before dividing by time)
-        # Each error subtracts 1 word (5 characters worth)
-        adjusted_wpm = max(0, ((total_chars / 5) - error_count) / (elapsed / 60)) if elapsed > 0 else 0
-
-        # Accuracy
-        accuracy = ((total_chars - error_count) / total_chars * 100) if total_chars > 0 else 0
-
-        # Peak WPM
-        peak_wpm = max(self.wpm_samples) if self.wpm_samples else wpm
-
-        # Consistency (standard deviation of WPM samples)
-        if len(self.wpm_samples) > 1:
-            consistency = statistics.stdev(self.wpm_samples)
-        else:
-            consistency = 0
-
-        return {
+        stats = {
             'timestamp': datetime.now().isoformat(),
-            'duration': elapsed,
+            'duration': self.test_duration,
             'text_sample_id': self.current_sample['id'],
-            'wpm': round(wpm, 1),
-            'adjusted_wpm': round(adjusted_wpm, 1),
-            'accuracy_percent': round(accuracy, 1),
-            'peak_wpm': round(peak_wpm, 1),
-            'consistency_score': round(consistency, 1),
-            'total_characters': total_chars,
-            'total_words': total_words,
-            'errors': error_count,
-            'error_details': self.errors
         }
+        stats.update(compute_statistics(self.typed_text, self.errors,
+                                        self.test_duration, self.wpm_samples))
+        return stats
+
+    def display_statistics(self, stats, comparison="Comparing with earlier results..."):
+        """Display statistics in the stats panel
 
-    def display_statistics(self, stats):
-        """Display statistics in the stats panel"""
+        The comparison with earlier results arrives once the result has
+        been saved; see on_result_saved.
+        """
         consistency_label = "Excellent" if stats['consistency_score'] < 5 else \
                           "Good" if stats['consistency_score'] < 10 else \
                           "Fair" if stats['consistency_score'] < 15 else "Variable"
@@ -825,24 +2524,45 @@ Characters:       {stats['total_characters']}
 Words:            {stats['total_words']}
 Errors:           {stats['errors']}
 {'='*50}
+{comparison}
+{'='*50}
 Results automatically saved to history."""
 
         self.stats_panel.setText(stats_text)
         self.stats_panel.setVisible(True)
         self.action_buttons.setVisible(True)
 
+    @staticmethod
+    def history_comparison(stats, summary):
+        """Compare a result with the summary of earlier tests of the same duration"""
+        if summary['count'] == 0:
+            return f"First {stats['duration']} second test - no earlier results to compare"
+
+        if stats['wpm'] > summary['best_wpm']:
+            best = f"NEW PERSONAL BEST (previous {summary['best_wpm']} WPM)"
+        else:
+            best = f"{summary['best_wpm']} WPM"
+        tests = "test" if summary['count'] == 1 else "tests"
+        return (f"Personal Best:    {best}\n"
+                f"vs. Your Average: {stats['wpm'] - summary['mean_wpm']:+.1f} WPM "
+                f"(average {summary['mean_wpm']:.1f} over {summary['count']} {tests})")
+
     def save_results(self):
-        """Save test results to history"""
+        """Save test results to history in the background"""
         if hasattr(self, 'current_stats'):
-            self.history.save_result(self.current_stats)
-
-            # Refresh history display
-            self.load_and_display_history()
+            self.history_writer.save(self.current_stats)
 
             # Disable save button since results are auto-saved
-            self.save_button.setText("Results Saved")
+            self.save_button.setText("Saving Results...")
             self.save_button.setEnabled(False)
 
+    def on_result_saved(self, result, summary):
+        """Show the comparison and refresh the history once a result has been written"""
+        if result is getattr(self, 'current_stats', None) and not self.stats_panel.isHidden():
+            self.display_statistics(result, self.history_comparison(result, summary))
+        self.load_and_display_history()
+        self.save_button.setText("Results Saved")
+
     def reset_test(self):
         """Reset for a new test"""
         self.typing_input.clear()
@@ -873,11 +2593,135 @@ Results automatically saved to history."""
             self.history_table.setItem(i, 4, QTableWidgetItem(f"{result.get('accuracy_percent', 0)}%"))
 
 
+def positive_int(value):
+    """argparse type for integers greater than zero"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def non_negative_float(value):
+    """argparse type for numbers that are zero or more"""
+    number = float(value)
+    if not number >= 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return number
+
+
+def parse_args(argv=None):
+    """Parse command line options, leaving unknown options for Qt"""
+    parser = argparse.ArgumentParser(
+        description="Keyboard Checker - test and display keyboard key presses")
+    parser.add_argument("--log-capacity", type=positive_int,
+                        default=KeyboardChecker.DEFAULT_LOG_CAPACITY,
+                        help="number of key events kept in the event log "
+                             "(default: %(default)s)")
+    parser.add_argument("--batch-updates", action="store_true",
+                        help="queue key events and update the display at most "
+                             "once per frame, for key floods from auto-repeat "
+                             "or injection rigs")
+    parser.add_argument("--history-backend", choices=sorted(HISTORY_BACKENDS),
+                        default='json',
+                        help="typing test history storage: append-only JSON "
+                             "lines, or an indexed SQLite database that imports "
+                             "the JSON history on first use (default: %(default)s)")
+    parser.add_argument("--history-keep-results", type=positive_int, metavar="N",
+                        help="keep only the last N typing test results in the "
+                             "history; older ones are moved to compressed archives")
+    parser.add_argument("--history-keep-days", type=positive_int, metavar="DAYS",
+                        help="keep only the results of the last DAYS days in the "
+                             "history; with --history-keep-results, results "
+                             "within either limit are kept")
+    parser.add_argument("--archive-format", choices=sorted(TypingHistory.ARCHIVE_FORMATS),
+                        default='gzip',
+                        help="compression for history archives (default: %(default)s)")
+    parser.add_argument("--compact-history", choices=TypingHistory.COMPACT_MODES,
+                        help="apply the retention policy now, drop or summarize "
+                             "the per-character error details of archived "
+                             "results, and exit")
+    parser.add_argument("--record-session", metavar="FILE",
+                        help="record every key press and release to a session file")
+    parser.add_argument("--replay-session", metavar="FILE",
+                        help="replay a recorded session file after start-up")
+    parser.add_argument("--replay-speed", type=non_negative_float, default=1.0,
+                        metavar="FACTOR",
+                        help="pace of --replay-session relative to the recording; "
+                             "0 replays as fast as possible (default: %(default)s)")
+    parser.add_argument("--replay-into", choices=('checker', 'typing'), default='checker',
+                        help="replay into the key checker, or into a new typing "
+                             "test (default: %(default)s)")
+    parser.add_argument("--latency-stats", action="store_true",
+                        help="measure key event queueing delay and handler time, "
+                             "and show their 99th percentiles in the status bar")
+    parser.add_argument("--latency-dump", metavar="FILE",
+                        help="measure key handling latency and write the "
+                             "histograms to a JSON file on exit")
+    parser.add_argument("--trace-startup", action="store_true",
+                        help="print how long each start-up step takes to stderr; "
+                             f"also enabled by setting {StartupTrace.ENV_VAR}")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="exit once the window has been painted and focused, "
+                             "for start-up benchmarks")
+    return parser.parse_known_args(argv)
+
+
+mark_startup("module body")
+
+
 def main():
-    app = QApplication(sys.argv)
-    window = KeyboardChecker()
+    args, qt_args = parse_args()
+    startup_trace = None
+    if args.trace_startup or os.environ.get(StartupTrace.ENV_VAR):
+        startup_trace = StartupTrace(STARTUP_MARKS, quit_when_done=args.quit_after_startup)
+        startup_trace.mark("parse_args")
+    # The window makes the history when the typing test is first opened
+    history_factory = functools.partial(
+        HISTORY_BACKENDS[args.history_backend],
+        keep_results=args.history_keep_results, keep_days=args.history_keep_days,
+        archive_format=args.archive_format)
+
+    if args.compact_history:
+        history = history_factory()
+        archived = history.apply_retention(force=True)
+        before, after = history.compact_archives(args.compact_history)
+        print(f"Archived {archived} results; archives compacted "
+              f"from {before:,} to {after:,} bytes")
+        return
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    if startup_trace is not None:
+        startup_trace.mark("QApplication")
+    elif args.quit_after_startup:
+        QTimer.singleShot(0, app.quit)
+    latency = LatencyStats() if args.latency_stats or args.latency_dump else None
+    window = KeyboardChecker(log_capacity=args.log_capacity,
+                             batch_updates=args.batch_updates,
+                             history_factory=history_factory,
+                             startup_trace=startup_trace,
+                             latency=latency)
     window.show()
-    sys.exit(app.exec())
+
+    recorder = None
+    if args.record_session:
+        recorder = KeySessionRecorder(args.record_session)
+        recorder.start()
+    if args.replay_session:
+        target = window
+        if args.replay_into == 'typing':
+            window.switch_to_typing_test()
+            window.typing_test.start_test()
+            target = window.typing_test.typing_input
+        replayer = KeySessionReplayer(read_session(args.replay_session), target,
+                                      speed=args.replay_speed, parent=window)
+        QTimer.singleShot(0, replayer.start)
+
+    exit_code = app.exec()
+    if recorder is not None:
+        recorder.stop()
+    if args.latency_dump:
+        latency.dump(args.latency_dump)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
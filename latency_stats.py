@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Key handling latency histograms - pure Python, no Qt required
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import time
+from array import array
+from bisect import bisect_left
+
+
+def make_bucket_bounds(first_ns=1000, last_ns=60_000_000_000, growth=1.1):
+    """Upper bounds of histogram buckets, growing geometrically"""
+    bounds = []
+    bound = first_ns
+    while bound < last_ns:
+        bounds.append(round(bound))
+        bound *= growth
+    bounds.append(last_ns)
+    return tuple(bounds)
+
+
+# Bucket upper bounds from 1 us to 60 s, each 10% wider than the last, so a
+# percentile read from the buckets is within 10% of the true value
+BUCKET_BOUNDS_NS = make_bucket_bounds()
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in nanoseconds
+
+    Adding a sample is a bisect over the bucket bounds and one counter
+    increment; percentiles are only worked out when asked for.
+    """
+
+    __slots__ = ('counts', 'count', 'max_ns')
+
+    def __init__(self):
+        # One counter per bucket, plus one for anything past the last bound
+        self.counts = array('Q', bytes(8 * (len(BUCKET_BOUNDS_NS) + 1)))
+        self.count = 0
+        self.max_ns = 0
+
+    def add(self, duration_ns):
+        """Count one duration"""
+        self.counts[bisect_left(BUCKET_BOUNDS_NS, duration_ns)] += 1
+        self.count += 1
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile, or None if empty"""
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        if index == len(BUCKET_BOUNDS_NS):
+            return self.max_ns
+        return min(BUCKET_BOUNDS_NS[index], self.max_ns)
+
+    def summary(self):
+        """Return count, percentiles and max in milliseconds as a dict"""
+        summary = {'count': self.count}
+        for percent in PERCENTILES:
+            value = self.percentile(percent)
+            summary[f'p{percent}_ms'] = None if value is None else value / 1e6
+        summary['max_ms'] = self.max_ns / 1e6 if self.count else None
+        return summary
+
+    def format(self):
+        """Format the percentiles and max for display"""
+        if not self.count:
+            return "no events"
+        return " ".join(f"p{percent} {self.percentile(percent) / 1e6:.2f}"
+                        for percent in PERCENTILES) + f" max {self.max_ns / 1e6:.2f} ms"
+
+
+class LatencyStats:
+    """Latency histograms for each event handler
+
+    Each handler has a queueing delay histogram, from the event's own
+    timestamp to handler entry, and a handler duration histogram.
+    """
+
+    # Window-system event times further from now than this are on another
+    # clock, so no queueing delay can be worked out from them
+    MAX_QUEUE_DELAY_NS = 10_000_000_000
+
+    def __init__(self):
+        self.queue_delay = {}  # handler name -> LatencyHistogram
+        self.duration = {}  # handler name -> LatencyHistogram
+        self.unsynced = 0  # Events whose timestamp could not be compared
+
+    def _histogram(self, histograms, handler):
+        histogram = histograms.get(handler)
+        if histogram is None:
+            histogram = histograms[handler] = LatencyHistogram()
+        return histogram
+
+    def add_queue_delay(self, handler, event_time_ms, entry_ns=None):
+        """Count the delay from an event's timestamp to handler entry
+
+        event_time_ms is the event's timestamp in milliseconds, taken to be
+        on the monotonic clock as on X11 and Wayland; entry_ns is
+        time.monotonic_ns() at handler entry.
+        """
+        if entry_ns is None:
+            entry_ns = time.monotonic_ns()
+        delay_ns = entry_ns - event_time_ms * 1_000_000
+        if 0 <= delay_ns <= self.MAX_QUEUE_DELAY_NS:
+            self._histogram(self.queue_delay, handler).add(delay_ns)
+        else:
+            self.unsynced += 1
+
+    def add_duration(self, handler, duration_ns):
+        """Count how long one call to a handler took"""
+        self._histogram(self.duration, handler).add(duration_ns)
+
+    def status_text(self):
+        """One-line p99 summary for the status bar"""
+        parts = []
+        for handler, histogram in self.duration.items():
+            queue = self.queue_delay.get(handler)
+            queue_p99 = queue.percentile(99) if queue is not None else None
+            queue_text = f"{queue_p99 / 1e6:.1f}" if queue_p99 is not None else "-"
+            parts.append(f"{handler}: queue p99 {queue_text} ms, "
+                         f"handler p99 {histogram.percentile(99) / 1e6:.2f} ms")
+        return " | ".join(parts) if parts else "No key events measured yet"
+
+    def report(self):
+        """Format every histogram as a table"""
+        lines = []
+        for title, histograms in (("Queueing delay", self.queue_delay),
+                                  ("Handler duration", self.duration)):
+            for handler, histogram in histograms.items():
+                lines.append(f"{title + ', ' + handler:<36} {histogram.count:>7} "
+                             f"{histogram.format()}")
+        if self.unsynced:
+            lines.append(f"Events with timestamps on another clock: {self.unsynced}")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        """Summaries and raw bucket counts as a JSON-serializable dict"""
+        def histograms_dict(histograms):
+            return {handler: dict(histogram.summary(), buckets=list(histogram.counts))
+                    for handler, histogram in histograms.items()}
+
+        return {
+            'bucket_bounds_ns': list(BUCKET_BOUNDS_NS),
+            'queue_delay': histograms_dict(self.queue_delay),
+            'handler_duration': histograms_dict(self.duration),
+            'unsynced_events': self.unsynced,
+        }
+
+    def dump(self, path):
+        """Write the histograms to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
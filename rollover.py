@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Key rollover and ghosting test - pure Python, no Qt required
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+
+from scan_rate import KEYCODE_LIMIT, keycode_slot
+
+
+class RolloverTester:
+    """Tracks which keys are held and finds key presses that were dropped
+
+    Held keys are one byte per native scan code, so a press or release is a
+    few array updates whatever else is held. A dropped press shows up in two
+    ways: a release arrives for a key that was never pressed, or a key of
+    the learned chord is missing when the operator holds the whole chord.
+    """
+
+    def __init__(self):
+        self.held = bytearray(KEYCODE_LIMIT)
+        self.in_chord = bytearray(KEYCODE_LIMIT)
+        self.chord_pressed = bytearray(KEYCODE_LIMIT)  # Chord keys pressed this attempt
+        self.dropped = array('I', bytes(4 * KEYCODE_LIMIT))  # Dropped presses per key
+        self.key_names = [None] * KEYCODE_LIMIT  # Name of each key when last pressed
+        self.chord = []  # Scan codes of the chord, in the order they were learned
+        self.learning = False
+        self.reset()
+
+    def reset(self):
+        """Forget held keys and results, keeping the learned chord"""
+        self.held[:] = bytes(KEYCODE_LIMIT)
+        self.chord_pressed[:] = bytes(KEYCODE_LIMIT)
+        self.dropped[:] = array('I', bytes(4 * KEYCODE_LIMIT))
+        self.held_count = 0
+        self.max_held = 0
+        self.chord_held = 0  # Chord keys held now
+        self.attempt_peak = 0  # Most chord keys held at once this attempt
+        self.attempts = 0
+        self.passed = 0
+        self.last_missing = None  # Chord keys missing from the last attempt
+        self.orphan_releases = 0
+
+    def start_learning(self):
+        """Start a new chord; each key pressed is added until finish_learning"""
+        for slot in self.chord:
+            self.in_chord[slot] = 0
+            self.chord_pressed[slot] = 0
+        self.chord = []
+        self.chord_held = 0
+        self.attempt_peak = 0
+        self.learning = True
+
+    def finish_learning(self):
+        self.learning = False
+        self.last_missing = None
+
+    def key_name(self, slot):
+        return self.key_names[slot] or f"0x{slot:02X}"
+
+    def press(self, keycode, name=None):
+        """Record a key press; repeated presses of a held key are ignored"""
+        slot = keycode_slot(keycode)
+        if name is not None:
+            self.key_names[slot] = name
+        if self.held[slot]:
+            return
+        self.held[slot] = 1
+        self.held_count += 1
+        if self.held_count > self.max_held:
+            self.max_held = self.held_count
+
+        if self.learning:
+            if not self.in_chord[slot]:
+                self.in_chord[slot] = 1
+                self.chord.append(slot)
+        elif self.in_chord[slot]:
+            self.chord_pressed[slot] = 1
+            self.chord_held += 1
+            if self.chord_held > self.attempt_peak:
+                self.attempt_peak = self.chord_held
+
+    def release(self, keycode):
+        """Record a key release; when no key is held a chord attempt ends"""
+        slot = keycode_slot(keycode)
+        if not self.held[slot]:
+            # Its press never arrived
+            self.orphan_releases += 1
+            self.dropped[slot] += 1
+            return
+        self.held[slot] = 0
+        self.held_count -= 1
+        if self.chord_pressed[slot]:
+            self.chord_held -= 1
+        if self.held_count == 0 and self.attempt_peak:
+            self.finish_attempt()
+
+    def finish_attempt(self):
+        """Check which chord keys never arrived while the chord was held"""
+        self.attempts += 1
+        if self.attempt_peak == len(self.chord):
+            self.passed += 1
+            self.last_missing = []
+        else:
+            self.last_missing = [slot for slot in self.chord if not self.chord_pressed[slot]]
+            for slot in self.last_missing:
+                self.dropped[slot] += 1
+        for slot in self.chord:
+            self.chord_pressed[slot] = 0
+        self.attempt_peak = 0
+        self.chord_held = 0
+
+    def held_keys(self):
+        """Scan codes of the keys held now"""
+        return [slot for slot, held in enumerate(self.held) if held]
+
+    def report(self):
+        """Format the results for display"""
+        held_names = " ".join(self.key_name(slot) for slot in self.held_keys())
+        lines = [f"Keys held now: {self.held_count}   Most held at once: {self.max_held}",
+                 f"Held: {held_names or '(none)'}"]
+
+        chord_names = " ".join(self.key_name(slot) for slot in self.chord)
+        if self.learning:
+            lines.append(f"Learning chord: {chord_names or '(press each key once)'}")
+        elif self.chord:
+            plural = "" if len(self.chord) == 1 else "s"
+            lines.append(f"Chord: {chord_names} ({len(self.chord)} key{plural}), "
+                         f"{self.passed} of {self.attempts} attempts complete")
+            if self.last_missing == []:
+                lines.append("Last attempt: every key registered")
+            elif self.last_missing is not None:
+                missing = " ".join(self.key_name(slot) for slot in self.last_missing)
+                lines.append(f"Last attempt: missing {missing or '(keys not held together)'}")
+
+        dropped = [f"{self.key_name(slot)} x{count}" for slot, count in enumerate(self.dropped)
+                   if count]
+        lines.append(f"Dropped presses: {', '.join(dropped) if dropped else 'none'}")
+        if self.orphan_releases:
+            lines.append(f"Releases without a press: {self.orphan_releases}")
+        return "\n".join(lines)
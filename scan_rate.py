@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Key event timing analysis - pure Python, no Qt required
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from array import array
+
+# Per-key state is kept in arrays indexed by native scan code. X11 keycodes
+# are 8-255 and Wayland's are evdev codes plus 8; anything outside the
+# arrays shares slot 0 with keys that have no scan code.
+KEYCODE_LIMIT = 1024
+NO_TIME = -1
+
+# Event flags kept in the event buffer
+RELEASE_FLAG = 0x01
+AUTO_REPEAT_FLAG = 0x02
+
+
+def keycode_slot(keycode):
+    """Array index used for a native scan code"""
+    return keycode if 0 < keycode < KEYCODE_LIMIT else 0
+
+
+class MillisecondHistogram:
+    """Exact histogram of whole-millisecond durations
+
+    Key event timestamps are whole milliseconds, so one counter per
+    millisecond up to limit_ms gives exact percentiles with a single
+    increment per sample. Longer durations share an overflow counter.
+    """
+
+    __slots__ = ('counts', 'count', 'min_ms', 'max_ms')
+
+    def __init__(self, limit_ms=2000):
+        self.counts = array('Q', bytes(8 * (limit_ms + 2)))
+        self.count = 0
+        self.min_ms = None
+        self.max_ms = None
+
+    def add(self, duration_ms):
+        """Count one duration"""
+        if duration_ms < 0:
+            return  # Timestamps from different clocks
+        self.counts[min(duration_ms, len(self.counts) - 1)] += 1
+        self.count += 1
+        if self.min_ms is None or duration_ms < self.min_ms:
+            self.min_ms = duration_ms
+        if self.max_ms is None or duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+
+    def percentile(self, percent):
+        """Nearest-rank percentile in milliseconds, or None if empty"""
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for duration_ms, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        if duration_ms == len(self.counts) - 1:
+            return self.max_ms  # Overflow counter
+        return duration_ms
+
+    def format(self):
+        """Format the count, min, percentiles and max for display"""
+        if not self.count:
+            return "no events"
+        return (f"n={self.count} min {self.min_ms} p50 {self.percentile(50)} "
+                f"p95 {self.percentile(95)} p99 {self.percentile(99)} max {self.max_ms} ms")
+
+
+class ScanRateAnalyzer:
+    """Timing of the key events a keyboard delivers
+
+    Measures the intervals between successive key events, press-to-release
+    hold times, and the auto-repeat delay (press to first repeat) and
+    interval. Every event is stored in preallocated ring buffers and folded
+    into the histograms as it arrives; nothing is allocated per event.
+    """
+
+    DEFAULT_CAPACITY = 100_000  # Events kept in the event buffers
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.event_times_ms = array('q', bytes(8 * capacity))
+        self.event_keycodes = array('H', bytes(2 * capacity))
+        self.event_flags = bytearray(capacity)
+        self.press_times_ms = array('q', [NO_TIME]) * KEYCODE_LIMIT
+        self.repeat_times_ms = array('q', [NO_TIME]) * KEYCODE_LIMIT
+        self.reset()
+
+    def reset(self):
+        """Forget all events"""
+        self.count = 0
+        self.presses = 0
+        self.releases = 0
+        self.repeats = 0
+        self.previous_ms = NO_TIME
+        for times in (self.press_times_ms, self.repeat_times_ms):
+            times[:] = array('q', [NO_TIME]) * KEYCODE_LIMIT
+        self.intervals = MillisecondHistogram()
+        self.hold_times = MillisecondHistogram()
+        self.repeat_delays = MillisecondHistogram()
+        self.repeat_intervals = MillisecondHistogram()
+
+    def _store(self, time_ms, slot, flags):
+        index = self.count % self.capacity
+        self.event_times_ms[index] = time_ms
+        self.event_keycodes[index] = slot
+        self.event_flags[index] = flags
+        self.count += 1
+
+    def _interval(self, time_ms):
+        if self.previous_ms != NO_TIME:
+            self.intervals.add(time_ms - self.previous_ms)
+        self.previous_ms = time_ms
+
+    def press(self, keycode, time_ms, auto_repeat=False):
+        """Fold in a key press at the event's timestamp"""
+        slot = keycode_slot(keycode)
+        self._store(time_ms, slot, AUTO_REPEAT_FLAG if auto_repeat else 0)
+        if not auto_repeat:
+            self.presses += 1
+            self._interval(time_ms)
+            self.press_times_ms[slot] = time_ms
+            self.repeat_times_ms[slot] = NO_TIME
+            return
+
+        self.repeats += 1
+        last_repeat_ms = self.repeat_times_ms[slot]
+        if last_repeat_ms != NO_TIME:
+            self.repeat_intervals.add(time_ms - last_repeat_ms)
+        elif self.press_times_ms[slot] != NO_TIME:
+            self.repeat_delays.add(time_ms - self.press_times_ms[slot])
+        self.repeat_times_ms[slot] = time_ms
+
+    def release(self, keycode, time_ms, auto_repeat=False):
+        """Fold in a key release; auto-repeat releases are only stored"""
+        slot = keycode_slot(keycode)
+        self._store(time_ms, slot, RELEASE_FLAG | (AUTO_REPEAT_FLAG if auto_repeat else 0))
+        if auto_repeat:
+            return
+        self.releases += 1
+        self._interval(time_ms)
+        press_ms = self.press_times_ms[slot]
+        if press_ms != NO_TIME:
+            self.hold_times.add(time_ms - press_ms)
+        self.press_times_ms[slot] = NO_TIME
+        self.repeat_times_ms[slot] = NO_TIME
+
+    def events(self):
+        """Yield the buffered (time ms, scan code, flags) events, oldest first"""
+        kept = min(self.count, self.capacity)
+        start = self.count - kept
+        for position in range(start, self.count):
+            index = position % self.capacity
+            yield (self.event_times_ms[index], self.event_keycodes[index],
+                   self.event_flags[index])
+
+    def report(self):
+        """Format the analysis for display"""
+        lines = [f"Events: {self.count} ({self.presses} presses, {self.releases} releases, "
+                 f"{self.repeats} auto-repeats)"]
+        shortest = self.intervals.min_ms
+        if shortest:
+            lines.append(f"Shortest interval: {shortest} ms (at most {1000 / shortest:.0f} "
+                         f"events/s)")
+        elif shortest == 0:
+            lines.append("Shortest interval: under 1 ms")
+        lines.append(f"Inter-event interval: {self.intervals.format()}")
+        lines.append(f"Hold time:            {self.hold_times.format()}")
+        lines.append(f"Auto-repeat delay:    {self.repeat_delays.format()}")
+        lines.append(f"Auto-repeat interval: {self.repeat_intervals.format()}")
+        median_repeat = self.repeat_intervals.percentile(50)
+        if median_repeat:
+            lines.append(f"Auto-repeat rate:     {1000 / median_repeat:.1f} per second")
+        return "\n".join(lines)
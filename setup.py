@@ -22,7 +22,9 @@ setup(
     author_email='jeffrey.lane@canonical.com',
     url='https://github.com/bladernr/keyboard-checker',
     license='GPL-3.0+',
-    py_modules=['keyboard_checker', 'text_samples'],
+    py_modules=['keyboard_checker', 'text_samples', 'typing_scorer', 'history_aggregates',
+                'key_session', 'latency_stats', 'scan_rate', 'rollover',
+                'key_coverage', 'startup_marks'],
     scripts=['keyboard_checker.py'],
     python_requires='>=3.8',
     install_requires=[
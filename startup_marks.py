@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Start-up trace marks - pure Python, no Qt required
+
+keyboard_checker imports this module before anything else, so the first
+mark is taken before its other imports start.
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+
+# (step, time.perf_counter_ns() when it finished). Steps are always
+# marked, since whether to report them is only known once the command
+# line has been parsed.
+STARTUP_MARKS = [("start", time.perf_counter_ns())]
+
+
+def mark_startup(step):
+    """Record that a start-up step has just finished"""
+    STARTUP_MARKS.append((step, time.perf_counter_ns()))
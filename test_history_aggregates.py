@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the running typing history summaries
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import statistics
+import pytest
+
+from history_aggregates import HistoryAggregates, RunningStats
+
+
+RESULTS = [
+    {'duration': 30, 'wpm': 62.5, 'accuracy_percent': 91.0},
+    {'duration': 60, 'wpm': 80.1, 'accuracy_percent': 97.5},
+    {'duration': 60, 'wpm': 74.3, 'accuracy_percent': 99.2},
+    {'duration': 120, 'wpm': 88.0, 'accuracy_percent': 95.0},
+]
+
+
+class TestRunningStats:
+    """Test streaming statistics"""
+
+    def test_empty(self):
+        """Test an empty summary"""
+        summary = RunningStats().summary()
+        assert summary == {'count': 0, 'mean_wpm': 0.0, 'wpm_stdev': 0.0,
+                           'best_wpm': None, 'best_accuracy': None}
+
+    def test_matches_batch_statistics(self):
+        """Test streaming mean and deviation match the statistics module"""
+        stats = RunningStats()
+        for result in RESULTS:
+            stats.add(result)
+
+        wpms = [result['wpm'] for result in RESULTS]
+        assert stats.count == 4
+        assert stats.mean_wpm == pytest.approx(statistics.mean(wpms))
+        assert stats.wpm_variance == pytest.approx(statistics.variance(wpms))
+        assert stats.best_wpm == 88.0
+        assert stats.best_accuracy == 99.2
+
+    def test_result_without_wpm(self):
+        """Test results without a WPM only count towards best accuracy"""
+        stats = RunningStats()
+        stats.add({'accuracy_percent': 90.0})
+        assert stats.count == 0
+        assert stats.best_accuracy == 90.0
+
+    def test_state_round_trip(self):
+        """Test the saved state restores the exact statistics"""
+        stats = RunningStats()
+        for result in RESULTS:
+            stats.add(result)
+
+        restored = RunningStats.from_state(json.loads(json.dumps(stats.to_state())))
+        assert restored.summary() == stats.summary()
+
+    def test_merge_matches_single_stream(self):
+        """Test merging two streams matches adding every result to one"""
+        first, second, single = RunningStats(), RunningStats(), RunningStats()
+        for result in RESULTS[:1]:
+            first.add(result)
+        for result in RESULTS[1:]:
+            second.add(result)
+        for result in RESULTS:
+            single.add(result)
+
+        first.merge(second)
+        assert first.count == single.count
+        assert first.mean_wpm == pytest.approx(single.mean_wpm)
+        assert first.wpm_variance == pytest.approx(single.wpm_variance)
+        assert (first.best_wpm, first.best_accuracy) == (single.best_wpm, single.best_accuracy)
+
+    def test_merge_empty(self):
+        """Test merging with an empty stream changes nothing"""
+        stats = RunningStats()
+        stats.merge(RunningStats())
+        assert stats.summary() == RunningStats().summary()
+        stats.add(RESULTS[0])
+        stats.merge(RunningStats())
+        assert stats.count == 1
+
+
+class TestHistoryAggregates:
+    """Test overall and per-duration summaries"""
+
+    def test_per_duration(self):
+        """Test results are summarized overall and per duration"""
+        aggregates = HistoryAggregates(RESULTS)
+        assert aggregates.get().count == 4
+        assert aggregates.get(60).count == 2
+        assert aggregates.get(60).best_accuracy == 99.2
+        assert aggregates.get(60).mean_wpm == pytest.approx(77.2)
+        assert aggregates.get(15).count == 0
+
+    def test_state_round_trip(self):
+        """Test durations survive a JSON round trip as integers"""
+        aggregates = HistoryAggregates(RESULTS)
+        state = json.loads(json.dumps(aggregates.to_state()))
+        restored = HistoryAggregates.from_state(state)
+
+        assert sorted(restored.by_duration) == [30, 60, 120]
+        assert restored.get(60).summary() == aggregates.get(60).summary()
+        assert restored.get().summary() == aggregates.get().summary()
+
+    def test_merge(self):
+        """Test merged aggregates match aggregates of all the results"""
+        merged = HistoryAggregates(RESULTS[:2])
+        merged.merge(HistoryAggregates(RESULTS[2:]))
+        expected = HistoryAggregates(RESULTS)
+        assert sorted(merged.by_duration) == sorted(expected.by_duration)
+        for duration in (None, 30, 60, 120):
+            assert merged.get(duration).count == expected.get(duration).count
+            assert merged.get(duration).mean_wpm == pytest.approx(expected.get(duration).mean_wpm)
+
+    def test_copy_is_independent(self):
+        """Test adding to a copy leaves the original unchanged"""
+        aggregates = HistoryAggregates(RESULTS)
+        copy = aggregates.copy()
+        copy.add(RESULTS[0])
+        assert aggregates.get().count == 4
+        assert copy.get().count == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-key press counts and layout coverage
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from key_coverage import LAYOUTS, KeyCoverage, LayoutKey, build_layout
+
+
+class TestLayouts:
+    """Test the built-in keyboard layouts"""
+
+    @pytest.mark.parametrize("name, size", [
+        ('full-size', 104), ('tenkeyless', 87), ('compact', 61)])
+    def test_key_counts(self, name, size):
+        """Test each layout has the usual number of keys, each once"""
+        layout = LAYOUTS[name]
+        assert len(layout) == size
+        assert len({key.keycode for key in layout}) == size
+
+    def test_rows_line_up(self):
+        """Test the main block of every row is 15 keys wide"""
+        for row in range(1, 6):
+            main_block = [key for key in LAYOUTS['full-size'] if key.y == row and key.x < 15]
+            assert max(key.x + key.width for key in main_block) == 15
+
+    def test_build_layout(self):
+        """Test keys are placed left to right with gaps"""
+        keys = build_layout([[("A", 38), 0.5, ("Shift", 50, 2.25)], [("Z", 52)]])
+        assert keys == (LayoutKey("A", 38, 0.0, 0, 1.0), LayoutKey("Shift", 50, 1.5, 0, 2.25),
+                        LayoutKey("Z", 52, 0.0, 1, 1.0))
+
+
+class TestKeyCoverage:
+    """Test press counting and coverage"""
+
+    def test_press_counts(self):
+        """Test presses are counted per scan code"""
+        coverage = KeyCoverage()
+        coverage.press(38)
+        coverage.press(38)
+        assert coverage.press(39) == 39
+        assert coverage.counts[38] == 2
+        assert coverage.covered == 2
+        assert coverage.percent == pytest.approx(100 * 2 / 104)
+
+    def test_full_coverage(self):
+        """Test pressing every key of the layout covers it all"""
+        coverage = KeyCoverage('compact')
+        for key in LAYOUTS['compact']:
+            coverage.press(key.keycode)
+        assert coverage.percent == 100
+        assert coverage.untested() == []
+        assert "Every key in the layout has been pressed" in coverage.report()
+
+    def test_keys_outside_layout(self):
+        """Test keys outside the layout are counted but not covered"""
+        coverage = KeyCoverage('compact')
+        coverage.press(67)  # F1
+        assert coverage.covered == 0
+        assert "Keys pressed outside the layout: 1" in coverage.report()
+
+    def test_change_layout(self):
+        """Test switching layout keeps counts and recomputes coverage"""
+        coverage = KeyCoverage('full-size')
+        coverage.press(67)  # F1
+        coverage.press(38)  # A
+        coverage.set_layout('compact')
+        assert coverage.covered == 1
+        assert coverage.in_layout[67] == 0
+        coverage.set_layout('tenkeyless')
+        assert coverage.covered == 2
+
+    def test_untested(self):
+        """Test the untested keys are listed in layout order"""
+        coverage = KeyCoverage('compact')
+        for key in LAYOUTS['compact'][1:]:
+            coverage.press(key.keycode)
+        assert [key.label for key in coverage.untested()] == ["`"]
+        assert "Layout coverage: 60 of 61 keys (98.4%)" in coverage.report()
+
+    def test_reset(self):
+        """Test reset forgets every count"""
+        coverage = KeyCoverage()
+        coverage.press(38)
+        coverage.reset()
+        assert coverage.counts[38] == 0
+        assert coverage.covered == 0
+        assert coverage.percent == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
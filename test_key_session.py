@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Unit tests for recorded key event session files
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from key_session import (MAGIC, MAX_DELTA_US, RECORD, KeyEventRecord, SessionWriter,
+                         read_session, replay_times, write_session)
+
+
+def make_records():
+    """A press, an auto-repeated press and a release, with modifiers and text"""
+    return [
+        KeyEventRecord(5_000_000_000, False, 0x41, 0x02000000, 0x61, False, "A", 38),
+        KeyEventRecord(5_030_000_000, False, 0x41, 0x02000000, 0x61, True, "A", 38),
+        KeyEventRecord(5_045_500_000, True, 0x41, 0, 0x61, False, "é", 38),
+    ]
+
+
+class TestSessionFile:
+    """Test writing and reading session files"""
+
+    def test_round_trip(self, tmp_path):
+        """Test records read back with times relative to the first event"""
+        path = tmp_path / "session.keys"
+        write_session(path, make_records())
+        records = read_session(path)
+        assert [record.time_ns for record in records] == [0, 30_000_000, 45_500_000]
+        assert records[1:] == [record._replace(time_ns=record.time_ns - 5_000_000_000)
+                               for record in make_records()[1:]]
+
+    def test_compact(self, tmp_path):
+        """Test each event takes a fixed-size record plus its text"""
+        path = tmp_path / "session.keys"
+        write_session(path, make_records())
+        assert path.stat().st_size == len(MAGIC) + 3 * RECORD.size + len("AAé".encode())
+
+    def test_writer_appends(self, tmp_path):
+        """Test the writer counts records written one at a time"""
+        path = tmp_path / "session.keys"
+        with SessionWriter(path) as writer:
+            for record in make_records():
+                writer.write(record)
+        assert writer.count == 3
+        assert len(read_session(path)) == 3
+
+    def test_flushed_while_recording(self, tmp_path):
+        """Test records reach the file at least once a second before close"""
+        path = tmp_path / "session.keys"
+        record = make_records()[0]
+        with SessionWriter(path) as writer:
+            writer.write(record)
+            writer.write(record._replace(time_ns=record.time_ns + 500_000_000))
+            assert path.stat().st_size == len(MAGIC)  # Still buffered
+            writer.write(record._replace(time_ns=record.time_ns + 1_000_000_000))
+            assert len(read_session(path)) == 3
+
+    def test_long_pause_clamped(self, tmp_path):
+        """Test pauses too long for a record are shortened"""
+        path = tmp_path / "session.keys"
+        records = make_records()[:1]
+        records.append(records[0]._replace(time_ns=10**16))
+        write_session(path, records)
+        assert read_session(path)[1].time_ns == MAX_DELTA_US * 1000
+
+    def test_empty_session(self, tmp_path):
+        """Test a session with no events"""
+        path = tmp_path / "session.keys"
+        write_session(path, [])
+        assert read_session(path) == []
+
+    def test_not_a_session(self, tmp_path):
+        """Test other files are rejected"""
+        path = tmp_path / "history.jsonl"
+        path.write_text('{"wpm": 50}\n')
+        with pytest.raises(ValueError):
+            read_session(path)
+
+    def test_truncated(self, tmp_path):
+        """Test a file cut off mid-record is rejected"""
+        path = tmp_path / "session.keys"
+        write_session(path, make_records())
+        path.write_bytes(path.read_bytes()[:-1])
+        with pytest.raises(ValueError):
+            read_session(path)
+
+
+class TestReplayTimes:
+    """Test replay scheduling"""
+
+    def test_original_speed(self):
+        """Test records are due at their recorded offsets"""
+        assert replay_times(make_records()) == [0, 30_000_000, 45_500_000]
+
+    def test_faster(self):
+        """Test a speed factor shortens every gap"""
+        assert replay_times(make_records(), speed=2) == [0, 15_000_000, 22_750_000]
+
+    def test_as_fast_as_possible(self):
+        """Test no speed sends everything at once"""
+        assert replay_times(make_records(), speed=None) == [0, 0, 0]
+        assert replay_times(make_records(), speed=0) == [0, 0, 0]
+        assert replay_times([]) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
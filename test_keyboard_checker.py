@@ -18,16 +18,25 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import io
+import os
 import sys
+import time
+import subprocess
 import pytest
-from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt, QEvent
-from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtCore import Qt, QEvent, QEventLoop
+from PyQt6.QtGui import QKeyEvent, QWindow
 from PyQt6.QtTest import QTest
 
-from keyboard_checker import KeyboardChecker
+from keyboard_checker import (KEY_NAMES, MODIFIER_NAMES, STARTUP_MARKS, CoveragePage,
+                              KeyAnalysisPage, KeyboardChecker,
+                              KeySessionRecorder, KeySessionReplayer, ReplayedKeyEvent,
+                              RolloverPage, ScanRatePage, StartupTrace, format_clock_time,
+                              parse_args)
+from key_session import KeyEventRecord, read_session
+from latency_stats import LatencyStats
 
 
 @pytest.fixture(scope="session")
@@ -39,6 +48,20 @@ def qapp():
     yield app
 
 
+def make_key_event(key, text="", modifiers=Qt.KeyboardModifier.NoModifier,
+                   native_key=0, timestamp=0):
+    """Create a mock key event"""
+    event = Mock(spec=QKeyEvent)
+    event.key.return_value = key
+    event.text.return_value = text
+    event.modifiers.return_value = modifiers
+    event.nativeVirtualKey.return_value = native_key
+    event.nativeScanCode.return_value = 0
+    event.timestamp.return_value = timestamp
+    event.isAutoRepeat.return_value = False
+    return event
+
+
 @pytest.fixture
 def window(qapp):
     """Create a KeyboardChecker window for testing"""
@@ -120,6 +143,17 @@ class TestKeyNameConversion:
         result = window.get_key_name(0x9999, "", 0)
         assert result.startswith("KEY_0x")
 
+    def test_int_key_codes(self, window):
+        """Test plain int key codes, as real events report them"""
+        assert window.get_key_name(int(Qt.Key.Key_F35), "", 0) == "F35"
+        assert window.get_key_name(int(Qt.Key.Key_Shift), "", 0x3e) == "SHIFT (RIGHT)"
+        assert window.get_key_name(int(Qt.Key.Key_AltGr), "", 0) == "ALT GR (RIGHT)"
+
+    def test_key_name_table_is_frozen(self):
+        """Test the precomputed key name table is read-only"""
+        with pytest.raises(TypeError):
+            KEY_NAMES[int(Qt.Key.Key_Escape)] = "ESCAPE"
+
 
 class TestModifierKeys:
     """Test modifier key detection"""
@@ -164,6 +198,22 @@ class TestModifierKeys:
         result = window.get_key_name(Qt.Key.Key_Meta, "", 0x86)
         assert result == "META/SUPER (RIGHT)"
 
+    def test_right_shift_press(self, window):
+        """Test a right SHIFT press is named by its scan code, not its keysym"""
+        event = QKeyEvent(QEvent.Type.KeyPress, Qt.Key.Key_Shift,
+                          Qt.KeyboardModifier.ShiftModifier, 62, 0xffe2, 0, "")
+        window.handle_key_press(event)
+
+        assert window.key_records[-1].display_name == "SHIFT (RIGHT)"
+
+    def test_left_shift_press(self, window):
+        """Test a left SHIFT press keeps the left-hand name"""
+        event = QKeyEvent(QEvent.Type.KeyPress, Qt.Key.Key_Shift,
+                          Qt.KeyboardModifier.ShiftModifier, 50, 0xffe1, 0, "")
+        window.handle_key_press(event)
+
+        assert window.key_records[-1].display_name == "SHIFT (LEFT)"
+
 
 class TestModifierNames:
     """Test modifier name conversion"""
@@ -201,6 +251,35 @@ class TestModifierNames:
         assert "SHIFT" in result
         assert "CTRL" in result
 
+    def test_combined_modifier_order(self, window):
+        """Test combined modifiers are listed in a fixed order"""
+        modifiers = (Qt.KeyboardModifier.MetaModifier |
+                     Qt.KeyboardModifier.AltModifier |
+                     Qt.KeyboardModifier.ShiftModifier)
+        assert window.get_modifier_names(modifiers) == "SHIFT + ALT + META"
+
+    def test_keypad_modifier(self, window):
+        """Test KEYPAD modifier"""
+        result = window.get_modifier_names(Qt.KeyboardModifier.KeypadModifier)
+        assert result == "KEYPAD"
+
+    def test_group_switch_modifier(self, window):
+        """Test GROUP SWITCH modifier"""
+        modifiers = (Qt.KeyboardModifier.GroupSwitchModifier |
+                     Qt.KeyboardModifier.ControlModifier)
+        assert window.get_modifier_names(modifiers) == "CTRL + GROUP SWITCH"
+
+    def test_int_modifiers(self, window):
+        """Test plain int modifier bitmasks"""
+        bits = Qt.KeyboardModifier.ShiftModifier.value | Qt.KeyboardModifier.KeypadModifier.value
+        assert window.get_modifier_names(bits) == "SHIFT + KEYPAD"
+
+    def test_every_combination_precomputed(self):
+        """Test the table covers every combination of the six modifiers"""
+        assert len(MODIFIER_NAMES) == 64
+        assert MODIFIER_NAMES[0] == ""
+        assert MODIFIER_NAMES[-1].count(" + ") == 5
+
 
 class TestEscapeDetection:
     """Test escape key detection for exit"""
@@ -214,46 +293,73 @@ class TestEscapeDetection:
         """Test triple rapid escape presses triggers exit"""
         with patch.object(window, 'exit_application') as mock_exit:
             # Simulate 3 rapid presses
-            now = datetime.now()
-            window.escape_press_times = [
-                now,
-                now + timedelta(milliseconds=100),
-                now + timedelta(milliseconds=200)
-            ]
-            window.handle_escape_press()
+            now = time.perf_counter_ns()
+            window.handle_escape_press(now)
+            window.handle_escape_press(now + 100_000_000)
+            window.handle_escape_press(now + 200_000_000)
             mock_exit.assert_called_once()
 
     def test_triple_escape_slow(self, window):
         """Test triple slow escape presses doesn't exit"""
         with patch.object(window, 'exit_application') as mock_exit:
             # Simulate 3 slow presses (more than 1 second apart)
-            now = datetime.now()
-            window.escape_press_times = [
-                now - timedelta(seconds=2),
-                now - timedelta(seconds=1.5),
-                now
-            ]
-            window.handle_escape_press()
+            now = time.perf_counter_ns()
+            window.handle_escape_press(now - 2_000_000_000)
+            window.handle_escape_press(now - 1_500_000_000)
+            window.handle_escape_press(now)
             mock_exit.assert_not_called()
 
     def test_escape_press_list_limit(self, window):
         """Test escape press times list is limited to 3"""
-        for _ in range(5):
-            window.handle_escape_press()
-        assert len(window.escape_press_times) <= 3
+        for press in range(5):
+            window.handle_escape_press(press * 2_000_000_000)
+        assert list(window.escape_press_times) == [
+            4_000_000_000, 6_000_000_000, 8_000_000_000]
 
     def test_escape_hold_timer_starts(self, window):
-        """Test escape hold timer starts on press"""
+        """Test a single-shot hold deadline is armed on press"""
         window.handle_escape_press()
-        assert window.escape_hold_timer is not None
-        assert window.escape_hold_start is not None
+        assert window.escape_hold_timer.isActive()
+        assert window.escape_hold_timer.isSingleShot()
+        assert window.escape_hold_timer.interval() == KeyboardChecker.ESCAPE_HOLD_MS
+
+    def test_escape_hold_deadline_not_rearmed(self, window):
+        """Test a second press before release keeps the first deadline"""
+        window.handle_escape_press(1_000)
+        with patch.object(window.escape_hold_timer, 'start') as mock_start:
+            window.handle_escape_press(5_000_000_000)
+        mock_start.assert_not_called()
+        assert window.escape_hold_timer.isActive()
 
     def test_escape_release_stops_timer(self, window):
         """Test escape release stops hold timer"""
         window.handle_escape_press()
         window.handle_escape_release()
-        assert window.escape_hold_timer is None
-        assert window.escape_hold_start is None
+        assert not window.escape_hold_timer.isActive()
+
+    def test_escape_hold_exits(self, window):
+        """Test the hold deadline firing exits"""
+        with patch.object(window, 'close'):
+            window.handle_escape_press()
+            window.escape_hold_timer.timeout.emit()
+            assert "Exit condition detected" in window.event_log.toPlainText()
+
+    def test_auto_repeat_ignored(self, window):
+        """Test auto-repeat presses and releases of a held ESC are ignored"""
+        with patch.object(window, 'exit_application') as mock_exit:
+            window.handle_key_press(make_key_event(Qt.Key.Key_Escape))
+            for _ in range(5):
+                repeat = make_key_event(Qt.Key.Key_Escape)
+                repeat.isAutoRepeat.return_value = True
+                window.handle_key_release(repeat)
+                window.handle_key_press(repeat)
+
+            assert len(window.escape_press_times) == 1
+            assert window.escape_hold_timer.isActive()
+            mock_exit.assert_not_called()
+
+            window.handle_key_release(make_key_event(Qt.Key.Key_Escape))
+            assert not window.escape_hold_timer.isActive()
 
 
 class TestUIComponents:
@@ -280,7 +386,7 @@ class TestUIComponents:
 
     def test_clear_log(self, window):
         """Test clear log functionality"""
-        window.event_log.append("test entry")
+        window.event_log.appendPlainText("test entry")
         window.clear_log()
         assert window.event_log.toPlainText() == ""
 
@@ -296,6 +402,7 @@ class TestEventHandling:
         event.text.return_value = "a"
         event.modifiers.return_value = Qt.KeyboardModifier.NoModifier
         event.nativeVirtualKey.return_value = 0x26
+        event.timestamp.return_value = 1000
 
         window.handle_key_press(event)
 
@@ -309,6 +416,7 @@ class TestEventHandling:
         event.text.return_value = "A"
         event.modifiers.return_value = Qt.KeyboardModifier.ShiftModifier
         event.nativeVirtualKey.return_value = 0x26
+        event.timestamp.return_value = 1000
 
         window.handle_key_press(event)
 
@@ -326,6 +434,7 @@ class TestEventHandling:
         event.text.return_value = " "
         event.modifiers.return_value = Qt.KeyboardModifier.NoModifier
         event.nativeVirtualKey.return_value = 0x41
+        event.timestamp.return_value = 1000
 
         window.handle_key_press(event)
 
@@ -341,11 +450,602 @@ class TestEventHandling:
             event.text.return_value = ""
             event.modifiers.return_value = Qt.KeyboardModifier.NoModifier
             event.nativeVirtualKey.return_value = 0x9
+            event.timestamp.return_value = 1000
+            event.isAutoRepeat.return_value = False
 
             window.handle_key_press(event)
             mock_escape.assert_called_once()
 
 
+class TestEventLogCapacity:
+    """Test the bounded event log"""
+
+    def test_records_structured_events(self, window):
+        """Test key presses are kept as structured records"""
+        window.handle_key_press(make_key_event(Qt.Key.Key_A, "a", native_key=0x26))
+
+        record = window.key_records[-1]
+        assert record.event == "PRESS"
+        assert record.key == Qt.Key.Key_A
+        assert record.native_key == 0x26
+        assert record.display_name == "A"
+
+    def test_log_is_bounded(self, qapp):
+        """Test records and log lines stop growing at the capacity"""
+        win = KeyboardChecker(log_capacity=5)
+        for i in range(12):
+            win.handle_key_press(make_key_event(Qt.Key.Key_A + i, chr(ord('a') + i)))
+
+        assert len(win.key_records) == 5
+        assert win.key_records[0].display_name == "H"
+        assert win.event_log.document().blockCount() == 5
+        assert win.event_log.toPlainText().splitlines()[-1].endswith(
+            "PRESS: L | Qt:76 Native:0x0000")
+        win.close()
+
+    def test_clear_log_clears_records(self, window):
+        """Test clearing the log also drops the records"""
+        window.handle_key_press(make_key_event(Qt.Key.Key_A, "a"))
+        window.clear_log()
+        assert len(window.key_records) == 0
+
+    def test_default_capacity(self, window):
+        """Test the default capacity applies to the log view"""
+        assert window.key_records.maxlen == KeyboardChecker.DEFAULT_LOG_CAPACITY
+        assert window.event_log.maximumBlockCount() == KeyboardChecker.DEFAULT_LOG_CAPACITY
+
+
+class TestTimestamps:
+    """Test monotonic integer event timestamps"""
+
+    def test_record_times_are_integers(self, window):
+        """Test records keep the event time and receipt time as integers"""
+        before = time.perf_counter_ns()
+        window.handle_key_press(make_key_event(Qt.Key.Key_A, "a", timestamp=5000))
+        record = window.key_records[-1]
+
+        assert record.event_time_ms == 5000
+        assert isinstance(record.received_ns, int)
+        assert before <= record.received_ns <= time.perf_counter_ns()
+
+    def test_interval_between_keys(self, window):
+        """Test the interval comes from the events' own timestamps"""
+        window.handle_key_press(make_key_event(Qt.Key.Key_A, "a", timestamp=5000))
+        window.handle_key_press(make_key_event(Qt.Key.Key_B, "b", timestamp=5137))
+
+        assert window.key_records[0].interval_ms is None
+        assert window.key_records[1].interval_ms == 137
+        assert "Since Previous Key: 137 ms" in window.details_label.text()
+
+    def test_log_line_shows_clock_time(self, window):
+        """Test the log line formats the receipt time as a clock time"""
+        window.handle_key_press(make_key_event(Qt.Key.Key_A, "a"))
+        expected = format_clock_time(window.key_records[-1].received_ns)
+        assert window.event_log.toPlainText().startswith(f"[{expected}] PRESS: A")
+
+    def test_format_clock_time(self):
+        """Test clock time formatting keeps millisecond resolution"""
+        base = format_clock_time(0)
+        later = format_clock_time(1_234_000_000)
+        assert len(base) == len("12:34:56.789")
+        millis = (int(base[-3:]) + 234) % 1000
+        assert later.endswith(f".{millis:03d}")
+
+
+class TestBatchedUpdates:
+    """Test frame-coalesced display updates"""
+
+    @pytest.fixture
+    def batch_window(self, qapp):
+        win = KeyboardChecker(batch_updates=True)
+        yield win
+        win.close()
+
+    def test_display_waits_for_flush(self, batch_window):
+        """Test key presses are queued until the frame flush"""
+        batch_window.handle_key_press(make_key_event(Qt.Key.Key_A, "a"))
+
+        assert batch_window.current_key_label.text() != "A"
+        assert len(batch_window.pending_records) == 1
+        assert batch_window.flush_timer.isActive()
+
+    def test_flush_coalesces_events(self, batch_window):
+        """Test one flush shows every queued event and the latest key"""
+        for i in range(4):
+            batch_window.handle_key_press(make_key_event(Qt.Key.Key_A + i, chr(ord('a') + i)))
+        batch_window.flush_pending()
+
+        assert batch_window.current_key_label.text() == "D"
+        assert "Key Name: D" in batch_window.details_label.text()
+        assert batch_window.event_log.toPlainText().count("PRESS") == 4
+        assert batch_window.last_flush_size == 4
+        assert batch_window.flush_count == 1
+        assert batch_window.pending_records == []
+        assert not batch_window.flush_timer.isActive()
+        assert "Coalesced 4" in batch_window.statusBar().currentMessage()
+
+    def test_empty_flush_is_noop(self, batch_window):
+        """Test flushing with nothing queued does not count a flush"""
+        batch_window.flush_pending()
+        assert batch_window.flush_count == 0
+
+    def test_flush_before_exit_message(self, batch_window):
+        """Test queued events are shown before the exit message"""
+        batch_window.handle_key_press(make_key_event(Qt.Key.Key_A, "a"))
+        with patch.object(batch_window, 'close'):
+            batch_window.exit_application()
+        lines = batch_window.event_log.toPlainText().splitlines()
+        assert "PRESS: A" in lines[0]
+        assert "Exit condition detected" in lines[-1]
+
+    def test_frame_interval(self, batch_window):
+        """Test the frame interval is a sane number of milliseconds"""
+        assert 1 <= batch_window.frame_interval_ms() <= 100
+
+
+class TestCommandLine:
+    """Test command line parsing"""
+
+    def test_defaults(self):
+        """Test default options"""
+        args, qt_args = parse_args([])
+        assert args.log_capacity == KeyboardChecker.DEFAULT_LOG_CAPACITY
+        assert args.batch_updates is False
+        assert qt_args == []
+
+    def test_batch_updates(self):
+        """Test batch updates flag"""
+        args, _ = parse_args(["--batch-updates"])
+        assert args.batch_updates is True
+
+    def test_log_capacity(self):
+        """Test log capacity option and Qt options passthrough"""
+        args, qt_args = parse_args(["--log-capacity", "100", "-platform", "offscreen"])
+        assert args.log_capacity == 100
+        assert qt_args == ["-platform", "offscreen"]
+
+    def test_history_backend(self):
+        """Test history backend selection"""
+        assert parse_args([])[0].history_backend == 'json'
+        assert parse_args(["--history-backend", "sqlite"])[0].history_backend == 'sqlite'
+        with pytest.raises(SystemExit):
+            parse_args(["--history-backend", "csv"])
+
+    def test_history_retention(self):
+        """Test history retention and compaction options"""
+        args, _ = parse_args([])
+        assert args.history_keep_results is None
+        assert args.history_keep_days is None
+        assert args.archive_format == 'gzip'
+        assert args.compact_history is None
+
+        args, _ = parse_args(["--history-keep-results", "500", "--history-keep-days", "90",
+                              "--archive-format", "lzma", "--compact-history", "drop"])
+        assert args.history_keep_results == 500
+        assert args.history_keep_days == 90
+        assert args.archive_format == 'lzma'
+        assert args.compact_history == 'drop'
+
+    def test_startup_trace(self):
+        """Test start-up trace options"""
+        args, _ = parse_args([])
+        assert args.trace_startup is False
+        assert args.quit_after_startup is False
+        args, _ = parse_args(["--trace-startup", "--quit-after-startup"])
+        assert args.trace_startup is True
+        assert args.quit_after_startup is True
+
+    def test_sessions(self):
+        """Test session recording and replay options"""
+        args, _ = parse_args([])
+        assert args.record_session is None
+        assert args.replay_session is None
+        assert args.replay_speed == 1.0
+        assert args.replay_into == 'checker'
+
+        args, _ = parse_args(["--replay-session", "a.keys", "--replay-speed", "0",
+                              "--replay-into", "typing"])
+        assert args.replay_session == "a.keys"
+        assert args.replay_speed == 0
+        assert args.replay_into == 'typing'
+        with pytest.raises(SystemExit):
+            parse_args(["--replay-speed", "-1"])
+
+    def test_latency(self):
+        """Test latency measurement options"""
+        args, _ = parse_args([])
+        assert args.latency_stats is False
+        assert args.latency_dump is None
+        args, _ = parse_args(["--latency-stats", "--latency-dump", "latency.json"])
+        assert args.latency_stats is True
+        assert args.latency_dump == "latency.json"
+
+    def test_invalid_log_capacity(self):
+        """Test zero capacity is rejected"""
+        with pytest.raises(SystemExit):
+            parse_args(["--log-capacity", "0"])
+
+
+class TestStartupTrace:
+    """Test the start-up trace"""
+
+    def test_import_marks(self):
+        """Test module imports are marked in order"""
+        steps = [step for step, _ in STARTUP_MARKS]
+        assert steps[:6] == ["start", "import stdlib", "import PyQt6",
+                             "import text_samples", "import helpers", "module body"]
+        times = [mark_ns for _, mark_ns in STARTUP_MARKS]
+        assert times == sorted(times)
+
+    def test_storage_modules_imported_lazily(self):
+        """Test importing the checker leaves the history storage modules unloaded"""
+        lazy = ["gzip", "lzma", "queue", "sqlite3", "threading"]
+        code = ("import sys, keyboard_checker; "
+                f"print([name for name in {lazy!r} if name in sys.modules])")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        assert output.stdout.strip() == "[]"
+
+    def test_steps(self):
+        """Test step and total times are measured from the first mark"""
+        trace = StartupTrace([("start", 0), ("a", 2_000_000), ("b", 5_000_000)])
+        assert trace.steps() == [("a", 2.0, 2.0), ("b", 3.0, 5.0)]
+
+    def test_window_steps(self, qapp):
+        """Test window construction and first paint and focus are marked"""
+        stream = io.StringIO()
+        trace = StartupTrace([("start", time.perf_counter_ns())], stream=stream)
+        win = KeyboardChecker(startup_trace=trace)
+        assert [step for step, _ in trace.marks] == ["start", "init_ui", "init_mode_switching"]
+
+        trace.eventFilter(win, QEvent(QEvent.Type.Paint))
+        trace.eventFilter(win, QEvent(QEvent.Type.Paint))
+        assert not trace.done
+        trace.eventFilter(win, QEvent(QEvent.Type.FocusIn))
+        assert trace.done
+        assert [step for step, _ in trace.marks][-2:] == ["first paint", "first focus"]
+        report = stream.getvalue()
+        assert report.startswith("Start-up trace")
+        assert "first focus" in report
+        win.close()
+
+    def test_report_once(self, window):
+        """Test an unfinished trace reports missing steps, only once"""
+        stream = io.StringIO()
+        trace = StartupTrace([("start", time.perf_counter_ns())], stream=stream)
+        trace.watch(window)
+        trace.finish()
+        trace.finish()
+        report = stream.getvalue()
+        assert report.count("Start-up trace") == 1
+        assert "first paint" in report and "not seen" in report
+
+
+def make_session(keys="abc", interval_ns=20_000_000):
+    """Key press records typing keys at a steady pace"""
+    return [KeyEventRecord(i * interval_ns, False, ord(char.upper()), 0, ord(char), False, char)
+            for i, char in enumerate(keys)]
+
+
+class TestKeySessions:
+    """Test recording and replaying key sessions"""
+
+    def test_record(self, qapp, tmp_path):
+        """Test key events reaching a top-level window are recorded once"""
+        path = tmp_path / "session.keys"
+        recorder = KeySessionRecorder(path)
+        top_level = QWindow()
+        press = QKeyEvent(QEvent.Type.KeyPress, Qt.Key.Key_A,
+                          Qt.KeyboardModifier.ShiftModifier, 38, 0x61, 0, "A", True)
+        release = QKeyEvent(QEvent.Type.KeyRelease, Qt.Key.Key_A,
+                            Qt.KeyboardModifier.NoModifier, 38, 0x61, 0, "a")
+        recorder.eventFilter(top_level, press)
+        recorder.eventFilter(top_level, release)
+        recorder.eventFilter(QApplication.instance(), press)  # Not a window
+        recorder.eventFilter(top_level, QEvent(QEvent.Type.Paint))
+        recorder.stop()
+
+        records = read_session(path)
+        assert [(r.time_ns, r.release, r.key, r.text, r.native_key, r.auto_repeat)
+                for r in records] == [
+            (0, False, Qt.Key.Key_A, "A", 0x61, True),
+            (0, True, Qt.Key.Key_A, "a", 0x61, False)]
+        assert records[0].modifiers == Qt.KeyboardModifier.ShiftModifier.value
+        assert [r.native_scan_code for r in records] == [38, 38]
+
+    def test_replay_into_checker(self, window):
+        """Test replayed events are handled with their recorded timing"""
+        replayer = KeySessionReplayer(make_session(), window, speed=0)
+        replayer.start()
+        assert [record.key_name for record in window.key_records] == ["A", "B", "C"]
+        assert [record.native_key for record in window.key_records] == [0x61, 0x62, 0x63]
+        assert [record.interval_ms for record in window.key_records] == [None, 20, 20]
+
+    def test_record_event_timestamps(self, qapp, tmp_path):
+        """Test events are timed by their timestamps, not by when they are filtered"""
+        path = tmp_path / "session.keys"
+        recorder = KeySessionRecorder(path)
+        top_level = QWindow()
+        # A backlog delivered in one burst, typed 120 ms apart
+        for record in make_session(interval_ns=120_000_000):
+            recorder.eventFilter(top_level, ReplayedKeyEvent(
+                record._replace(time_ns=record.time_ns + 5_000_000_000)))
+        recorder.stop()
+        assert [r.time_ns for r in read_session(path)] == [0, 120_000_000, 240_000_000]
+
+    def test_replayed_event(self, qapp):
+        """Test a replayed event carries the recorded key, scan code and time"""
+        record = KeyEventRecord(1_234_000_000, True, Qt.Key.Key_A, 0, 0x61, False, "a", 38)
+        event = ReplayedKeyEvent(record)
+        assert event.type() == QEvent.Type.KeyRelease
+        assert (event.key(), event.nativeVirtualKey(), event.nativeScanCode()) == (
+            Qt.Key.Key_A, 0x61, 38)
+        assert event.timestamp() == 1234
+
+    def test_replay_scan_codes(self, window):
+        """Test replayed events drive the scan code keyed modes"""
+        window.switch_to_analysis(CoveragePage)
+        records = [record._replace(native_scan_code=scan_code)
+                   for record, scan_code in zip(make_session(), (38, 56, 54))]
+        KeySessionReplayer(records, window, speed=0).start()
+        counts = window.key_analyzer.coverage.counts
+        assert (counts[38], counts[56], counts[54]) == (1, 1, 1)
+
+    def test_replay_speed(self, window):
+        """Test a faster replay still sends every event, in order, on time"""
+        replayer = KeySessionReplayer(make_session(interval_ns=40_000_000), window, speed=4)
+        loop = QEventLoop()
+        replayer.finished.connect(loop.quit)
+        start_ns = time.perf_counter_ns()
+        replayer.start()
+        assert len(window.key_records) == 1  # The rest are not due yet
+        loop.exec()
+        assert time.perf_counter_ns() - start_ns >= 20_000_000
+        assert [record.key_name for record in window.key_records] == ["A", "B", "C"]
+
+
+class TestLatencyStats:
+    """Test key handling latency measurement"""
+
+    def test_not_measured_by_default(self, window):
+        """Test no latency readout or histograms without LatencyStats"""
+        assert window.latency is None
+        window.keyPressEvent(make_key_event(Qt.Key.Key_A, "a"))
+        assert len(window.key_records) == 1
+
+    def test_key_press_measured(self, qapp):
+        """Test key presses add a queueing delay and a handler duration"""
+        latency = LatencyStats()
+        win = KeyboardChecker(latency=latency)
+        now_ms = time.monotonic_ns() // 1_000_000
+        record = KeyEventRecord(now_ms * 1_000_000, False, Qt.Key.Key_A, 0, 0x61, False, "a")
+        QApplication.sendEvent(win, ReplayedKeyEvent(record))
+        win.keyPressEvent(make_key_event(Qt.Key.Key_B, "b"))  # Timestamp 0
+
+        assert latency.duration["key press"].count == 2
+        assert latency.queue_delay["key press"].count == 1
+        assert latency.unsynced == 1
+        win.update_latency_label()
+        assert win.latency_label.text().startswith("key press: queue p99")
+        win.close()
+
+    def test_typing_test_shares_stats(self, qapp):
+        """Test the typing test page records into the window's stats"""
+        latency = LatencyStats()
+        win = KeyboardChecker(latency=latency)
+        with patch('keyboard_checker.TypingTest.load_and_display_history'):
+            win.switch_to_typing_test()
+        assert win.typing_test.latency is latency
+        win.close()
+
+
+class TestModeSwitching:
+    """Test switching between the key checker and the typing test"""
+
+    def test_typing_test_built_on_demand(self, window):
+        """Test the typing test is only built when first shown"""
+        assert window.typing_test is None
+        assert window.stacked_widget.count() == 2
+
+        with patch('keyboard_checker.TypingTest.load_and_display_history'):
+            window.switch_to_typing_test()
+        typing_test = window.typing_test
+        assert typing_test is not None
+        assert window.stacked_widget.count() == 2
+        assert window.stacked_widget.currentWidget() is window.typing_test_widget
+        assert window.typing_test_widget.isAncestorOf(typing_test)
+
+        window.switch_to_keyboard_checker()
+        window.switch_to_typing_test()
+        assert window.typing_test is typing_test
+
+    def test_history_made_on_demand(self, qapp):
+        """Test the typing test history is only made when the typing test is shown"""
+        history = Mock()
+        factory = Mock(return_value=history)
+        win = KeyboardChecker(history_factory=factory)
+        factory.assert_not_called()
+
+        with patch('keyboard_checker.TypingTest.load_and_display_history'):
+            win.switch_to_typing_test()
+        factory.assert_called_once_with()
+        assert win.typing_test.history is history
+        win.close()
+
+    def test_switch_back(self, window):
+        """Test switching back to the key checker"""
+        with patch('keyboard_checker.TypingTest.load_and_display_history'):
+            window.switch_to_typing_test()
+        window.switch_to_keyboard_checker()
+        assert window.stacked_widget.currentWidget() is window.keyboard_checker_widget
+        assert window.windowTitle() == "Keyboard Checker"
+
+
+def make_native_key_event(event_type, scan_code, timestamp, auto_repeat=False):
+    """Create a mock key event with a native scan code"""
+    event = make_key_event(Qt.Key.Key_A, "a", timestamp=timestamp)
+    event.type.return_value = event_type
+    event.nativeScanCode.return_value = scan_code
+    event.isAutoRepeat.return_value = auto_repeat
+    return event
+
+
+class TestKeyAnalysisPage:
+    """Test the defaults of the key analysis page base class"""
+
+    def test_subclass_overrides_only_what_it_needs(self, qapp):
+        """Test a page that only counts presses needs no other methods"""
+        class PressCountPage(KeyAnalysisPage):
+            TITLE = "Press Count"
+            presses = 0
+
+            def key_press(self, event):
+                self.presses += 1
+
+        page = PressCountPage()
+        page.key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 0))
+        page.key_release(make_native_key_event(QEvent.Type.KeyRelease, 38, 0))
+        page.reset_analysis()
+        assert page.presses == 1
+        assert page.report_label.text() == ""
+        page.close()
+
+
+class TestScanRateMode:
+    """Test the scan rate analyzer mode"""
+
+    def test_switch(self, window):
+        """Test the page is built on first use and takes the key events"""
+        window.switch_to_analysis(ScanRatePage)
+        page = window.analysis_pages[ScanRatePage]
+        assert window.stacked_widget.currentWidget() is page
+        assert window.key_analyzer is page
+        assert window.windowTitle() == "Keyboard Checker - Scan Rate Analyzer"
+
+        window.switch_to_keyboard_checker()
+        assert window.key_analyzer is None
+        window.switch_to_analysis(ScanRatePage)
+        assert window.analysis_pages[ScanRatePage] is page
+
+    def test_events_analyzed_not_logged(self, window):
+        """Test key events go to the analyzer instead of the event log"""
+        window.switch_to_analysis(ScanRatePage)
+        page = window.key_analyzer
+        window.handle_key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 1000))
+        window.handle_key_release(make_native_key_event(QEvent.Type.KeyRelease, 38, 1090))
+        assert len(window.key_records) == 0
+        assert page.analyzer.presses == 1
+        assert page.analyzer.hold_times.max_ms == 90
+        assert page.dirty
+
+        page.refresh_if_dirty()
+        assert not page.dirty
+        assert "Events: 2" in page.report_label.text()
+
+    def test_escape_still_exits(self, window):
+        """Test triple ESC exits from an analysis mode"""
+        window.switch_to_analysis(ScanRatePage)
+        with patch.object(window, 'exit_application') as mock_exit:
+            for _ in range(3):
+                window.handle_key_press(make_key_event(Qt.Key.Key_Escape))
+        mock_exit.assert_called_once()
+
+    def test_reset_and_back(self, window):
+        """Test the reset and back buttons"""
+        window.switch_to_analysis(ScanRatePage)
+        page = window.key_analyzer
+        page.key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 1000))
+        page.reset_analysis()
+        assert page.analyzer.count == 0
+        assert "Events: 0" in page.report_label.text()
+
+        page.back_requested.emit()
+        assert window.stacked_widget.currentWidget() is window.keyboard_checker_widget
+
+
+class TestRolloverMode:
+    """Test the rollover test mode"""
+
+    def test_held_keys_named(self, window):
+        """Test held keys are tracked by scan code and shown by name"""
+        window.switch_to_analysis(RolloverPage)
+        page = window.key_analyzer
+        for scan_code in (38, 39, 40):
+            window.handle_key_press(make_native_key_event(QEvent.Type.KeyPress, scan_code, 0))
+        window.handle_key_release(make_native_key_event(QEvent.Type.KeyRelease, 38, 0))
+        assert page.tester.held_count == 2
+        assert page.tester.max_held == 3
+        page.refresh_if_dirty()
+        assert "Most held at once: 3" in page.report_label.text()
+        assert page.tester.key_names[38] == "A"
+
+    def test_auto_repeat_ignored(self, window):
+        """Test auto-repeat events don't count as releases and presses"""
+        window.switch_to_analysis(RolloverPage)
+        page = window.key_analyzer
+        page.key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 0))
+        page.key_release(make_native_key_event(QEvent.Type.KeyRelease, 38, 0, auto_repeat=True))
+        assert page.tester.held_count == 1
+
+    def test_learn_chord_button(self, window):
+        """Test the chord button toggles between learning and testing"""
+        window.switch_to_analysis(RolloverPage)
+        page = window.key_analyzer
+        page.chord_btn.click()
+        assert page.tester.learning
+        assert page.chord_btn.text() == "Test Chord"
+        page.key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 0))
+        page.key_release(make_native_key_event(QEvent.Type.KeyRelease, 38, 0))
+        page.chord_btn.click()
+        assert not page.tester.learning
+        assert page.tester.chord == [38]
+        assert "Chord: A (1 key)" in page.report_label.text()
+
+
+class TestCoverageMode:
+    """Test the key coverage mode"""
+
+    def test_presses_counted(self, window):
+        """Test presses are counted and auto-repeats are not"""
+        window.switch_to_analysis(CoveragePage)
+        page = window.key_analyzer
+        window.handle_key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 0))
+        window.handle_key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 0, True))
+        window.handle_key_press(make_native_key_event(QEvent.Type.KeyPress, 39, 0))
+        assert page.coverage.counts[38] == 1
+        assert page.changed_keys == [38, 39]
+
+        page.refresh_if_dirty()
+        assert page.changed_keys == []
+        assert "Layout coverage: 2 of 104 keys" in page.report_label.text()
+
+    def test_repaints_only_changed_keys(self, window):
+        """Test a press repaints just that key"""
+        window.switch_to_analysis(CoveragePage)
+        page = window.key_analyzer
+        view = page.layout_view
+        view.resize(view.sizeHint())
+        view.grab()
+        assert view.painted_keys == 104
+
+        page.key_press(make_native_key_event(QEvent.Type.KeyPress, 38, 0))
+        with patch.object(view, 'update') as mock_update:
+            page.refresh()
+        mock_update.assert_called_once_with(view.key_rects[38])
+        view.grab(view.key_rects[38])
+        assert view.painted_keys == 1
+
+    def test_choose_layout(self, window):
+        """Test choosing a layout changes the keys covered"""
+        window.switch_to_analysis(CoveragePage)
+        page = window.key_analyzer
+        page.key_press(make_native_key_event(QEvent.Type.KeyPress, 67, 0))  # F1
+        page.layout_combo.setCurrentText('compact')
+        assert page.coverage.layout_name == 'compact'
+        assert 67 not in page.layout_view.key_rects
+        assert "Layout coverage: 0 of 61 keys" in page.report_label.text()
+
+
 class TestExitApplication:
     """Test exit application functionality"""
 
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Unit tests for key handling latency histograms
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import random
+
+import pytest
+
+from latency_stats import BUCKET_BOUNDS_NS, LatencyHistogram, LatencyStats
+
+
+def exact_percentile(values, percent):
+    """Nearest-rank percentile of a list"""
+    ordered = sorted(values)
+    return ordered[max(1, -(-len(ordered) * percent // 100)) - 1]
+
+
+class TestLatencyHistogram:
+    """Test the fixed-bucket histogram"""
+
+    def test_bucket_bounds(self):
+        """Test buckets cover 1 us to 60 s and grow by at most 10%"""
+        assert BUCKET_BOUNDS_NS[0] == 1000
+        assert BUCKET_BOUNDS_NS[-1] == 60_000_000_000
+        for lower, upper in zip(BUCKET_BOUNDS_NS, BUCKET_BOUNDS_NS[1:]):
+            assert lower < upper <= lower * 1.1 + 1
+
+    def test_percentiles_within_bucket_error(self):
+        """Test percentiles are within 10% above the exact values"""
+        rng = random.Random(0)
+        values = [round(rng.lognormvariate(13, 1.5)) for _ in range(5000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.add(value)
+        assert histogram.count == 5000
+        assert histogram.max_ns == max(values)
+        for percent in (50, 95, 99):
+            exact = exact_percentile(values, percent)
+            assert exact <= histogram.percentile(percent) <= max(exact * 1.1 + 1, 1000)
+
+    def test_max_caps_percentiles(self):
+        """Test a percentile never exceeds the largest value seen"""
+        histogram = LatencyHistogram()
+        histogram.add(1_234_567)
+        assert histogram.percentile(50) == 1_234_567
+        assert histogram.percentile(100) == 1_234_567
+
+    def test_overflow(self):
+        """Test durations past the last bucket are kept"""
+        histogram = LatencyHistogram()
+        histogram.add(100_000_000_000)
+        assert histogram.counts[-1] == 1
+        assert histogram.percentile(99) == 100_000_000_000
+
+    def test_empty(self):
+        """Test an empty histogram has no percentiles"""
+        histogram = LatencyHistogram()
+        assert histogram.percentile(50) is None
+        assert histogram.summary() == {'count': 0, 'p50_ms': None, 'p95_ms': None,
+                                       'p99_ms': None, 'max_ms': None}
+        assert histogram.format() == "no events"
+
+    def test_summary(self):
+        """Test the summary is in milliseconds"""
+        histogram = LatencyHistogram()
+        for _ in range(10):
+            histogram.add(2_000_000)
+        summary = histogram.summary()
+        assert summary['count'] == 10
+        assert summary['max_ms'] == 2.0
+        assert summary['p50_ms'] == 2.0
+
+
+class TestLatencyStats:
+    """Test the per-handler latency statistics"""
+
+    def test_queue_delay(self):
+        """Test queueing delay is measured from the event timestamp"""
+        stats = LatencyStats()
+        stats.add_queue_delay("key press", 1000, entry_ns=1_003_000_000)
+        histogram = stats.queue_delay["key press"]
+        assert histogram.count == 1
+        assert histogram.max_ns == 3_000_000
+
+    def test_unsynced_timestamps(self):
+        """Test timestamps on another clock are counted but not measured"""
+        stats = LatencyStats()
+        stats.add_queue_delay("key press", 5000, entry_ns=1_000_000_000)  # In the future
+        stats.add_queue_delay("key press", 0, entry_ns=10**15)  # Days ago
+        assert stats.unsynced == 2
+        assert "key press" not in stats.queue_delay
+
+    def test_status_text(self):
+        """Test the status bar readout names each handler"""
+        stats = LatencyStats()
+        assert stats.status_text() == "No key events measured yet"
+        stats.add_duration("typing", 250_000)
+        assert stats.status_text() == "typing: queue p99 - ms, handler p99 0.25 ms"
+
+    def test_dump(self, tmp_path):
+        """Test the histograms are written with their bucket counts"""
+        stats = LatencyStats()
+        stats.add_queue_delay("typing", 1000, entry_ns=1_002_000_000)
+        stats.add_duration("typing", 50_000)
+        stats.add_queue_delay("typing", 0, entry_ns=10**15)
+        path = tmp_path / "latency.json"
+        stats.dump(path)
+
+        dumped = json.loads(path.read_text())
+        assert dumped['unsynced_events'] == 1
+        assert dumped['handler_duration']['typing']['count'] == 1
+        assert dumped['queue_delay']['typing']['max_ms'] == 2.0
+        assert sum(dumped['queue_delay']['typing']['buckets']) == 1
+        assert len(dumped['bucket_bounds_ns']) == len(BUCKET_BOUNDS_NS)
+        assert "Queueing delay, typing" in stats.report()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
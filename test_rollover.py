@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the key rollover and ghosting test
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from rollover import RolloverTester
+
+
+# Scan codes of A S D F on an X11 keyboard
+A, S, D, F = 38, 39, 40, 41
+
+
+@pytest.fixture
+def tester():
+    """Create a RolloverTester with A S D learned as the chord"""
+    tester = RolloverTester()
+    tester.start_learning()
+    for keycode, name in ((A, "A"), (S, "S"), (D, "D")):
+        tester.press(keycode, name)
+        tester.release(keycode)
+    tester.finish_learning()
+    return tester
+
+
+def hold(tester, keycodes):
+    """Press the keys in order, then release them all"""
+    for keycode in keycodes:
+        tester.press(keycode)
+    for keycode in keycodes:
+        tester.release(keycode)
+
+
+class TestHeldKeys:
+    """Test tracking of held keys"""
+
+    def test_max_held(self):
+        """Test the most keys held at once is kept"""
+        tester = RolloverTester()
+        for keycode in range(30, 40):
+            tester.press(keycode)
+        tester.release(30)
+        tester.release(31)
+        assert tester.held_count == 8
+        assert tester.max_held == 10
+        assert tester.held_keys() == list(range(32, 40))
+
+    def test_repeated_press_ignored(self):
+        """Test a second press of a held key is not counted again"""
+        tester = RolloverTester()
+        tester.press(A)
+        tester.press(A)
+        assert tester.held_count == 1
+
+    def test_release_without_press(self):
+        """Test a release with no press is a dropped press"""
+        tester = RolloverTester()
+        tester.press(A, "A")
+        tester.release(S)
+        assert tester.orphan_releases == 1
+        assert tester.dropped[S] == 1
+        assert tester.held_count == 1
+        assert "Releases without a press: 1" in tester.report()
+
+
+class TestChord:
+    """Test chord learning and ghosting detection"""
+
+    def test_learned_chord(self, tester):
+        """Test learning records the chord keys in order"""
+        assert tester.chord == [A, S, D]
+        assert tester.attempts == 0
+        assert "Chord: A S D (3 keys)" in tester.report()
+
+    def test_complete_chord(self, tester):
+        """Test an attempt holding every chord key passes"""
+        hold(tester, [A, S, D, F])
+        assert tester.attempts == 1
+        assert tester.passed == 1
+        assert tester.last_missing == []
+        assert "Last attempt: every key registered" in tester.report()
+
+    def test_dropped_chord_key(self, tester):
+        """Test a chord key that never arrived is reported as dropped"""
+        hold(tester, [A, S])
+        assert tester.attempts == 1
+        assert tester.passed == 0
+        assert tester.last_missing == [D]
+        assert tester.dropped[D] == 1
+        assert "Last attempt: missing D" in tester.report()
+        assert "Dropped presses: D x1" in tester.report()
+
+    def test_keys_not_held_together(self, tester):
+        """Test an attempt fails if the chord keys were never all down"""
+        tester.press(A)
+        tester.press(S)
+        tester.release(A)
+        tester.press(D)
+        tester.release(S)
+        tester.release(D)
+        assert tester.passed == 0
+        assert tester.last_missing == []  # Nothing dropped; just not held together
+        assert tester.attempts == 1
+
+    def test_attempt_ends_when_all_released(self, tester):
+        """Test an attempt only ends once no key is held"""
+        tester.press(A)
+        tester.press(S)
+        tester.press(D)
+        tester.release(A)
+        assert tester.attempts == 0
+        tester.release(S)
+        tester.release(D)
+        assert tester.passed == 1
+
+    def test_relearn(self, tester):
+        """Test learning a new chord replaces the old one"""
+        tester.start_learning()
+        tester.press(F, "F")
+        tester.release(F)
+        tester.finish_learning()
+        assert tester.chord == [F]
+        hold(tester, [A])
+        assert tester.attempts == 0  # A is no longer in the chord
+
+    def test_reset_keeps_chord(self, tester):
+        """Test reset forgets results but not the chord"""
+        hold(tester, [A])
+        tester.reset()
+        assert tester.attempts == 0
+        assert tester.dropped[S] == 0
+        assert tester.chord == [A, S, D]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Unit tests for key event timing analysis
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from scan_rate import (AUTO_REPEAT_FLAG, KEYCODE_LIMIT, RELEASE_FLAG, MillisecondHistogram,
+                       ScanRateAnalyzer, keycode_slot)
+
+
+@pytest.fixture
+def analyzer():
+    """Create a ScanRateAnalyzer with a small event buffer"""
+    return ScanRateAnalyzer(capacity=8)
+
+
+def hold_with_repeats(analyzer, keycode, press_ms, delay_ms, interval_ms, repeats, release_ms):
+    """Feed a held key auto-repeating the way X11 reports it"""
+    analyzer.press(keycode, press_ms)
+    time_ms = press_ms + delay_ms
+    for _ in range(repeats):
+        analyzer.release(keycode, time_ms, auto_repeat=True)
+        analyzer.press(keycode, time_ms, auto_repeat=True)
+        time_ms += interval_ms
+    analyzer.release(keycode, release_ms)
+
+
+class TestMillisecondHistogram:
+    """Test the exact millisecond histogram"""
+
+    def test_percentiles(self):
+        """Test percentiles are exact nearest-rank values"""
+        histogram = MillisecondHistogram()
+        for duration_ms in range(1, 101):
+            histogram.add(duration_ms)
+        assert histogram.percentile(50) == 50
+        assert histogram.percentile(99) == 99
+        assert histogram.percentile(100) == 100
+        assert (histogram.min_ms, histogram.max_ms) == (1, 100)
+
+    def test_overflow(self):
+        """Test long durations are counted and reported by the max"""
+        histogram = MillisecondHistogram(limit_ms=10)
+        histogram.add(5000)
+        assert histogram.counts[-1] == 1
+        assert histogram.percentile(50) == 5000
+
+    def test_negative_ignored(self):
+        """Test durations across clock changes are not counted"""
+        histogram = MillisecondHistogram()
+        histogram.add(-3)
+        assert histogram.count == 0
+        assert histogram.percentile(50) is None
+        assert histogram.format() == "no events"
+
+
+class TestScanRateAnalyzer:
+    """Test the key event timing analysis"""
+
+    def test_intervals(self, analyzer):
+        """Test intervals between successive presses and releases"""
+        analyzer.press(30, 100)
+        analyzer.press(31, 108)
+        analyzer.release(30, 110)
+        analyzer.release(31, 126)
+        assert analyzer.intervals.count == 3
+        assert analyzer.intervals.min_ms == 2
+        assert analyzer.intervals.max_ms == 16
+
+    def test_hold_times(self, analyzer):
+        """Test press-to-release time of each key"""
+        analyzer.press(30, 100)
+        analyzer.press(31, 150)
+        analyzer.release(31, 170)
+        analyzer.release(30, 300)
+        assert analyzer.hold_times.count == 2
+        assert (analyzer.hold_times.min_ms, analyzer.hold_times.max_ms) == (20, 200)
+
+    def test_auto_repeat(self, analyzer):
+        """Test auto-repeat delay and interval of a held key"""
+        hold_with_repeats(analyzer, 38, 1000, delay_ms=500, interval_ms=33, repeats=4,
+                          release_ms=1700)
+        assert analyzer.repeats == 4
+        assert analyzer.repeat_delays.count == 1
+        assert analyzer.repeat_delays.max_ms == 500
+        assert analyzer.repeat_intervals.count == 3
+        assert analyzer.repeat_intervals.percentile(50) == 33
+        assert analyzer.hold_times.max_ms == 700
+        # Auto-repeat events are not inter-event intervals
+        assert analyzer.intervals.count == 1
+        assert "Auto-repeat rate:     30.3 per second" in analyzer.report()
+
+    def test_repeat_delay_per_hold(self, analyzer):
+        """Test each new hold measures its own auto-repeat delay"""
+        hold_with_repeats(analyzer, 38, 0, 400, 30, 2, 500)
+        hold_with_repeats(analyzer, 38, 1000, 600, 30, 2, 1700)
+        assert analyzer.repeat_delays.count == 2
+        assert (analyzer.repeat_delays.min_ms, analyzer.repeat_delays.max_ms) == (400, 600)
+
+    def test_event_buffer(self, analyzer):
+        """Test the event buffers keep the newest events, oldest first"""
+        for i in range(5):
+            analyzer.press(30 + i, i * 10)
+            analyzer.release(30 + i, i * 10 + 5)
+        assert analyzer.count == 10
+        events = list(analyzer.events())
+        assert len(events) == 8
+        assert events[0] == (10, 31, 0)
+        assert events[-1] == (45, 34, RELEASE_FLAG)
+
+    def test_event_flags(self, analyzer):
+        """Test auto-repeat events are flagged in the buffer"""
+        analyzer.press(30, 0)
+        analyzer.release(30, 5, auto_repeat=True)
+        assert [flags for _, _, flags in analyzer.events()] == [
+            0, RELEASE_FLAG | AUTO_REPEAT_FLAG]
+
+    def test_unknown_keycodes(self):
+        """Test keycodes outside the arrays share slot 0"""
+        assert keycode_slot(38) == 38
+        assert keycode_slot(0) == 0
+        assert keycode_slot(KEYCODE_LIMIT) == 0
+        assert keycode_slot(-1) == 0
+
+    def test_reset(self, analyzer):
+        """Test reset forgets events and held keys"""
+        analyzer.press(30, 100)
+        analyzer.reset()
+        analyzer.release(30, 200)
+        assert analyzer.count == 1
+        assert analyzer.hold_times.count == 0
+        assert analyzer.intervals.count == 0
+
+    def test_report(self, analyzer):
+        """Test the report shows the shortest interval as an event rate"""
+        assert analyzer.report().startswith("Events: 0")
+        analyzer.press(30, 100)
+        analyzer.release(30, 108)
+        assert "Shortest interval: 8 ms (at most 125 events/s)" in analyzer.report()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the typing test scoring engine
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from typing_scorer import (BACKSPACE, CORRECT, ERROR, OVERFLOW, SourceIndex,
+                           TypingScorer, common_prefix_length,
+                           common_suffix_length, compute_statistics,
+                           pack_errors, unpack_errors)
+
+
+SOURCE = "The quick brown fox jumps over the lazy dog."
+
+
+@pytest.fixture
+def scorer():
+    """Create a TypingScorer for the test source"""
+    return TypingScorer(SOURCE)
+
+
+class TestSourceIndex:
+    """Test the precomputed source token index"""
+
+    def test_tokens(self):
+        """Test source is split into word and whitespace tokens"""
+        index = SourceIndex("It was  the best")
+        assert index.tokens == ("It", " ", "was", "  ", "the", " ", "best")
+        assert len(index) == 7
+
+    def test_empty_text(self):
+        """Test empty source text"""
+        index = SourceIndex("")
+        assert len(index) == 0
+
+
+class TestEditRange:
+    """Test edit range helpers"""
+
+    def test_common_prefix(self):
+        """Test common prefix length"""
+        assert common_prefix_length("hello", "hello world") == 5
+        assert common_prefix_length("hello world", "hello") == 5
+        assert common_prefix_length("hello", "help") == 3
+        assert common_prefix_length("", "abc") == 0
+
+    def test_common_suffix(self):
+        """Test common suffix length is bounded by limit"""
+        assert common_suffix_length("abcxyz", "abxyz", 5) == 3
+        assert common_suffix_length("aaaa", "aaaa", 2) == 2
+        assert common_suffix_length("abc", "abc", 0) == 0
+
+
+class TestTypingScorer:
+    """Test the keystroke scoring engine"""
+
+    def test_initial_state(self, scorer):
+        """Test a fresh scorer has nothing typed"""
+        assert scorer.typed_text == ""
+        assert scorer.errors == []
+        assert scorer.accuracy == 0
+
+    def test_correct_typing(self, scorer):
+        """Test correct characters produce no errors"""
+        for char in "The quick":
+            scorer.feed_key(char)
+        assert scorer.error_count == 0
+        assert scorer.accuracy == 100
+
+    def test_error_recorded(self, scorer):
+        """Test a wrong character is recorded with its expected character"""
+        spans = scorer.feed_text("Tha")
+        assert scorer.errors == [(2, 'a', 'e')]
+        assert spans == [(0, [CORRECT, CORRECT, ERROR])]
+
+    def test_extra_characters(self, scorer):
+        """Test characters beyond the source word are errors"""
+        scorer.feed_text("Thee")
+        assert scorer.errors == [(3, 'e', '')]
+
+    def test_errors_do_not_cascade(self, scorer):
+        """Test a mistake in one word does not affect the next word"""
+        scorer.feed_text("Teh quick")
+        assert [idx for idx, _, _ in scorer.errors] == [1, 2]
+
+    def test_backspace_clears_error(self, scorer):
+        """Test backspacing over a mistake removes the error"""
+        scorer.feed_text("Thx")
+        assert scorer.error_count == 1
+        scorer.feed_key(BACKSPACE)
+        assert scorer.error_count == 0
+        assert scorer.typed_text == "Th"
+
+    def test_append_reports_only_last_token(self, scorer):
+        """Test appending rescores only the token being typed"""
+        scorer.feed_text("The quick")
+        spans = scorer.feed_key(" ")
+        assert spans == [(9, [CORRECT])]
+
+    def test_typing_beyond_source(self):
+        """Test tokens past the end are errors near it and overflow beyond"""
+        scorer = TypingScorer("ab")
+        scorer.feed_text("ab c d")
+        assert [status for _, statuses in scorer.feed_text("ab c d e")
+                for status in statuses] == [OVERFLOW, OVERFLOW]
+        assert scorer.errors == [(2, ' ', ''), (3, 'c', '')]
+
+    def test_incremental_matches_full_rescore(self, scorer):
+        """Test mid-text edits leave the same errors as rescoring from scratch"""
+        edits = ["The quikc", "The quikc brwn", "The xquikc brwn",
+                 "The x brwn fox", "Te x brwn fox jumps", "Te x brwn fox jumps over"]
+        for text in edits:
+            scorer.feed_text(text)
+            fresh = TypingScorer(SOURCE)
+            fresh.feed_text(text)
+            assert scorer.errors == fresh.errors
+
+    def test_status_runs(self, scorer):
+        """Test per-character statuses are reported as runs"""
+        scorer.feed_text("Thx quick")
+        assert list(scorer.status_runs(0, 9)) == [
+            (0, 2, CORRECT), (2, 1, ERROR), (3, 6, CORRECT)]
+        assert list(scorer.status_runs(2, 4)) == [(0, 1, ERROR), (1, 1, CORRECT)]
+
+    def test_status_runs_after_edit(self, scorer):
+        """Test statuses follow a mid-text edit"""
+        scorer.feed_text("The quick")
+        scorer.feed_text("Thex quick")
+        assert len(scorer.char_statuses) == 10
+        assert list(scorer.status_runs(0, 10)) == [
+            (0, 3, CORRECT), (3, 1, ERROR), (4, 6, CORRECT)]
+
+    def test_reset(self, scorer):
+        """Test reset forgets typed text and errors"""
+        scorer.feed_text("Tha quack")
+        scorer.reset()
+        assert scorer.typed_text == ""
+        assert scorer.errors == []
+
+
+class TestComputeStatistics:
+    """Test statistics calculation"""
+
+    def test_wpm_and_accuracy(self):
+        """Test WPM, adjusted WPM and accuracy"""
+        errors = [(i, 'a', 'b') for i in range(10)]
+        stats = compute_statistics("a" * 300, errors, 60, [60])
+        assert stats['wpm'] == 60.0
+        assert stats['adjusted_wpm'] == 50.0
+        assert stats['accuracy_percent'] == 96.7
+        assert stats['errors'] == 10
+
+    def test_zero_elapsed(self):
+        """Test no division by zero for an instant test"""
+        stats = compute_statistics("abc", [], 0)
+        assert stats['wpm'] == 0
+        assert stats['adjusted_wpm'] == 0
+
+    def test_scorer_statistics(self, scorer):
+        """Test the scorer reports statistics for what was fed"""
+        scorer.feed_text("The quack")
+        stats = scorer.statistics(60, [10, 20])
+        assert stats['total_characters'] == 9
+        assert stats['total_words'] == 2
+        assert stats['errors'] == 1
+        assert stats['peak_wpm'] == 20
+
+
+
+class TestPackedErrors:
+    """Test the compact column form of error details"""
+
+    def test_round_trip(self):
+        """Test errors survive packing, including missing expected characters"""
+        errors = [(0, 'a', 'b'), (70000, 'é', ''), (12, '\u4e2d', '\U0001f600')]
+        assert unpack_errors(pack_errors(errors)) == errors
+
+    def test_columns(self):
+        """Test the packed columns hold one character per error"""
+        packed = pack_errors([(1, 'x', 'e'), (2, 'y', 'f')])
+        assert packed['typed'] == "xy"
+        assert packed['expected'] == "ef"
+
+    def test_empty(self):
+        """Test packing no errors"""
+        assert unpack_errors(pack_errors([])) == []
+
+    def test_multi_character_rejected(self):
+        """Test errors with more than one character per side are rejected"""
+        with pytest.raises(ValueError):
+            pack_errors([(1, 'xy', 'e')])
+        with pytest.raises(ValueError):
+            pack_errors([(1, 'xy', 'e'), (2, '', 'f')])
+
+    def test_scorer_errors(self, scorer):
+        """Test the scorer's own errors pack and unpack unchanged"""
+        scorer.feed_text("Teh quikc brown fox jumps over the lazy dogs.")
+        assert unpack_errors(pack_errors(scorer.errors)) == scorer.errors
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -20,14 +20,21 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import sys
 import json
+import time
 import pytest
 import tempfile
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QTextCursor
 
-from keyboard_checker import TypingHistory, TypingTest
+import threading
+
+from keyboard_checker import (HistoryWriter, KeySessionReplayer, SQLiteTypingHistory,
+                              TypingHistory, TypingTest)
+from key_session import KeyEventRecord
+from latency_stats import LatencyStats
 from text_samples import TYPING_SAMPLES
 
 
@@ -55,6 +62,16 @@ def typing_history(temp_history_dir):
     return history
 
 
+@pytest.fixture
+def sqlite_history(temp_history_dir):
+    """Create SQLiteTypingHistory instance with temporary directory"""
+    history = SQLiteTypingHistory()
+    history.history_dir = temp_history_dir
+    history.history_file = temp_history_dir / "typing_history.db"
+    yield history
+    history.close()
+
+
 @pytest.fixture
 def typing_test(qapp):
     """Create TypingTest widget for testing"""
@@ -178,6 +195,14 @@ class TestTypingHistory:
         avg = typing_history.get_average_wpm()
         assert avg == 90.0  # (80+85+90+95+100)/5
 
+    def test_get_average_wpm_by_duration(self, typing_history):
+        """Test average WPM for one test duration"""
+        for duration, wpm in [(30, 60), (60, 80), (60, 90)]:
+            typing_history.save_result({'duration': duration, 'wpm': wpm})
+
+        assert typing_history.get_average_wpm(60) == 85.0
+        assert typing_history.get_average_wpm(120) == 0.0
+
     def test_get_average_wpm_empty(self, typing_history):
         """Test average WPM with no history"""
         avg = typing_history.get_average_wpm()
@@ -193,6 +218,634 @@ class TestTypingHistory:
         history = typing_history.load_history()
         assert history == []
 
+    def test_save_appends_one_line(self, typing_history):
+        """Test each save appends a single JSON line"""
+        typing_history.save_result({'wpm': 80})
+        typing_history.save_result({'wpm': 90})
+
+        lines = typing_history.history_file.read_text().splitlines()
+        assert [json.loads(line) for line in lines] == [{'wpm': 80}, {'wpm': 90}]
+
+    def test_migrates_legacy_array_in_place(self, typing_history):
+        """Test an old JSON array file is converted on first load"""
+        legacy = [{'wpm': 70}, {'wpm': 75}]
+        typing_history.history_file.write_text(json.dumps(legacy, indent=2))
+
+        assert typing_history.load_history() == legacy
+        lines = typing_history.history_file.read_text().splitlines()
+        assert [json.loads(line) for line in lines] == legacy
+
+    def test_migrates_legacy_file(self, temp_history_dir):
+        """Test the old typing_history.json is converted to the new file"""
+        legacy = [{'wpm': 70}, {'wpm': 75}]
+        (temp_history_dir / "typing_history.json").write_text(json.dumps(legacy))
+        history = TypingHistory()
+        history.history_dir = temp_history_dir
+        history.history_file = temp_history_dir / "typing_history.jsonl"
+
+        history.save_result({'wpm': 80})
+
+        assert history.load_history() == legacy + [{'wpm': 80}]
+        assert not (temp_history_dir / "typing_history.json").exists()
+        assert (temp_history_dir / "typing_history.json.bak").exists()
+
+    def test_truncated_line_skipped(self, typing_history):
+        """Test a partially written last line does not lose other results"""
+        with open(typing_history.history_file, 'w') as f:
+            f.write('{"wpm": 80}\n{"wpm": 9')
+
+        typing_history.save_result({'wpm': 100})
+
+        assert typing_history.load_history() == [{'wpm': 80}, {'wpm': 100}]
+
+
+class TestTypingHistoryCache:
+    """Test the in-memory history cache"""
+
+    def test_repeated_queries_hit_cache(self, typing_history):
+        """Test the file is parsed once for repeated queries"""
+        typing_history.save_result({'duration': 60, 'wpm': 80})
+        typing_history.get_recent(10)
+        typing_history.get_by_duration(60)
+        typing_history.get_average_wpm()
+
+        assert typing_history.cache_misses == 1
+        assert typing_history.cache_hits == 2
+
+    def test_save_updates_cache(self, typing_history):
+        """Test saving a result updates the cache without re-reading"""
+        typing_history.load_history()
+        typing_history.save_result({'wpm': 80, 'error_details': [(1, 'a', 'b')]})
+
+        assert typing_history.get_recent(10) == typing_history.read_file(
+            typing_history.history_file)
+        assert typing_history.cache_misses == 1
+
+    def test_other_writer_invalidates_cache(self, typing_history):
+        """Test a result saved by another instance is picked up"""
+        typing_history.save_result({'wpm': 80})
+        typing_history.load_history()
+
+        other = TypingHistory()
+        other.history_dir = typing_history.history_dir
+        other.history_file = typing_history.history_file
+        other.save_result({'wpm': 90})
+        typing_history.save_result({'wpm': 100})
+
+        assert [r['wpm'] for r in typing_history.load_history()] == [80, 90, 100]
+        assert typing_history.cache_misses == 2
+
+    def test_replaced_file_invalidates_cache(self, typing_history):
+        """Test a file replaced with the same size is re-read"""
+        typing_history.save_result({'wpm': 80})
+        typing_history.load_history()
+
+        replacement = typing_history.history_file.with_name("replacement")
+        replacement.write_text('{"wpm":90}\n')
+        replacement.replace(typing_history.history_file)
+
+        assert typing_history.load_history() == [{'wpm': 90}]
+
+    def test_returned_list_is_a_copy(self, typing_history):
+        """Test callers modifying results lists don't change the cache"""
+        typing_history.save_result({'wpm': 80})
+        typing_history.load_history().clear()
+        typing_history.get_recent(10).reverse()
+
+        assert typing_history.load_history() == [{'wpm': 80}]
+
+
+class TestErrorDetailStorage:
+    """Test compact storage of per-character errors"""
+
+    ERRORS = [(3, 'a', 'e'), (17, ' ', 'x'), (250, 'q', '')]
+
+    def test_errors_stored_packed(self, typing_history):
+        """Test error details are saved as columns and unpacked on request"""
+        typing_history.save_result({'wpm': 80, 'error_details': self.ERRORS})
+
+        saved = json.loads(typing_history.history_file.read_text())
+        assert 'error_details' not in saved
+        assert saved['error_columns']['typed'] == "a q"
+        assert typing_history.get_error_details(typing_history.get_recent(1)[0]) == self.ERRORS
+
+    def test_old_error_details_readable(self, typing_history):
+        """Test results saved with error_details lists still unpack"""
+        typing_history.history_file.write_text(
+            '{"wpm": 80, "error_details": [[3, "a", "e"], [9, "b", ""]]}\n')
+        result = typing_history.load_history()[0]
+        assert typing_history.get_error_details(result) == [(3, 'a', 'e'), (9, 'b', '')]
+
+    def test_unusual_details_kept(self, typing_history):
+        """Test details that can't be packed are saved unchanged"""
+        typing_history.save_result({'wpm': 80, 'error_details': [[3, "ab", "e"]]})
+        result = typing_history.load_history()[0]
+        assert result['error_details'] == [[3, "ab", "e"]]
+
+    def test_packed_is_smaller(self, typing_history):
+        """Test packed errors take less space than the JSON list"""
+        errors = [(i * 7, 'x', 'e') for i in range(200)]
+        typing_history.save_result({'error_details': errors})
+        packed_size = typing_history.history_file.stat().st_size
+        assert packed_size * 2 < len(json.dumps({'error_details': errors}))
+
+
+class TestHistoryTail:
+    """Test reading recent results from the end of the history file"""
+
+    def test_get_recent_reads_tail(self, typing_history):
+        """Test recent results are read without loading the whole history"""
+        for i in range(50):
+            typing_history.save_result({'wpm': i})
+
+        history = TypingHistory()
+        history.history_dir = typing_history.history_dir
+        history.history_file = typing_history.history_file
+        assert [r['wpm'] for r in history.get_recent(10)] == list(range(40, 50))
+        assert history.cache_misses == 0
+
+    def test_tail_across_blocks(self, typing_history):
+        """Test lines split across read blocks are joined"""
+        for i in range(50):
+            typing_history.save_result({'wpm': i, 'text': 'x' * i})
+
+        expected = typing_history.load_history()
+        for block_size in (1, 7, 64, 100000):
+            for n in (1, 10, 50, 80):
+                tail = TypingHistory.read_tail(typing_history.history_file, n, block_size)
+                assert tail == expected[-n:]
+
+    def test_tail_skips_corrupted_lines(self, typing_history):
+        """Test corrupted lines are skipped and not counted"""
+        with open(typing_history.history_file, 'w') as f:
+            f.write('{"wpm": 1}\n{"wpm": 2}\nnot json\n\n{"wpm": 3}\n{"wpm": 4')
+
+        assert typing_history.get_recent(2) == [{'wpm': 2}, {'wpm': 3}]
+
+    def test_tail_missing_file(self, typing_history):
+        """Test reading the tail of a missing file"""
+        assert typing_history.get_recent(10) == []
+        assert typing_history.get_recent(0) == []
+
+
+class TestHistorySummary:
+    """Test running history summaries"""
+
+    RESULTS = [(30, 60.0, 90.0), (60, 80.0, 97.0), (60, 90.0, 95.0)]
+
+    def save_results(self, history):
+        for duration, wpm, accuracy in self.RESULTS:
+            history.save_result({'duration': duration, 'wpm': wpm,
+                                 'accuracy_percent': accuracy})
+
+    def test_summary(self, typing_history):
+        """Test summaries overall and per duration"""
+        self.save_results(typing_history)
+
+        summary = typing_history.get_summary(60)
+        assert summary['count'] == 2
+        assert summary['mean_wpm'] == 85.0
+        assert summary['best_wpm'] == 90.0
+        assert summary['best_accuracy'] == 97.0
+        assert typing_history.get_summary()['count'] == 3
+
+    def test_summary_file_avoids_reading_history(self, typing_history):
+        """Test a new instance answers summary queries from the summary file"""
+        self.save_results(typing_history)
+
+        history = TypingHistory()
+        history.history_dir = typing_history.history_dir
+        history.history_file = typing_history.history_file
+        assert history.get_average_wpm(60) == 85.0
+        assert history.cache_misses == 0
+
+    def test_outdated_summary_file_rebuilt(self, typing_history):
+        """Test results appended by another program are included"""
+        self.save_results(typing_history)
+        with open(typing_history.history_file, 'a') as f:
+            f.write('{"duration": 60, "wpm": 100.0}\n')
+
+        history = TypingHistory()
+        history.history_dir = typing_history.history_dir
+        history.history_file = typing_history.history_file
+        assert history.get_summary(60)['best_wpm'] == 100.0
+
+    def reopen(self, history, **policy):
+        """Return a new instance on the same files, as another program would see them"""
+        reopened = TypingHistory(**policy)
+        reopened.history_dir = history.history_dir
+        reopened.history_file = history.history_file
+        return reopened
+
+    def archived_history(self, temp_history_dir):
+        """Return a history with five archived and three live results"""
+        history = TypingHistory(keep_results=3)
+        history.history_dir = temp_history_dir
+        history.history_file = temp_history_dir / "typing_history.jsonl"
+        for wpm in range(8):
+            history.save_result({'duration': 60, 'wpm': float(wpm)})
+        assert history.apply_retention(force=True) == 5
+        return history
+
+    def test_appended_results_folded_in(self, temp_history_dir):
+        """Test results appended by another program are read from the end of the file"""
+        history = self.archived_history(temp_history_dir)
+        with open(history.history_file, 'a') as f:
+            f.write('{"duration": 60, "wpm": 100.0}\n')
+
+        reopened = self.reopen(history)
+        with patch.object(reopened, 'archived_results') as mock_archived:
+            summary = reopened.get_summary(60)
+        mock_archived.assert_not_called()
+        assert reopened.cache_misses == 0
+        assert summary['count'] == 9
+        assert summary['best_wpm'] == 100.0
+
+        # The appended result is not counted twice by the next save
+        reopened.save_result({'duration': 60, 'wpm': 1.0})
+        assert self.reopen(history).get_summary()['count'] == 10
+
+    def test_appended_to_running_instance(self, typing_history):
+        """Test an instance with summaries in memory folds in another program's appends"""
+        self.save_results(typing_history)
+        typing_history.get_summary()
+        with open(typing_history.history_file, 'a') as f:
+            f.write('{"duration": 30, "wpm": 40.0}\n')
+        assert typing_history.get_summary(30)['count'] == 2
+        assert typing_history.get_summary()['count'] == 4
+
+    def test_replaced_file_keeps_archive_summaries(self, temp_history_dir):
+        """Test a rewritten history file is summarized again without the archives"""
+        history = self.archived_history(temp_history_dir)
+        history._write_atomically(history.history_file, history._encode_lines(
+            [{'duration': 60, 'wpm': 50.0}]))
+
+        reopened = self.reopen(history)
+        with patch.object(reopened, 'archived_results') as mock_archived:
+            summary = reopened.get_summary(60)
+        mock_archived.assert_not_called()
+        assert summary['count'] == 6
+        assert summary['best_wpm'] == 50.0
+
+    def test_truncated_file_summarized_again(self, typing_history):
+        """Test a file that shrank is summarized from scratch"""
+        self.save_results(typing_history)
+        with open(typing_history.history_file, 'r+') as f:
+            f.truncate(len(f.readline()))
+        assert self.reopen(typing_history).get_summary()['count'] == 1
+
+    def test_new_archive_segment_read_alone(self, temp_history_dir):
+        """Test archives written by another instance are folded in one segment at a time"""
+        history = self.archived_history(temp_history_dir)
+        other = self.reopen(history, keep_results=1)
+        assert other.apply_retention(force=True) == 2
+
+        read = []
+        original = history._read_segment
+        with patch.object(history, '_read_segment',
+                          side_effect=lambda path: read.append(path) or original(path)):
+            assert history.get_summary()['count'] == 8
+        assert read == history.archive_segments()[-1:]
+
+    def test_sqlite_summary(self, sqlite_history):
+        """Test the SQLite backend keeps the same summaries"""
+        self.save_results(sqlite_history)
+        assert sqlite_history.get_summary(60)['mean_wpm'] == 85.0
+
+        sqlite_history.save_result({'duration': 60, 'wpm': 100.0})
+        assert sqlite_history.get_summary(60)['best_wpm'] == 100.0
+        assert sqlite_history.get_average_wpm() == 82.5
+
+
+class TestHistoryRetention:
+    """Test moving old results to compressed archives"""
+
+    def make_history(self, temp_history_dir, backend=TypingHistory, **policy):
+        history = backend(**policy)
+        history.history_dir = temp_history_dir
+        history.history_file = temp_history_dir / history.history_file.name
+        return history
+
+    def save_results(self, history, count, days_ago=0):
+        timestamp = (datetime.now() - timedelta(days=days_ago)).isoformat()
+        for i in range(count):
+            history.save_result({'timestamp': timestamp, 'duration': 60, 'wpm': i,
+                                 'error_details': [[i, 'x', 'e'], [i + 1, 'x', 'e']]})
+
+    def test_no_policy_keeps_everything(self, typing_history):
+        """Test results are never archived without a policy"""
+        self.save_results(typing_history, 5)
+        assert typing_history.apply_retention(force=True) == 0
+        assert typing_history.archive_segments() == []
+
+    def test_archives_in_batches(self, temp_history_dir):
+        """Test the history is only rewritten once a batch of results is due"""
+        history = self.make_history(temp_history_dir, keep_results=10)
+        history.ARCHIVE_BATCH = 5
+        self.save_results(history, 14)
+        assert history.archive_segments() == []
+
+        self.save_results(history, 1)
+        assert len(history.load_history()) == 10
+        assert [r['wpm'] for r in history.archived_results()] == [0, 1, 2, 3, 4]
+        assert history.archive_segments()[0].name == "typing_history.jsonl-0001.jsonl.gz"
+
+    def test_archived_results_stay_queryable(self, temp_history_dir):
+        """Test archived results are still found and summarized"""
+        history = self.make_history(temp_history_dir, keep_results=3)
+        self.save_results(history, 8)
+        assert history.apply_retention(force=True) == 5
+
+        assert [r['wpm'] for r in history.get_recent(5)] == [3, 4, 5, 6, 7]
+        assert len(history.get_all_results(include_archived=True)) == 8
+        assert len(history.get_by_duration(60, include_archived=True)) == 8
+        assert len(history.get_by_duration(60)) == 3
+        assert history.get_summary()['count'] == 8
+        assert history.get_average_wpm() == 3.5
+
+    def test_summaries_rebuilt_with_archives(self, temp_history_dir):
+        """Test rebuilt summaries include archived results"""
+        history = self.make_history(temp_history_dir, keep_results=3)
+        self.save_results(history, 8)
+        history.apply_retention(force=True)
+        history._summary_file().unlink()
+
+        assert self.make_history(temp_history_dir).get_summary()['count'] == 8
+
+    def test_keep_days(self, temp_history_dir):
+        """Test results older than the kept days are archived"""
+        history = self.make_history(temp_history_dir, keep_days=30)
+        self.save_results(history, 3, days_ago=40)
+        self.save_results(history, 2, days_ago=5)
+
+        assert history.apply_retention(force=True) == 3
+        assert len(history.load_history()) == 2
+
+    def test_either_limit_keeps_result(self, temp_history_dir):
+        """Test results within the kept days survive the results limit"""
+        history = self.make_history(temp_history_dir, keep_results=1, keep_days=30)
+        self.save_results(history, 3, days_ago=40)
+        self.save_results(history, 2, days_ago=5)
+
+        assert history.apply_retention(force=True) == 3
+
+    def test_lzma_archives(self, temp_history_dir):
+        """Test archives can be lzma compressed"""
+        history = self.make_history(temp_history_dir, keep_results=1, archive_format='lzma')
+        self.save_results(history, 3)
+        history.apply_retention(force=True)
+
+        assert history.archive_segments()[0].suffix == ".xz"
+        assert len(list(history.archived_results())) == 2
+
+    @pytest.mark.parametrize("archive_format", ["gzip", "lzma"])
+    def test_damaged_archive_skipped(self, temp_history_dir, archive_format):
+        """Test a damaged archive segment is skipped, whatever its format"""
+        history = self.make_history(temp_history_dir, keep_results=1,
+                                    archive_format=archive_format)
+        self.save_results(history, 3)
+        history.apply_retention(force=True)
+        history.archive_segments()[0].write_bytes(b"not compressed")
+
+        assert list(history.archived_results()) == []
+
+    def test_invalid_archive_format(self):
+        """Test unknown archive formats are rejected"""
+        with pytest.raises(ValueError):
+            TypingHistory(archive_format='zip')
+
+    def test_compact_summarize(self, temp_history_dir):
+        """Test compaction summarizes error details of archived results"""
+        history = self.make_history(temp_history_dir, keep_results=1)
+        self.save_results(history, 3)
+        history.apply_retention(force=True)
+
+        history.compact_archives('summarize')
+        archived = list(history.archived_results())
+        assert all('error_columns' not in r for r in archived)
+        assert archived[0]['error_summary'] == [['x', 'e', 2]]
+        assert 'error_columns' in history.load_history()[0]
+
+    def test_compact_drop(self, temp_history_dir):
+        """Test compaction can drop error details entirely"""
+        history = self.make_history(temp_history_dir, keep_results=1)
+        self.save_results(history, 3)
+        history.apply_retention(force=True)
+
+        history.compact_archives('drop')
+        assert list(history.archived_results())[0] == {
+            'timestamp': list(history.archived_results())[0]['timestamp'],
+            'duration': 60, 'wpm': 0}
+
+    def test_sqlite_retention(self, temp_history_dir):
+        """Test the SQLite backend archives to compressed segments too"""
+        history = self.make_history(temp_history_dir, SQLiteTypingHistory, keep_results=3)
+        self.save_results(history, 8)
+
+        assert history.apply_retention(force=True) == 5
+        assert len(history.load_history()) == 3
+        assert [r['wpm'] for r in history.get_recent(5)] == [3, 4, 5, 6, 7]
+        assert [r['wpm'] for r in history.get_all_results(include_archived=True)] == list(range(8))
+        assert len(history.get_all_results()) == 3
+        assert history.get_summary()['count'] == 8
+        assert history.archive_segments()[0].name == "typing_history.db-0001.jsonl.gz"
+        history.close()
+
+    def test_backends_keep_separate_archives(self, temp_history_dir):
+        """Test JSON and SQLite histories in one directory only read their own archives"""
+        json_history = self.make_history(temp_history_dir, keep_results=2)
+        # Created before any JSON results exist, so nothing is imported
+        sqlite_history = self.make_history(temp_history_dir, SQLiteTypingHistory, keep_results=2)
+        sqlite_history.load_history()
+        for history in (json_history, sqlite_history):
+            self.save_results(history, 5)
+            assert history.apply_retention(force=True) == 3
+
+        for history in (json_history, sqlite_history):
+            assert len(history.archive_segments()) == 1
+            assert len(history.get_all_results(include_archived=True)) == 5
+            assert history.get_summary()['count'] == 5
+        sqlite_history.close()
+
+    def test_sqlite_imports_json_archives(self, temp_history_dir):
+        """Test a new SQLite history imports the JSON history's archived results too"""
+        json_history = self.make_history(temp_history_dir, keep_results=4)
+        self.save_results(json_history, 10)
+        assert json_history.apply_retention(force=True) == 6
+
+        sqlite_history = self.make_history(temp_history_dir, SQLiteTypingHistory)
+        assert [r['wpm'] for r in sqlite_history.load_history()] == list(range(10))
+        assert sqlite_history.get_summary()['count'] == 10
+        sqlite_history.close()
+
+
+class TestSQLiteTypingHistory:
+    """Test the SQLite history backend"""
+
+    def test_load_empty_history(self, sqlite_history):
+        """Test a new database has no results"""
+        assert sqlite_history.load_history() == []
+        assert sqlite_history.get_average_wpm() == 0.0
+
+    def test_save_and_load_result(self, sqlite_history):
+        """Test results round-trip with their error details"""
+        result = {'timestamp': '2025-01-01T10:00:00', 'duration': 60, 'wpm': 85.5,
+                  'error_details': [(3, 'a', 'e')]}
+        sqlite_history.save_result(result)
+
+        loaded, = sqlite_history.load_history()
+        assert loaded['wpm'] == 85.5
+        assert sqlite_history.get_error_details(loaded) == [(3, 'a', 'e')]
+
+    def test_get_recent(self, sqlite_history):
+        """Test the most recent results are returned oldest first"""
+        for i in range(15):
+            sqlite_history.save_result({'timestamp': f"2025-01-01T10:{i:02d}:00", 'wpm': i})
+
+        recent = sqlite_history.get_recent(10)
+        assert [r['wpm'] for r in recent] == list(range(5, 15))
+
+    def test_duration_queries(self, sqlite_history):
+        """Test per-duration filters and averages"""
+        for duration, wpm in [(30, 60), (60, 80), (60, 90), (120, 100)]:
+            sqlite_history.save_result({'timestamp': '2025-01-01T10:00:00',
+                                        'duration': duration, 'wpm': wpm})
+
+        assert [r['wpm'] for r in sqlite_history.get_by_duration(60)] == [80, 90]
+        assert sqlite_history.get_average_wpm(60) == 85.0
+        assert sqlite_history.get_average_wpm() == 82.5
+        assert sqlite_history.get_average_wpm(15) == 0.0
+
+    def test_trend_data(self, sqlite_history):
+        """Test trend data matches the JSON backend's defaults"""
+        sqlite_history.save_result({'timestamp': '2025-01-01T10:00:00', 'wpm': 80})
+        sqlite_history.save_result({'wpm': 90})
+        assert sqlite_history.get_trend_data() == [('2025-01-01T10:00:00', 80), ('', 90)]
+
+    def test_queries_use_indexes(self, sqlite_history):
+        """Test recent and per-duration queries use the indexes"""
+        connection = sqlite_history._connect()
+        for sql in ("SELECT data FROM results ORDER BY timestamp DESC, id DESC LIMIT 10",
+                    "SELECT data FROM results WHERE duration = 60 ORDER BY id"):
+            plan = " ".join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}"))
+            assert "INDEX" in plan
+
+    def test_imports_json_history(self, temp_history_dir):
+        """Test the JSON history is imported when the database is created"""
+        json_history = TypingHistory()
+        json_history.history_dir = temp_history_dir
+        json_history.history_file = temp_history_dir / "typing_history.jsonl"
+        json_history.save_result({'timestamp': '2025-01-01T10:00:00', 'wpm': 80})
+
+        history = SQLiteTypingHistory()
+        history.history_dir = temp_history_dir
+        history.history_file = temp_history_dir / "typing_history.db"
+        assert history.get_average_wpm() == 80.0
+        history.close()
+
+        # Only once: reopening the database does not import again
+        history.history_file = temp_history_dir / "typing_history.db"
+        assert len(history.load_history()) == 1
+        history.close()
+
+    def test_binary_file_not_read_as_json(self, sqlite_history):
+        """Test the JSON readers skip a database file instead of failing to decode it"""
+        sqlite_history.save_result({'duration': 60, 'wpm': 70.0})
+        assert TypingHistory._read_legacy(sqlite_history.history_file) is None
+        assert TypingHistory.read_file(sqlite_history.history_file) == []
+
+    def test_import_json(self, sqlite_history, temp_history_dir):
+        """Test importing an old JSON array file"""
+        legacy_file = temp_history_dir / "old_history.json"
+        legacy_file.write_text(json.dumps([{'wpm': 70}, {'wpm': 75}]))
+
+        assert sqlite_history.import_json(legacy_file) == 2
+        assert sqlite_history.get_average_wpm() == 72.5
+
+
+class TestHistoryWriter:
+    """Test saving history in the background"""
+
+    def test_saves_in_order_off_calling_thread(self, qapp, typing_history):
+        """Test results are written in order by the writer thread"""
+        threads = []
+        save_result = typing_history.save_result
+
+        def recording_save(result):
+            threads.append(threading.current_thread())
+            save_result(result)
+
+        typing_history.save_result = recording_save
+        writer = HistoryWriter(typing_history)
+        for i in range(5):
+            writer.save({'wpm': i})
+        writer.stop()
+
+        assert [r['wpm'] for r in typing_history.load_history()] == list(range(5))
+        assert threading.main_thread() not in threads
+
+    def test_saved_signal(self, qapp, typing_history):
+        """Test saved is delivered on the GUI thread after the write"""
+        writer = HistoryWriter(typing_history)
+        received = []
+        writer.saved.connect(lambda result, summary: received.append(
+            (result, summary['count'], threading.current_thread())))
+
+        writer.save({'duration': 60, 'wpm': 80})
+        writer.save({'duration': 60, 'wpm': 90})
+        writer.wait()
+        assert len(typing_history.load_history()) == 2
+        qapp.processEvents()
+
+        # Each summary covers the results saved before it
+        assert received == [({'duration': 60, 'wpm': 80}, 0, threading.main_thread()),
+                            ({'duration': 60, 'wpm': 90}, 1, threading.main_thread())]
+        writer.stop()
+
+    def test_summary_read_off_gui_thread(self, qapp, typing_history):
+        """Test the comparison summary is read by the writer thread"""
+        threads = []
+        get_summary = typing_history.get_summary
+
+        def recording_summary(*args):
+            threads.append(threading.current_thread())
+            return get_summary(*args)
+
+        typing_history.get_summary = recording_summary
+        writer = HistoryWriter(typing_history)
+        writer.save({'duration': 60, 'wpm': 80})
+        writer.stop()
+        assert threads and threading.main_thread() not in threads
+
+    def test_stop_without_saves(self, typing_history):
+        """Test stopping a writer that never started"""
+        HistoryWriter(typing_history).stop()
+
+    def test_results_table_refreshed(self, qapp, typing_test, typing_history):
+        """Test the results table refreshes once the result is written"""
+        typing_test.history = typing_test.history_writer.history = typing_history
+        typing_test.current_stats = {'timestamp': datetime.now().isoformat(),
+                                     'duration': 60, 'wpm': 80}
+        typing_test.save_results()
+        assert typing_test.save_button.text() == "Saving Results..."
+
+        typing_test.history_writer.wait()
+        qapp.processEvents()
+        assert typing_test.save_button.text() == "Results Saved"
+        assert typing_test.history_table.item(0, 2).text() == "80"
+
+    def test_rewrites_leave_no_temporary_files(self, temp_history_dir):
+        """Test rewritten files are renamed into place"""
+        history = TypingHistory(keep_results=1)
+        history.history_dir = temp_history_dir
+        history.history_file = temp_history_dir / "typing_history.jsonl"
+        for i in range(3):
+            history.save_result({'wpm': i})
+        history.apply_retention(force=True)
+
+        assert list(temp_history_dir.rglob("*.tmp")) == []
+        assert len(list(history.archived_results())) == 2
+
 
 class TestTypingTestUI:
     """Test TypingTest UI components"""
@@ -241,6 +894,15 @@ class TestTypingTestFunctionality:
         assert typing_test.typing_input.isEnabled() is True
         assert typing_test.start_button.isEnabled() is False
 
+    def test_start_test_with_sample(self, typing_test):
+        """Test starting a test with a given sample"""
+        sample = {'id': 7, 'text': "Hello there", 'source': 'test'}
+        typing_test.start_test(sample)
+
+        assert typing_test.current_sample is sample
+        assert typing_test.sample_display.toPlainText() == "Hello there"
+        assert typing_test.scorer.source.tokens == ("Hello", " ", "there")
+
     def test_duration_selection(self, typing_test):
         """Test selecting different test durations"""
         typing_test.radio_30s.setChecked(True)
@@ -348,6 +1010,100 @@ class TestTypingTestFunctionality:
         assert typing_test.stats_panel.isVisible() is False
 
 
+def char_colors(test):
+    """Return the foreground color name of every typed character"""
+    cursor = QTextCursor(test.typing_input.document())
+    colors = []
+    for i in range(len(test.typing_input.toPlainText())):
+        cursor.setPosition(i + 1)
+        colors.append(cursor.charFormat().foreground().color().name())
+    return colors
+
+
+def highlighted_colors(test):
+    """Return the highlighter color name of every typed character"""
+    colors = {}
+    block = test.typing_input.document().begin()
+    while block.isValid():
+        for fmt_range in block.layout().formats():
+            for i in range(fmt_range.start, fmt_range.start + fmt_range.length):
+                colors[block.position() + i] = fmt_range.format.foreground().color().name()
+        block = block.next()
+    return [colors.get(i) for i in range(len(test.typing_input.toPlainText()))]
+
+
+class TestIncrementalRecoloring:
+    """Test that incremental recoloring matches a full rebuild"""
+
+    SOURCE = "The quick brown fox jumps over the lazy dog."
+
+    def make_test(self, mode):
+        test = TypingTest(recolor_mode=mode)
+        test.start_test({'id': 1, 'text': self.SOURCE, 'source': 'test'})
+        return test
+
+    def apply_edits(self, test):
+        """Append, backspace, edit mid-text and paste"""
+        cursor = test.typing_input.textCursor()
+        for char in "The quikc brown":
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(char)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.deletePreviousChar()
+        cursor.setPosition(4)
+        cursor.insertText("x ")
+        cursor.setPosition(6)
+        cursor.setPosition(8, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(" fox jumps over the lazy dog. extra words here")
+
+    def test_invalid_mode_rejected(self, qapp):
+        """Test unknown recolor mode raises"""
+        with pytest.raises(ValueError):
+            TypingTest(recolor_mode='bogus')
+
+    def test_matches_full_rebuild(self, qapp):
+        """Test errors and colors match the full rebuild after mixed edits"""
+        full = self.make_test('full')
+        incremental = self.make_test('incremental')
+        self.apply_edits(full)
+        self.apply_edits(incremental)
+
+        assert incremental.typed_text == full.typed_text
+        assert incremental.errors == full.errors
+        assert char_colors(incremental) == char_colors(full)
+
+    def test_highlighter_matches_full_rebuild(self, qapp):
+        """Test highlighter colors match the full rebuild after mixed edits"""
+        full = self.make_test('full')
+        highlighted = self.make_test('highlighter')
+        self.apply_edits(full)
+        self.apply_edits(highlighted)
+
+        assert highlighted.errors == full.errors
+        assert highlighted_colors(highlighted) == char_colors(full)
+
+    def test_highlighter_leaves_text_formats(self, qapp):
+        """Test the highlighter mode never rewrites character formats"""
+        highlighted = self.make_test('highlighter')
+        with patch.object(highlighted, 'apply_status_formats') as mock_apply:
+            self.apply_edits(highlighted)
+            mock_apply.assert_not_called()
+
+    def test_append_only_formats_new_token(self, typing_test):
+        """Test appending a character reformats only the last token"""
+        typing_test.start_test({'id': 1, 'text': self.SOURCE, 'source': 'test'})
+        cursor = typing_test.typing_input.textCursor()
+        cursor.insertText("The quick")
+
+        with patch.object(typing_test, 'apply_status_formats') as mock_apply:
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(" ")
+            spans = mock_apply.call_args[0][0]
+            assert [start for start, _ in spans] == [9]
+
+
 class TestTypingTestIntegration:
     """Integration tests for typing test"""
 
@@ -369,6 +1125,60 @@ class TestTypingTestIntegration:
         # Just check that stats were calculated
         assert typing_test.current_stats is not None
 
+    def test_replayed_session(self, typing_test):
+        """Test a replayed key session is typed and scored like live typing"""
+        typing_test.start_test({'id': 0, 'text': "The cat", 'source': ''})
+        records = [KeyEventRecord(i * 1_000_000, False, ord(char.upper()), 0, 0, False, char)
+                   for i, char in enumerate("Teh cat")]
+        KeySessionReplayer(records, typing_test.typing_input, speed=0).start()
+        assert typing_test.typed_text == "Teh cat"
+        assert [index for index, _, _ in typing_test.errors] == [1, 2]
+
+    def test_latency_measured(self, qapp):
+        """Test each typed key adds a handler duration and a queueing delay"""
+        latency = LatencyStats()
+        test = TypingTest(latency=latency)
+        test.start_test({'id': 0, 'text': "The cat", 'source': ''})
+        latency.duration.clear()  # Starting the test clears the input
+        records = [KeyEventRecord(time.monotonic_ns(), False, ord(char.upper()), 0, 0, False,
+                                  char) for char in "The"]
+        KeySessionReplayer(records, test.typing_input, speed=0).start()
+        assert test.typed_text == "The"
+        assert latency.duration["typing"].count == 3
+        assert latency.queue_delay["typing"].count + latency.unsynced == 3
+        test.close()
+
+    def test_results_compared_with_history(self, typing_test, typing_history):
+        """Test results are compared with earlier tests of the same duration"""
+        assert "First 60 second test" in typing_test.history_comparison(
+            {'duration': 60, 'wpm': 70.0}, typing_history.get_summary(60))
+
+        typing_history.save_result({'duration': 60, 'wpm': 80.0})
+        typing_history.save_result({'duration': 60, 'wpm': 90.0})
+        summary = typing_history.get_summary(60)
+        comparison = typing_test.history_comparison({'duration': 60, 'wpm': 88.0}, summary)
+        assert "Personal Best:    90.0 WPM" in comparison
+        assert "+3.0 WPM (average 85.0 over 2 tests)" in comparison
+
+        comparison = typing_test.history_comparison({'duration': 60, 'wpm': 95.0}, summary)
+        assert "NEW PERSONAL BEST (previous 90.0 WPM)" in comparison
+
+    def test_comparison_shown_once_saved(self, qapp, typing_test, typing_history):
+        """Test ending a test never queries the history on the GUI thread"""
+        typing_test.history = typing_test.history_writer.history = typing_history
+        typing_history.save_result({'duration': 60, 'wpm': 80.0})
+        typing_test.start_test()
+        typing_test.typed_text = "Test text"
+
+        with patch.object(typing_history, 'get_summary',
+                          wraps=typing_history.get_summary) as mock_summary:
+            typing_test.end_test()
+            assert "Comparing with earlier results" in typing_test.stats_panel.text()
+            typing_test.history_writer.wait()
+            qapp.processEvents()
+        assert mock_summary.call_count == 1
+        assert "over 1 test)" in typing_test.stats_panel.text()
+
     def test_mode_switching_preserves_history(self, typing_test, temp_history_dir):
         """Test that history persists across mode switches"""
         # Override history location
@@ -381,6 +1191,7 @@ class TestTypingTestIntegration:
         typing_test.wpm_samples = [60]
         typing_test.end_test()
         typing_test.save_results()
+        typing_test.history_writer.wait()  # Saves are written in the background
 
         # Create new typing test instance (simulating mode switch)
         new_test = TypingTest()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Typing test scoring engine - pure Python, no Qt required
+
+Copyright (C) 2025
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import re
+import sys
+import base64
+import statistics
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Splits text into alternating word/punctuation and whitespace tokens
+TOKEN_PATTERN = re.compile(r'\S+|\s+')
+
+# Character statuses reported by the scorer
+CORRECT = 'correct'
+ERROR = 'error'
+OVERFLOW = 'overflow'  # Typed far beyond the end of the source
+
+# Compact per-character status codes, one byte each
+STATUSES = (CORRECT, ERROR, OVERFLOW)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+STATUS_RUN_PATTERN = re.compile(rb'(.)\1*', re.DOTALL)
+
+BACKSPACE = '\b'
+
+# Stands in for the missing expected character of an extra typed character
+NO_CHAR = '\0'
+
+
+class SourceIndex:
+    """Immutable token index of a typing test's source text
+
+    Built once per test so keystroke handling never re-tokenizes the source.
+    """
+
+    __slots__ = ('text', 'tokens')
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tuple(match.group() for match in TOKEN_PATTERN.finditer(text))
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+class TypingScorer:
+    """Scores typed text against a source text, token by token
+
+    Typed tokens are compared to the source token with the same index, so a
+    mistake in one word does not cascade into the following words. Feed the
+    scorer either the whole current text (feed_text) or single keystrokes
+    (feed_key); it keeps the running error list and accuracy up to date and
+    only rescores the tokens an edit can affect.
+    """
+
+    def __init__(self, source_text):
+        self.source = SourceIndex(source_text)
+        self.reset()
+
+    def reset(self):
+        """Forget everything typed so far"""
+        self.typed_text = ""
+        self.errors = []  # (char_index, typed, expected), sorted by index
+        self.token_starts = []
+        self.token_texts = []
+        self.char_statuses = bytearray()  # One status code per typed character
+
+    @property
+    def total_chars(self):
+        return len(self.typed_text)
+
+    @property
+    def error_count(self):
+        return len(self.errors)
+
+    @property
+    def accuracy(self):
+        """Running accuracy percentage of the typed characters"""
+        return accuracy_percent(len(self.typed_text), len(self.errors))
+
+    def feed_key(self, char):
+        """Apply one keystroke: a typed character or BACKSPACE"""
+        if char == BACKSPACE:
+            return self.feed_text(self.typed_text[:-1])
+        return self.feed_text(self.typed_text + char)
+
+    def feed_text(self, text):
+        """Score the complete current typed text
+
+        Returns the spans whose coloring changed as a list of
+        (start, statuses) tuples, one status per character of the span.
+        Characters outside those spans keep their previous status.
+        """
+        old_text = self.typed_text
+        if text == old_text:
+            return []
+        self.typed_text = text
+
+        # Locate the edited range: [prefix, new_len - suffix) replaced
+        # [prefix, old_len - suffix) of the previous text
+        prefix = common_prefix_length(old_text, text)
+        suffix = common_suffix_length(old_text, text,
+                                      min(len(old_text), len(text)) - prefix)
+        inserted_end = len(text) - suffix
+        shift = len(text) - len(old_text)
+
+        # Restart tokenizing at the token holding the first changed character.
+        # Step back one more token when the edit starts on a boundary, since
+        # the edit may have merged it with the previous token.
+        starts = self.token_starts
+        texts = self.token_texts
+        first = max(0, bisect_right(starts, prefix) - 1)
+        if first > 0 and starts[first] == prefix:
+            first -= 1
+        restart = starts[first] if starts else 0
+
+        # Tokens from first onward are rebuilt in place
+        old_starts = starts[first:]
+        old_texts = texts[first:]
+        del starts[first:]
+        del texts[first:]
+        char_statuses = self.char_statuses
+        del char_statuses[restart:]
+
+        source_tokens = self.source.tokens
+        tail_errors = []
+        dirty = []
+
+        for token_idx, match in enumerate(TOKEN_PATTERN.finditer(text, restart), first):
+            token = match.group()
+            start = match.start()
+            end = match.end()
+            starts.append(start)
+            texts.append(token)
+
+            statuses = score_token(token_idx, token, start, source_tokens, tail_errors)
+            char_statuses.extend([STATUS_CODES[status] for status in statuses])
+
+            # Characters keep their old status only if they were not inserted
+            # and belonged to an identical token at the same index before
+            if end <= prefix:
+                old_start = start
+            elif start >= inserted_end:
+                old_start = start - shift
+            else:
+                old_start = None
+            tail_idx = token_idx - first
+            unchanged = (old_start is not None and tail_idx < len(old_starts)
+                         and old_starts[tail_idx] == old_start
+                         and old_texts[tail_idx] == token)
+            if not unchanged:
+                dirty.append((start, statuses))
+
+        del self.errors[bisect_left(self.errors, (restart,)):]
+        self.errors.extend(tail_errors)
+        return dirty
+
+    def status_runs(self, start, end):
+        """Yield (offset, length, status) runs of equal status in [start, end)
+
+        Offsets are relative to start.
+        """
+        for match in STATUS_RUN_PATTERN.finditer(self.char_statuses, start, end):
+            yield match.start() - start, match.end() - match.start(), STATUSES[match.group()[0]]
+
+    def statistics(self, elapsed, wpm_samples=()):
+        """Return final statistics for a test that lasted elapsed seconds"""
+        return compute_statistics(self.typed_text, self.errors, elapsed, wpm_samples)
+
+
+def common_prefix_length(a, b):
+    """Return the length of the longest common prefix of two strings"""
+    # Appends and trailing deletions are the common case while typing
+    if b.startswith(a):
+        return len(a)
+    if a.startswith(b):
+        return len(b)
+    # Binary search, comparing only the not-yet-confirmed part each step
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix_length(a, b, limit):
+    """Return the length of the common suffix of two strings, at most limit"""
+    if limit <= 0:
+        return 0
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def score_token(token_idx, token, start, source_tokens, errors):
+    """Score one typed token against the source token with the same index
+
+    Returns a list with a status (CORRECT, ERROR or OVERFLOW) for each
+    character and appends (char_index, typed, expected) tuples to errors.
+    """
+    if token_idx >= len(source_tokens):
+        # Typed beyond source - errors near the end, gray far beyond
+        if token_idx < len(source_tokens) + 2:
+            errors.extend((start + i, char, '') for i, char in enumerate(token))
+            return [ERROR] * len(token)
+        return [OVERFLOW] * len(token)
+
+    source_token = source_tokens[token_idx]
+    statuses = []
+    for i, char in enumerate(token):
+        if i < len(source_token) and char == source_token[i]:
+            statuses.append(CORRECT)
+        else:
+            statuses.append(ERROR)
+            errors.append((start + i, char, source_token[i] if i < len(source_token) else ''))
+    return statuses
+
+
+def accuracy_percent(total_chars, error_count):
+    """Percentage of typed characters that were correct"""
+    return ((total_chars - error_count) / total_chars * 100) if total_chars > 0 else 0
+
+
+def compute_statistics(typed_text, errors, elapsed, wpm_samples=()):
+    """Calculate typing statistics for a test that lasted elapsed seconds"""
+    # Basic counts
+    total_chars = len(typed_text)
+    total_words = len(typed_text.split())
+
+    # Error count
+    error_count = len(errors)
+
+    # WPM calculation (standard: chars/5 / minutes)
+    wpm = (total_chars / 5) / (elapsed / 60) if elapsed > 0 else 0
+
+    # Adjusted WPM (standard net WPM formula: subtract error penalty from words before dividing by time)
+    # Each error subtracts 1 word (5 characters worth)
+    adjusted_wpm = max(0, ((total_chars / 5) - error_count) / (elapsed / 60)) if elapsed > 0 else 0
+
+    # Accuracy
+    accuracy = accuracy_percent(total_chars, error_count)
+
+    # Peak WPM
+    peak_wpm = max(wpm_samples) if wpm_samples else wpm
+
+    # Consistency (standard deviation of WPM samples)
+    if len(wpm_samples) > 1:
+        consistency = statistics.stdev(wpm_samples)
+    else:
+        consistency = 0
+
+    return {
+        'wpm': round(wpm, 1),
+        'adjusted_wpm': round(adjusted_wpm, 1),
+        'accuracy_percent': round(accuracy, 1),
+        'peak_wpm': round(peak_wpm, 1),
+        'consistency_score': round(consistency, 1),
+        'total_characters': total_chars,
+        'total_words': total_words,
+        'errors': error_count,
+        'error_details': errors
+    }
+
+
+def pack_errors(errors):
+    """Pack (char_index, typed, expected) error tuples into compact columns
+
+    Returns a dict with the positions as base64 little-endian int32s and
+    the typed and expected characters as two strings holding one character
+    per error, NO_CHAR standing in for a missing expected character. Raises
+    ValueError for errors that don't have single characters.
+    """
+    if any(len(typed) != 1 or len(expected) > 1 for _, typed, expected in errors):
+        raise ValueError("error characters must be single characters")
+    positions = array('i', (idx for idx, _, _ in errors))
+    typed = ''.join(char for _, char, _ in errors)
+    expected = ''.join(char or NO_CHAR for _, _, char in errors)
+    if sys.byteorder == 'big':
+        positions.byteswap()
+    return {
+        'positions': base64.b64encode(positions.tobytes()).decode('ascii'),
+        'typed': typed,
+        'expected': expected,
+    }
+
+
+def unpack_errors(columns):
+    """Return the error tuples packed by pack_errors"""
+    positions = array('i', base64.b64decode(columns['positions']))
+    if sys.byteorder == 'big':
+        positions.byteswap()
+    return [(idx, typed, '' if expected == NO_CHAR else expected)
+            for idx, typed, expected in zip(positions, columns['typed'], columns['expected'])]